@@ -0,0 +1,133 @@
+"""
+Compares Netconf connect (SSH handshake, authentication and hello) time
+across the ssh profiles of a devices file.
+
+Each profile is connected and disconnected repeat times against the
+netconf connection of a device and the min/median/mean connect times are
+reported.  The profile "none" connects without an ssh profile.
+
+* Terminal exports:
+export PYTHONPATH=${PYTHONPATH}:${PWD}
+
+Example:
+python connect_bench.py config/devices.yaml simob -c netconf -r 10
+
+"""
+
+from typing import List, Optional
+import statistics
+import sys
+import time
+import typer
+from typing_extensions import Annotated
+
+from lib.base_logger import getlogger
+
+LOGGER = getlogger("connect_bench", "INFO")
+
+from lib.axos_netconf.errors import NetconfSessionError
+
+app = typer.Typer(
+    add_completion=False, context_settings={"help_option_names": ["-h", "--help"]}
+)
+
+
+def bench_profile(conn_params, profile: dict | None, repeat: int) -> List[float]:
+    """Return the connect times of repeat connects with a profile"""
+    from lib.axos_netconf.base import NetconfSession
+
+    elapsed = []
+    for _ in range(repeat):
+        conn = NetconfSession(
+            hostname=conn_params.host,
+            port=conn_params.port,
+            timeout=conn_params.timeout,
+            username=conn_params.username,
+            password=conn_params.password,
+            ssh_profile=profile,
+        )
+        start = time.perf_counter()
+        conn.connect(retry=False)
+        elapsed.append(time.perf_counter() - start)
+        conn.disconnect()
+    return elapsed
+
+
+@app.command(help="Compare Netconf connect time across ssh profiles")
+def connect_bench(
+    devicesfile: Annotated[
+        str,
+        typer.Argument(help="devices yaml file", show_default=False),
+    ],
+    device: Annotated[
+        str,
+        typer.Argument(help="device name in the devices file", show_default=False),
+    ],
+    connection: Annotated[
+        str,
+        typer.Option(
+            "--connection",
+            "-c",
+            help="netconf connection name of the device",
+            show_default=True,
+        ),
+    ] = "netconf",
+    profiles: Annotated[
+        Optional[List[str]],
+        typer.Option(
+            "--profile",
+            "-s",
+            help="ssh profile to compare, repeatable (default all and none)",
+            show_default=False,
+        ),
+    ] = None,
+    repeat: Annotated[
+        int,
+        typer.Option(
+            "--repeat",
+            "-r",
+            min=1,
+            max=1000,
+            help="Number of connects per profile",
+        ),
+    ] = 5,
+):
+    """
+    Connect repeatedly with each ssh profile and report connect times.
+    """
+    from lib.cli_utils.devicecfg import Devices
+
+    devices = Devices(devicesfile)
+    conn_params = devices.get_device_connection_params(device, connection)
+    if conn_params is None or conn_params.type != "netconf":
+        LOGGER.critical(f"No netconf connection {connection} for device {device}")
+        sys.exit(1)
+
+    if not profiles:
+        profiles = ["none"] + devices.ssh_profile_names
+
+    for name in profiles:
+        profile = None
+        if name != "none":
+            if devices.get_ssh_profile(name) is None:
+                LOGGER.error(f"Unknown ssh profile {name}")
+                continue
+            profile = devices.get_ssh_profile(name).model_dump()
+        try:
+            elapsed = bench_profile(conn_params, profile, repeat)
+        except NetconfSessionError as err:
+            LOGGER.error(f"profile:{name} connect failed.  error={err}")
+            continue
+        LOGGER.info(
+            f"profile:{name} connects:{len(elapsed)} "
+            f"min:{min(elapsed):.3f}s median:{statistics.median(elapsed):.3f}s "
+            f"mean:{statistics.mean(elapsed):.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    try:
+        app()
+    except KeyboardInterrupt:
+        LOGGER.info("CTRL+C pressed - exiting")
+        sys.exit(1)
@@ -3,39 +3,30 @@ Performs health check via netconf to E9 device as a method to check
 connectivity and device health.
 
 Typer works off of Python hints to validate arguments
-Pydantic used to augment Typer as needed for greater specifity
 
-Note: TDQM may not handle keyboardInterupt well at all times.  This can
-be an extra progress bar line printed or a traceback within TDQM.
-Open issue:   https://github.com/tqdm/tqdm/issues/548
+Called often from monitoring agents, so the Netconf session (ncclient,
+paramiko) and dotenv are imported at first use keeping start up and
+--help fast.  Check with startup_bench.py.
 
 * Terminal exports:
 export PYTHONPATH=${PYTHONPATH}:${PWD}
 
 """
 
-from typing import List
 import os
 import time
 import sys
 import random
 import string
-from pathlib import Path
 from enum import Enum
-from pydantic import BaseModel, field_validator, ValidationError
-from tqdm import tqdm
 import typer
 from typing_extensions import Annotated
-from dotenv import load_dotenv
 
 from lib.base_logger import getlogger
 
 LOGGER = getlogger("healthchk", "DEBUG")
 
-from lib.axos_netconf.base import NetconfSession
 from lib.axos_netconf.errors import NetconfSessionError, NetconfAuthenticationError
-from lib.cli_utils.devicecfg import Devices
-from lib.errors_base import ToolboxError
 
 app = typer.Typer(
     add_completion=False, context_settings={"help_option_names": ["-h", "--help"]}
@@ -62,6 +53,8 @@ def main(
     interval: float,
 ):
     """Main function"""
+    # imported here so --help does not load ncclient, paramiko and the mixins
+    from lib.axos_netconf.base import NetconfSession
 
     # TODO consider timeout as a parameter
     timeout = 60
@@ -187,6 +180,8 @@ def healthchk(
 
 if __name__ == "__main__":
     try:
+        from dotenv import load_dotenv
+
         load_dotenv()
         app()
     except KeyboardInterrupt:
@@ -13,6 +13,9 @@ Design choices:
 *   editcfg parameters that default to None are considered optional
 *   editcfg parameters without defaults considered required
 *   use default Jinja2 environment
+*   ncclient (with paramiko and cryptography), lxml, Jinja2 and xmltodict are
+        imported at first use so importing the session class stays cheap for
+        CLI start up
 
 Opportunities for improvement:
 * Consider separating templates out into a directory of templates
@@ -0,0 +1,238 @@
+"""
+NETCONF 1.1 chunked framing (RFC 6242) decoder for Netconf sessions.
+
+ncclient's decoder copies the whole receive buffer and decodes it to str
+on every chunk header it looks for, then keeps each chunk as a str and
+joins them at the end of the message.  Large replies (a full running
+config, all ONT states) arrive as thousands of chunks, so the work grows
+with the square of the reply size and peak memory is several times the
+payload.
+
+ChunkedFramingParser instead:
+* keeps received data in a bytearray and matches chunk headers in place
+    with a bytes regex starting at the scan offset, nothing is decoded,
+* copies chunk payload once, as it arrives, straight from the receive
+    buffer into the message bytearray,
+* decodes the complete message once.
+
+ncclient dispatches messages as str and re-encodes them for lxml twice
+(root element lookup and reply parsing).  The message is dispatched as a
+str subclass returning the received bytes from encode, so lxml parses the
+received buffer directly and the reply is held as its bytes plus the str
+ncclient requires, rather than as the 3 to 4 copies made by ncclient.
+
+Replies larger than spill_threshold bytes are written to a named
+temporary file as they arrive and handed on memory mapped, so they do not
+count against process memory while many large replies are collected in
+parallel.  The file is not unlinked once mapped: parse pool workers open
+it by its path, so it is removed when the mapped reply is released.
+ncclient still needs a str for correlating and checking the reply: a
+spilled reply is dispatched as its empty root element, keeping the
+message-id, with the mapped reply attached (see spilled_buffer).
+Replies starting with an rpc-error are never spilled so ncclient still
+sees the errors.
+
+NETCONF 1.0 (end of message delimiter) framing is left to ncclient.
+"""
+
+import mmap
+import os
+import re
+import tempfile
+import weakref
+
+from lxml import etree
+from ncclient.devices.default import DefaultDeviceHandler
+from ncclient.transport.errors import NetconfFramingError
+from ncclient.transport.parser import DefaultXMLParser
+from ncclient.transport.session import NetconfBase
+
+# chunk header "\n#<size>\n" or end of chunks "\n##\n"
+RE_CHUNK_DELIM = re.compile(rb"\n(?:#([0-9]{1,10})|(##))\n")
+MAX_CHUNK_SIZE = 4294967295
+# longest valid header
+MAX_HEADER_LEN = len(b"\n#4294967295\n")
+# bytes of a spilled reply read at a time looking for its root element
+HEAD_READ_SIZE = 65536
+
+
+class _Message(str):
+    """Dispatched message text keeping the received UTF-8 bytes."""
+
+    def __new__(cls, data: bytes):
+        message = super().__new__(cls, data, "utf-8")
+        message._data = data
+        return message
+
+    def encode(self, encoding="utf-8", errors="strict"):
+        if encoding.lower().replace("_", "-") in ("utf-8", "utf8"):
+            return self._data
+        return super().encode(encoding, errors)
+
+    def __reduce__(self):
+        return (str, (str(self),))
+
+
+class _SpilledMessage(str):
+    """Empty root element of a spilled reply carrying the mapped reply."""
+
+    def __new__(cls, text: str, buffer=None):
+        message = super().__new__(cls, text)
+        message.buffer = buffer
+        return message
+
+
+class _SpilledBuffer(mmap.mmap):
+    """Memory mapped reply keeping the path of the file it maps."""
+
+    path = None
+
+
+def _remove(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def _map_spilled(spill) -> _SpilledBuffer:
+    """Map a spilled reply, its file being removed with the mapping."""
+    buffer = _SpilledBuffer(spill.fileno(), 0, access=mmap.ACCESS_READ)
+    buffer.path = spill.name
+    weakref.finalize(buffer, _remove, spill.name)
+    return buffer
+
+
+def spilled_buffer(xml):
+    """Return the memory mapped reply if the reply xml of an ncclient
+    operation was spilled to disk, otherwise None."""
+    return getattr(xml, "buffer", None) if isinstance(xml, _SpilledMessage) else None
+
+
+def _spilled_message(buffer):
+    """Return the message dispatched for a spilled reply, or None if the
+    reply has to be dispatched in full (errors, no content, not XML)."""
+    parser = etree.XMLPullParser(events=("start",))
+    root = None
+    try:
+        for offset in range(0, len(buffer), HEAD_READ_SIZE):
+            parser.feed(buffer[offset : offset + HEAD_READ_SIZE])
+            for _, element in parser.read_events():
+                if root is None:
+                    root = element
+                    continue
+                if etree.QName(element).localname == "rpc-error":
+                    return None
+                stub = etree.Element(
+                    root.tag, attrib=dict(root.attrib), nsmap=root.nsmap
+                )
+                return _SpilledMessage(etree.tostring(stub, encoding="unicode"), buffer)
+    except etree.XMLSyntaxError:
+        pass
+    return None
+
+
+class ChunkedFramingParser:
+    """Drop in replacement of ncclient's DefaultXMLParser for NETCONF 1.1
+    sessions."""
+
+    def __init__(self, session, spill_threshold=None):
+        """Replies over spill_threshold bytes are spilled to disk, None
+        keeps every reply in memory."""
+        self._session = session
+        self.spill_threshold = spill_threshold
+        self._buffer = bytearray()
+        self._message = bytearray()
+        self._spill = None  # temporary file of the reply being spilled
+        self._chunk_size = 0  # bytes of the current chunk still to receive
+        self._base10 = DefaultXMLParser(session)
+
+    def parse(self, data):
+        """Decode received data dispatching every complete message."""
+        if not data:
+            return
+        if self._session._base != NetconfBase.BASE_11:
+            self._base10.parse(data)
+            return
+        self._buffer += data
+        self._parse11()
+
+    def _parse10(self):
+        return self._base10._parse10()
+
+    def _parse11(self):
+        buffer = self._buffer
+        view = memoryview(buffer)
+        end = len(buffer)
+        position = 0
+        try:
+            while position < end:
+                if self._chunk_size:
+                    # copy what has arrived of the chunk, the receive buffer
+                    # never holds more than one read of payload
+                    size = min(self._chunk_size, end - position)
+                    self._append(view[position : position + size])
+                    position += size
+                    self._chunk_size -= size
+                    continue
+
+                match = RE_CHUNK_DELIM.match(buffer, position)
+                if match is None:
+                    if end - position >= MAX_HEADER_LEN or not buffer.startswith(
+                        b"\n", position
+                    ):
+                        raise NetconfFramingError(
+                            "Invalid chunk header", bytes(view[position:end])
+                        )
+                    break
+                position = match.end()
+                if match.group(2):
+                    self._dispatch()
+                else:
+                    self._chunk_size = int(match.group(1))
+                    if not 0 < self._chunk_size <= MAX_CHUNK_SIZE:
+                        raise NetconfFramingError(
+                            f"Invalid chunk size {self._chunk_size}", match[0]
+                        )
+        finally:
+            view.release()
+            del buffer[:position]
+
+    def _append(self, payload):
+        if self._spill is not None:
+            self._spill.write(payload)
+            return
+        self._message += payload
+        if self.spill_threshold and len(self._message) > self.spill_threshold:
+            self._spill = tempfile.NamedTemporaryFile(
+                prefix="netconf-reply-", delete=False
+            )
+            self._spill.write(self._message)
+            self._message = bytearray()
+
+    def _dispatch(self):
+        if self._spill is None:
+            data = bytes(self._message)
+            self._message = bytearray()
+            self._session._dispatch_message(_Message(data))
+            return
+
+        spill, self._spill = self._spill, None
+        with spill:
+            spill.flush()
+            buffer = _map_spilled(spill)
+        message = _spilled_message(buffer)
+        if message is None:
+            message = _Message(buffer[:])
+            buffer.close()
+            _remove(buffer.path)
+        self._session._dispatch_message(message)
+
+
+class ChunkedFramingDeviceHandler(DefaultDeviceHandler):
+    """Default device handler decoding replies with ChunkedFramingParser."""
+
+    def get_xml_parser(self, session):
+        return ChunkedFramingParser(
+            session, spill_threshold=self.device_params.get("spill_threshold")
+        )
@@ -2,7 +2,9 @@
 Collection of Netconf methods related to interfaces
 """
 
-import xmltodict
+from lib.axos_netconf.parsing import xml_to_dict
+from lib.axos_netconf.responses import NetconfResponse
+from lib.axos_netconf.templates import jinja_env
 
 
 class NetconfInterfacesMixin:
@@ -24,16 +26,62 @@ class NetconfInterfacesMixin:
             </interfaces>
         """
 
-        response = self.get_config(nc_filter=("subtree", nc_filter))
-        data = xmltodict.parse(response.xml)["rpc-reply"]["data"]
-        if xmltodict.parse(response.xml)["rpc-reply"]["data"] is None:
+        response = self.get_config(
+            nc_filter=("subtree", nc_filter), with_defaults="report-all"
+        )
+        data = xml_to_dict(response.xml)["rpc-reply"]["data"]
+        if data is None:
             return None
-        details = xmltodict.parse(response.xml)["rpc-reply"]["data"]["interfaces"][
-            "interface"
-        ]
+        details = data["interfaces"]["interface"]
 
         return details
 
+    def getcfg_pon_enabled_all(self) -> dict | None:
+        """Get the enable state of every PON interface as {name: enabled},
+        None if the get-config failed"""
+        # Filter to obtain all PON port admin states
+        nc_filter = """
+            <interfaces
+                xmlns="urn:ietf:params:xml:ns:yang:ietf-interfaces">
+                <interface>
+                    <name/>
+                    <type
+                        xmlns:gpon-std="http://www.calix.com/ns/exa/gpon-interface-std">gpon-std:pon
+                    </type>
+                    <enabled></enabled>
+                </interface>
+            </interfaces>
+        """
+
+        response = self.get_config(
+            nc_filter=("subtree", nc_filter), with_defaults="report-all"
+        )
+        if not response.ok:
+            return None
+        data = xml_to_dict(response.xml)["rpc-reply"]["data"]
+        try:
+            interfaces = data["interfaces"]["interface"]
+        except (KeyError, TypeError):
+            return {}
+        if isinstance(interfaces, dict):
+            interfaces = [interfaces]
+
+        return {
+            interface["name"]: interface.get("enabled") for interface in interfaces
+        }
+
+    def getcfg_pon_cards(self) -> list | None:
+        """Get the (shelf, slot) of every card with PON interfaces"""
+        pons = self.getcfg_pon_enabled_all()
+        if pons is None:
+            return None
+        cards = set()
+        for name in pons:
+            parts = name.split("/")
+            if len(parts) == 3 and parts[0].isdigit() and parts[1].isdigit():
+                cards.add((int(parts[0]), int(parts[1])))
+        return sorted(cards)
+
     def editcfg_pon_enabled(self, name, state):
         """Edit the enable state of the PON interfaces"""
 
@@ -54,3 +102,68 @@ class NetconfInterfacesMixin:
         """
         response = self.edit_config(config=config)
         return response
+
+    def editcfg_pon_enabled_many(self, states: dict):
+        """Edit the enable state of many PON interfaces in one edit-config,
+        states being {name: state}"""
+
+        if not states:
+            return NetconfResponse()
+        config = """
+            <config
+                xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+                <interfaces
+                    xmlns="urn:ietf:params:xml:ns:yang:ietf-interfaces">
+                    {% for name, state in states.items() %}
+                    <interface>
+                        <name>{{name}}</name>
+                        <type
+                            xmlns:gpon-std="http://www.calix.com/ns/exa/gpon-interface-std">gpon-std:pon
+                        </type>
+                        <enabled>{{state|lower}}</enabled>
+                    </interface>
+                    {% endfor %}
+                </interfaces>
+            </config>
+        """
+        config = jinja_env().from_string(config).render(states=states)
+        response = self.edit_config(config=config)
+        return response
+
+    def get_interface_statistics(self, parse=True) -> NetconfResponse:
+        """Get the statistics of every interface with one get.  Returns
+        data={name: {counter: value}} or, if parse is False, the reply xml
+        for callers decoding it themselves."""
+
+        nc_filter = """
+            <interfaces-state
+                xmlns="urn:ietf:params:xml:ns:yang:ietf-interfaces">
+                <interface>
+                    <name/>
+                    <statistics/>
+                </interface>
+            </interfaces-state>
+        """
+
+        response = self.get(nc_filter=("subtree", nc_filter))
+        if not response.ok or not parse:
+            return response
+
+        data = xml_to_dict(response.xml)["rpc-reply"]["data"]
+        if data is None:
+            return NetconfResponse(data={})
+        interfaces = data["interfaces-state"]["interface"]
+        if isinstance(interfaces, dict):
+            interfaces = [interfaces]
+
+        statistics = {}
+        for interface in interfaces:
+            counters = interface.get("statistics")
+            if not isinstance(counters, dict):
+                continue
+            statistics[interface["name"]] = {
+                name: value
+                for name, value in counters.items()
+                if not name.startswith("@")
+            }
+        return NetconfResponse(data=statistics)
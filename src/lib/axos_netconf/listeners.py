@@ -0,0 +1,27 @@
+"""
+ncclient session listeners used by Netconf sessions.
+
+Kept apart from session.py so ncclient is only imported once a session
+uses it.
+"""
+
+from ncclient.transport.session import SessionListener
+from ncclient.xml_ import qualify, NETCONF_NOTIFICATION_NS
+
+
+class NotificationForwarder(SessionListener):
+    """Session listener handing received notifications and transport errors
+    to plain callbacks."""
+
+    def __init__(self, callback, errback=None):
+        self._callback = callback
+        self._errback = errback
+
+    def callback(self, root, raw):
+        tag, _ = root
+        if tag == qualify("notification", NETCONF_NOTIFICATION_NS):
+            self._callback(raw)
+
+    def errback(self, ex):
+        if self._errback is not None:
+            self._errback(ex)
@@ -2,17 +2,30 @@
 Collection of Netconf methods related to ONTs
 """
 
-import xmltodict
-import jinja2
+from lib.axos_netconf.parsing import (
+    parse_ont_linkages,
+    parse_ont_oper_states,
+    parse_ont_states,
+    parse_ont_status_leaves,
+    xml_to_dict,
+)
 from lib.axos_netconf.responses import NetconfResponse
+from lib.axos_netconf.templates import jinja_env
 
 
-JENV = jinja2.Environment(autoescape=True)
+# ONT status leaves read by get_ont_optics, optical levels in dBm
+ONT_OPTICS_LEAVES = ("opt-signal-level", "tx-opt-level", "olt-rx-opt-level")
+# ONT status leaves read by get_ont_pon_statistics
+ONT_PON_COUNTER_LEAVES = ("bip-errors", "missed-bursts", "gem-hec-errors")
 
 
 class NetconfONTMixin:
     """Netconf Mixin of ONT related methods"""
 
+    # (shelf, slot) pairs read when discovery is split into shards, None
+    # reads the cards with PON interfaces from the running config
+    discovery_cards = None
+
     def get_ont_operating_status(self, ontid) -> NetconfResponse:
         """
         Gets the operating status of the passed ONT (present, missing, or not-linked)
@@ -37,7 +50,7 @@ class NetconfONTMixin:
 
         if response.ok:
             oper_status = None
-            xml_dict = xmltodict.parse(response.xml)["rpc-reply"]
+            xml_dict = xml_to_dict(response.xml)["rpc-reply"]
             try:
                 if "status" in xml_dict["data"]["status"]["system"]["ont"].keys():
                     oper_status = xml_dict["data"]["status"]["system"]["ont"]["status"][
@@ -52,6 +65,49 @@ class NetconfONTMixin:
         else:
             return NetconfResponse(ok=response.ok, err=response.err)
 
+    def get_ont_operating_statuses(self, ontids, shard_size=500) -> NetconfResponse:
+        """
+        Gets the operating status of many ONTs with one subtree filter
+        selecting all of them, split into one request per shard_size ids.
+        Returns data={"statuses": {ont-id: oper-state}, "not_found": [ont-id]}.
+        """
+
+        template = """
+            <filter xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+                <status xmlns="http://www.calix.com/ns/exa/base">
+                    <system>
+                        {% for ontid in ontids %}
+                        <ont xmlns="http://www.calix.com/ns/exa/gpon-interface-base">
+                            <ont-id>{{ontid}}</ont-id>
+                            <status>
+                                <oper-state/>
+                            </status>
+                        </ont>
+                        {% endfor %}
+                    </system>
+                </status>
+            </filter>
+        """
+        template = jinja_env().from_string(template)
+
+        ontids = [str(ontid) for ontid in ontids]
+        # shards are parsed while the next shard is read when the session
+        # has a parse pool
+        parsed = []
+        for start in range(0, len(ontids), shard_size):
+            nc_filter = template.render(ontids=ontids[start : start + shard_size])
+            response = self.get(nc_filter)
+            if not response.ok:
+                return NetconfResponse(ok=response.ok, err=response.err)
+            parsed.append(self.submit_parse(parse_ont_oper_states, response))
+
+        statuses = {}
+        for future in parsed:
+            statuses.update(future.result())
+
+        not_found = [ontid for ontid in ontids if ontid not in statuses]
+        return NetconfResponse(data={"statuses": statuses, "not_found": not_found})
+
     def perform_ont_reboot_by_ontid(self, ontid) -> NetconfResponse:
         """Execute the 'perform ont reboot' command via netconf.
         id may be composed of: uppercase, lowercase, letters, digits, -, _
@@ -67,7 +123,7 @@ class NetconfONTMixin:
 
         if response.ok:
             status = None
-            xml_dict = xmltodict.parse(response.xml)["rpc-reply"]
+            xml_dict = xml_to_dict(response.xml)["rpc-reply"]
             if "status" in xml_dict:
                 status = xml_dict["status"]["#text"]
             return NetconfResponse(data={"status": status})
@@ -88,7 +144,7 @@ class NetconfONTMixin:
 
         if response.ok:
             status = None
-            xml_dict = xmltodict.parse(response.xml)["rpc-reply"]
+            xml_dict = xml_to_dict(response.xml)["rpc-reply"]
             if "data" in xml_dict:
                 data = xml_dict["status"]["#text"]
             # TODO Investigate this data value not being used
@@ -111,7 +167,7 @@ class NetconfONTMixin:
 
         if response.ok:
             status = None
-            xml_dict = xmltodict.parse(response.xml)["rpc-reply"]
+            xml_dict = xml_to_dict(response.xml)["rpc-reply"]
             if "data" in xml_dict:
                 data = xml_dict["status"]["#text"]
             # TODO Investigate this data value not being used
@@ -119,6 +175,38 @@ class NetconfONTMixin:
 
         return NetconfResponse(ok=response.ok, err=response.err)
 
+    def get_ont_id_by_serial(self, serial) -> NetconfResponse:
+        """
+        Gets the ont-id provisioned with the passed serial number.
+        Returns data={"ont-id": None} if no ONT is provisioned with it.
+        """
+
+        nc_filter = f"""
+            <config xmlns="http://www.calix.com/ns/exa/base">
+                <system>
+                    <ont xmlns="http://www.calix.com/ns/exa/gpon-interface-base">
+                        <ont-id/>
+                        <serial-number>{serial}</serial-number>
+                    </ont>
+                </system>
+            </config>
+        """
+        response = self.get_config(nc_filter=("subtree", nc_filter))
+
+        if response.ok:
+            ontid = None
+            xml_dict = xml_to_dict(response.xml)["rpc-reply"]
+            try:
+                ont = xml_dict["data"]["config"]["system"]["ont"]
+                if isinstance(ont, list):
+                    ont = ont[0]
+                ontid = ont["ont-id"]
+            except (KeyError, TypeError, IndexError):
+                ontid = None
+            return NetconfResponse(data={"ont-id": ontid})
+
+        return NetconfResponse(ok=response.ok, err=response.err)
+
     def perform_ont_upgrade_install(
         self,
         release_name,
@@ -143,7 +231,7 @@ class NetconfONTMixin:
                 <force-reinstall>{{force_reinstall}}</force-reinstall>
             </ont-install>
         """
-        template = JENV.from_string(template)
+        template = jinja_env().from_string(template)
 
         rpc_command = template.render(
             release_name=str(release_name),
@@ -156,7 +244,7 @@ class NetconfONTMixin:
 
         if response.ok:
             status = None
-            xml_dict = xmltodict.parse(response.xml)["rpc-reply"]
+            xml_dict = xml_to_dict(response.xml)["rpc-reply"]
             if "data" in xml_dict:
                 data = xml_dict["status"]["#text"]
             return NetconfResponse(data={"status": status})
@@ -178,7 +266,7 @@ class NetconfONTMixin:
                 {% endif %}
             </ont-download>
         """
-        template = JENV.from_string(template)
+        template = jinja_env().from_string(template)
 
         rpc_command = template.render(
             release_name=str(release_name), upgrade_class=str(upgrade_class)
@@ -187,7 +275,7 @@ class NetconfONTMixin:
 
         if response.ok:
             status = None
-            xml_dict = xmltodict.parse(response.xml)["rpc-reply"]
+            xml_dict = xml_to_dict(response.xml)["rpc-reply"]
             if "data" in xml_dict:
                 data = xml_dict["status"]["#text"]
             return NetconfResponse(data={"status": status})
@@ -209,7 +297,7 @@ class NetconfONTMixin:
                 {% endif %}
             </ont-activate>
         """
-        template = JENV.from_string(template)
+        template = jinja_env().from_string(template)
 
         rpc_command = template.render(
             release_name=str(release_name), upgrade_class=str(upgrade_class)
@@ -218,7 +306,7 @@ class NetconfONTMixin:
 
         if response.ok:
             status = None
-            xml_dict = xmltodict.parse(response.xml)["rpc-reply"]
+            xml_dict = xml_to_dict(response.xml)["rpc-reply"]
             if "data" in xml_dict:
                 data = xml_dict["status"]["#text"]
             return NetconfResponse(data={"status": status})
@@ -239,7 +327,7 @@ class NetconfONTMixin:
                 {% endif %}
             </ont-commit>
         """
-        template = JENV.from_string(template)
+        template = jinja_env().from_string(template)
 
         rpc_command = template.render(
             release_name=str(release_name), upgrade_class=str(upgrade_class)
@@ -248,7 +336,7 @@ class NetconfONTMixin:
 
         if response.ok:
             status = None
-            xml_dict = xmltodict.parse(response.xml)["rpc-reply"]
+            xml_dict = xml_to_dict(response.xml)["rpc-reply"]
             if "data" in xml_dict:
                 data = xml_dict["status"]["#text"]
             return NetconfResponse(data={"status": status})
@@ -280,7 +368,7 @@ class NetconfONTMixin:
 
         if response.ok:
             status = None
-            xml_dict = xmltodict.parse(response.xml)["rpc-reply"]
+            xml_dict = xml_to_dict(response.xml)["rpc-reply"]
             try:
                 card_statuses = xml_dict["data"]["status"]["system"]["ont-upgrade"][
                     "status"
@@ -291,64 +379,12 @@ class NetconfONTMixin:
         return NetconfResponse(ok=response.ok, err=response.err)
 
     def edit_ont_upgrade_server(self, hostname, username, password) -> NetconfResponse:
-        # check for an existing hostname and remove it
-        # if different from the inputted hostname
-        check_hostname_rpc_command = """
-            <get-config xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
-                <source>
-                <running/>
-                </source>
-                <filter>
-                <config xmlns="http://www.calix.com/ns/exa/base">
-                    <system>
-                    <ont-upgrade xmlns="http://www.calix.com/ns/exa/ont-upgrade">
-                        <server>
-                        <hostname/>
-                        </server>
-                    </ont-upgrade>
-                    </system>
-                </config>
-                </filter>
-            </get-config>
         """
-        response = self.dispatch(rpc_command=check_hostname_rpc_command)
-        if not response.ok or response.err:
-            return NetconfResponse(ok=response.ok, err=response.err)
-        else:
-            status = None
-            xml_dict = xmltodict.parse(response.xml)["rpc-reply"]
-            try:
-                previous_hostname = xml_dict["data"]["config"]["system"]["ont-upgrade"][
-                    "server"
-                ]["hostname"]
-            except (KeyError, TypeError):
-                previous_hostname = None
-            # if there is an existing hostname that differs from the one passed delete the existing one
-            if previous_hostname and not hostname == previous_hostname:
-                del_hostname_rpc_command = f"""
-                    <edit-config xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
-                        <target>
-                        <running/>
-                        </target>
-                        <config>
-                        <config xmlns="http://www.calix.com/ns/exa/base">
-                            <system>
-                            <ont-upgrade xmlns="http://www.calix.com/ns/exa/ont-upgrade">
-                                <server xmlns:nc="urn:ietf:params:xml:ns:netconf:base:1.0" nc:operation="delete">
-                                <hostname>{previous_hostname}</hostname>
-                                </server>
-                            </ont-upgrade>
-                            </system>
-                        </config>
-                        </config>
-                    </edit-config>
-                """
-                response = self.dispatch(rpc_command=del_hostname_rpc_command)
-
-                if not response.ok or response.err:
-                    return NetconfResponse(ok=response.ok, err=response.err)
-
-        edit_config_rpc_command = f"""
+        Set the ONT upgrade server with a single edit-config.  The server
+        list is replaced so any other configured server is removed without
+        reading the running config first.
+        """
+        edit_config_rpc_command = """
             <edit-config xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
                 <target>
                 <running/>
@@ -356,11 +392,11 @@ class NetconfONTMixin:
                 <config>
                 <config xmlns="http://www.calix.com/ns/exa/base">
                     <system>
-                    <ont-upgrade xmlns="http://www.calix.com/ns/exa/ont-upgrade">
-                        <server xmlns:nc="urn:ietf:params:xml:ns:netconf:base:1.0" nc:operation="replace">
-                        <hostname>{hostname}</hostname>
-                        <username nc:operation="replace">{username}</username>
-                        <password nc:operation="replace">{password}</password>
+                    <ont-upgrade xmlns="http://www.calix.com/ns/exa/ont-upgrade" xmlns:nc="urn:ietf:params:xml:ns:netconf:base:1.0" nc:operation="replace">
+                        <server>
+                        <hostname>{{hostname}}</hostname>
+                        <username>{{username}}</username>
+                        <password>{{password}}</password>
                         </server>
                     </ont-upgrade>
                     </system>
@@ -368,18 +404,59 @@ class NetconfONTMixin:
                 </config>
             </edit-config>
         """
+        edit_config_rpc_command = jinja_env().from_string(edit_config_rpc_command).render(
+            hostname=hostname, username=username, password=password
+        )
 
         response = self.dispatch(rpc_command=edit_config_rpc_command)
-
         if response.ok:
-            status = None
-            xml_dict = xmltodict.parse(response.xml)["rpc-reply"]
-            if "data" in xml_dict:
-                data = xml_dict["status"]["#text"]
-                return NetconfResponse(data={"status": status})
-        else:
+            return NetconfResponse(data={"hostname": hostname})
+        return NetconfResponse(ok=response.ok, err=response.err)
+
+    def get_ont_upgrade_server_hostname(self) -> NetconfResponse:
+        """
+        Get the hostnames of the configured ONT upgrade servers.
+        Returns data={"hostname": hostname, "hostnames": [hostname, ...]}
+        where hostname is the first server, or None if there is none.
+        """
+        rpc_command = """
+            <get-config xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+                <source>
+                <running/>
+                </source>
+                <filter>
+                <config xmlns="http://www.calix.com/ns/exa/base">
+                    <system>
+                    <ont-upgrade xmlns="http://www.calix.com/ns/exa/ont-upgrade">
+                        <server>
+                        <hostname/>
+                        </server>
+                    </ont-upgrade>
+                    </system>
+                </config>
+                </filter>
+            </get-config>
+        """
+        response = self.dispatch(rpc_command=rpc_command)
+        if not response.ok:
             return NetconfResponse(ok=response.ok, err=response.err)
 
+        xml_dict = xml_to_dict(response.xml)["rpc-reply"]
+        try:
+            servers = xml_dict["data"]["config"]["system"]["ont-upgrade"]["server"]
+        except (KeyError, TypeError):
+            servers = None
+        if not isinstance(servers, list):
+            servers = [servers]
+        hostnames = [
+            server["hostname"]
+            for server in servers
+            if isinstance(server, dict) and server.get("hostname")
+        ]
+        return NetconfResponse(
+            data={"hostname": hostnames[0] if hostnames else None, "hostnames": hostnames}
+        )
+
     def get_upgrade_server_status(self) -> NetconfResponse:
         """
         Get a response from the device containing the ONT-upgrade FTP server status
@@ -403,7 +480,7 @@ class NetconfONTMixin:
         status = None
         if response.ok:
             try:
-                xml_dict = xmltodict.parse(response.xml)["rpc-reply"]
+                xml_dict = xml_to_dict(response.xml)["rpc-reply"]
                 status = xml_dict["data"]["status"]["system"]["ont-upgrade"]["server"][
                     "status"
                 ]
@@ -433,14 +510,77 @@ class NetconfONTMixin:
         response = self.dispatch(rpc_command=rpc_command)
         if response.ok:
             status = None
-            xml_dict = xmltodict.parse(response.xml)["rpc-reply"]
+            xml_dict = xml_to_dict(response.xml)["rpc-reply"]
             if "data" in xml_dict:
                 data = xml_dict["data"]
                 return NetconfResponse(data=data)
 
         return NetconfResponse(ok=response.ok, err=response.err)
 
-    def get_discovered_onts(self) -> NetconfResponse:
+    def get_ont_count(self) -> NetconfResponse:
+        """Gets the number of ONT linkages on the system without reading the
+        linkages themselves.  Returns data={"ont-count": int}."""
+
+        nc_filter = """
+            <filter xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+                <status xmlns="http://www.calix.com/ns/exa/base">
+                    <system>
+                        <ont-linkages xmlns="http://www.calix.com/ns/exa/gpon-interface-base">
+                            <ont-count/>
+                        </ont-linkages>
+                    </system>
+                </status>
+            </filter>
+        """
+        response = self.get(nc_filter)
+
+        if response.ok:
+            count = 0
+            xml_dict = xml_to_dict(response.xml)["rpc-reply"]
+            try:
+                count = int(
+                    xml_dict["data"]["status"]["system"]["ont-linkages"]["ont-count"]
+                )
+            except (KeyError, TypeError, ValueError):
+                pass
+            return NetconfResponse(data={"ont-count": count})
+
+        return NetconfResponse(ok=response.ok, err=response.err)
+
+    def get_discovered_onts(
+        self, shard_threshold=2000, cards=None, window=4, sharded=None
+    ) -> NetconfResponse:
+        """
+        Gets the discovered ONT linkages.  By default the ONTs are counted
+        first and systems with more than shard_threshold ONTs are read one
+        shelf/slot at a time, with up to window shard requests outstanding
+        on the session.  Smaller systems are read with a single request.
+        sharded=False, or a shard_threshold of None, always uses a single
+        request without counting the ONTs; sharded=True always shards.
+
+        cards is a list of (shelf, slot) pairs to shard over defaulting to
+        discovery_cards, or if that is None, to the cards with PON
+        interfaces.  If the sharded reads do not add up to the ONT count,
+        ONTs being discovered while they were read, the ONTs are counted and
+        the shards read again once; if they still do not add up an error is
+        returned rather than reading every linkage in one request, which is
+        what times out on large systems.
+        """
+
+        count = None
+        if sharded is None:
+            sharded = False
+            if shard_threshold is not None:
+                response = self.get_ont_count()
+                if not response.ok:
+                    return response
+                count = response.data["ont-count"]
+                sharded = count > shard_threshold
+        if sharded:
+            response = self._get_discovered_onts_sharded(cards, window, count)
+            if response is not None:
+                return response
+
         rpc_command = """
         <get xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
         <filter>
@@ -464,15 +604,88 @@ class NetconfONTMixin:
 
         response = self.dispatch(rpc_command=rpc_command)
         if response.ok:
-            xml_dict = xmltodict.parse(response.xml)["rpc-reply"]
-            if "data" in xml_dict:
-                discovered = xml_dict["data"]["status"]["system"]["ont-linkages"][
-                    "ont-linkage"
-                ]
+            discovered = self.parse_reply(parse_ont_linkages, response)
+            if discovered is not None:
                 return NetconfResponse(data={"discovered onts": discovered})
 
         return NetconfResponse(ok=response.ok, err=response.err)
 
+    def _get_discovered_onts_sharded(
+        self, cards=None, window=4, count=None, retries=1
+    ) -> NetconfResponse | None:
+        """Reads the ONT linkages with one content matched request per
+        shelf/slot, pipelined on the session, and merges them.  Returns None
+        if the cards are not known.  If the merged linkages do not add up to
+        the ONT count they are counted and read again up to retries times,
+        then an error is returned, e.g. for ONTs on a card missing from
+        cards."""
+
+        template = """
+        <get xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+        <filter>
+        <status xmlns="http://www.calix.com/ns/exa/base">
+            <system>
+            <ont-linkages xmlns="http://www.calix.com/ns/exa/gpon-interface-base">
+                <ont-linkage>
+                <ont-id/>
+                <shelf-id>{{shelf}}</shelf-id>
+                <slot-id>{{slot}}</slot-id>
+                <pon-port/>
+                <state/>
+                </ont-linkage>
+            </ont-linkages>
+            </system>
+        </status>
+        </filter>
+        </get>
+        """
+        template = jinja_env().from_string(template)
+
+        if cards is None:
+            cards = self.discovery_cards
+        if cards is None:
+            cards = self.getcfg_pon_cards()
+        if not cards:
+            return None
+        if count is None:
+            response = self.get_ont_count()
+            if not response.ok:
+                return response
+            count = response.data["ont-count"]
+        rpc_commands = (
+            template.render(shelf=shelf, slot=slot) for shelf, slot in cards
+        )
+
+        parsed = []
+        for response in self.dispatch_pipelined(rpc_commands, window=window):
+            if not response.ok:
+                return NetconfResponse(ok=response.ok, err=response.err)
+            parsed.append(self.submit_parse(parse_ont_linkages, response))
+
+        discovered = []
+        for future in parsed:
+            linkages = future.result()
+            if linkages is None:
+                continue
+            if isinstance(linkages, dict):
+                linkages = [linkages]
+            discovered.extend(linkages)
+
+        if len(discovered) != count:
+            if retries > 0:
+                # ONTs discovered or lost while the shards were read
+                return self._get_discovered_onts_sharded(
+                    cards, window, retries=retries - 1
+                )
+            return NetconfResponse(
+                ok=False,
+                err=f"Sharded discovery read {len(discovered)} ONT linkages "
+                f"on {len(cards)} cards, the ONT count is {count}",
+            )
+        if not discovered:
+            return NetconfResponse()
+        return NetconfResponse(data={"discovered onts": discovered})
+
     def get_ont_states(self) -> NetconfResponse:
         rpc_command = """
         <get xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
@@ -493,10 +706,80 @@ class NetconfONTMixin:
 
         response = self.dispatch(rpc_command=rpc_command)
         if response.ok:
-            try:
-                xml_dict = xmltodict.parse(response.xml)["rpc-reply"]
-                states = xml_dict["data"]["status"]["system"]["ont"]
+            states = self.parse_reply(parse_ont_states, response)
+            if states is not None:
                 return NetconfResponse(data={"states": states})
-            except (KeyError, TypeError):
-                status = None
         return NetconfResponse(ok=response.ok, err=response.err)
+
+    def get_ont_optics(self, ontids, shard_size=500, window=4) -> NetconfResponse:
+        """
+        Gets the optical levels of many ONTs, one request per shard_size ids
+        pipelined on the session.  Returns column data
+        {"ont-ids": [ont-id], leaf: [float | None], ...} for each leaf in
+        ONT_OPTICS_LEAVES, ONTs not found are left out.
+        """
+        return self._get_ont_status_leaves(
+            ontids, ONT_OPTICS_LEAVES, shard_size=shard_size, window=window
+        )
+
+    def get_ont_pon_statistics(
+        self, ontids, shard_size=500, window=4
+    ) -> NetconfResponse:
+        """
+        Gets the PON error counters of many ONTs, one request per shard_size
+        ids pipelined on the session.  Returns column data
+        {"ont-ids": [ont-id], leaf: [float | None], ...} for each leaf in
+        ONT_PON_COUNTER_LEAVES, ONTs not found are left out.
+        """
+        return self._get_ont_status_leaves(
+            ontids, ONT_PON_COUNTER_LEAVES, shard_size=shard_size, window=window
+        )
+
+    def _get_ont_status_leaves(
+        self, ontids, leaves, shard_size=500, window=4
+    ) -> NetconfResponse:
+        """Reads the given ONT status leaves for many ONTs as numeric columns."""
+
+        template = """
+        <get xmlns="urn:ietf:params:xml:ns:netconf:base:1.0">
+        <filter>
+        <status xmlns="http://www.calix.com/ns/exa/base">
+            <system>
+            {% for ontid in ontids %}
+            <ont xmlns="http://www.calix.com/ns/exa/gpon-interface-base">
+                <ont-id>{{ontid}}</ont-id>
+                <status>
+                {% for leaf in leaves %}
+                <{{leaf}}/>
+                {% endfor %}
+                </status>
+            </ont>
+            {% endfor %}
+            </system>
+        </status>
+        </filter>
+        </get>
+        """
+        template = jinja_env().from_string(template)
+
+        ontids = [str(ontid) for ontid in ontids]
+        rpc_commands = (
+            template.render(ontids=ontids[start : start + shard_size], leaves=leaves)
+            for start in range(0, len(ontids), shard_size)
+        )
+
+        parsed = []
+        for response in self.dispatch_pipelined(rpc_commands, window=window):
+            if not response.ok:
+                return NetconfResponse(ok=response.ok, err=response.err)
+            parsed.append(self.submit_parse(parse_ont_status_leaves, response, leaves))
+
+        columns = {"ont-ids": []}
+        columns.update({leaf: [] for leaf in leaves})
+        for future in parsed:
+            shard_ontids, shard_columns = future.result()
+            columns["ont-ids"].extend(shard_ontids)
+            for leaf in leaves:
+                columns[leaf].extend(shard_columns[leaf])
+
+        return NetconfResponse(data=columns)
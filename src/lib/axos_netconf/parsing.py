@@ -0,0 +1,129 @@
+"""
+Reply parsers of the Netconf mixins.
+
+Decoding a large reply (xmltodict or lxml) holds the GIL, so in a fan-out
+run across many sessions every other session thread stops receiving while
+one reply is decoded.  The parsers are module level functions taking the
+reply, as bytes or a file like reader, and returning plain lists, dicts
+and strings, so a session given a process pool runs them in a worker
+process:
+
+    pool = create_parse_pool()
+    conn = NetconfSession(..., parse_pool=pool)
+
+Without a pool they run inline in the calling thread.  One pool is meant
+to be shared by all sessions of a process.
+
+Design choices:
+* Workers are spawned rather than forked, forking a process with session
+    threads running is not safe.  Scripts must set PYTHONPATH so workers can
+    import this module (see the script headers).
+* Only the reply bytes are sent to a worker, or the path of a reply
+    spilled to disk (see framing.py), and only the records the caller needs
+    are sent back.
+"""
+
+import re
+
+NUMBER_REGEX = re.compile(r"[-+]?\d+(?:\.\d+)?")
+
+
+def create_parse_pool(max_workers: int | None = None):
+    """Return a process pool for NetconfSession(parse_pool=...), max_workers
+    defaulting to the number of CPUs."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    return ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+def parse_file(parser, path, *args):
+    """Return parser(reply, *args) of the reply read from the file at path,
+    run by pool workers for spilled replies."""
+    with open(path, "rb") as reply:
+        return parser(reply, *args)
+
+
+def xml_to_dict(xml, **kwargs) -> dict:
+    """Return xml_to_dict(xml), xmltodict being imported at first use."""
+    import xmltodict
+
+    return xmltodict.parse(xml, **kwargs)
+
+
+def _status_onts(xml) -> list:
+    """Return the status/system/ont entries of a reply as a list."""
+    xml_dict = xml_to_dict(xml)["rpc-reply"]
+    try:
+        onts = xml_dict["data"]["status"]["system"]["ont"]
+    except (KeyError, TypeError):
+        return []
+    if isinstance(onts, dict):
+        onts = [onts]
+    return onts
+
+
+def parse_ont_states(xml):
+    """Return the ONT entries of a get_ont_states reply, None if the reply
+    has no ONTs."""
+    xml_dict = xml_to_dict(xml)["rpc-reply"]
+    try:
+        return xml_dict["data"]["status"]["system"]["ont"]
+    except (KeyError, TypeError):
+        return None
+
+
+def parse_ont_oper_states(xml) -> dict:
+    """Return {ont-id: oper-state} of an ONT status reply."""
+    return {
+        ont["ont-id"]: (ont.get("status") or {}).get("oper-state")
+        for ont in _status_onts(xml)
+    }
+
+
+def parse_ont_linkages(xml):
+    """Return the ont-linkage entries of a discovered ONTs reply, None if the
+    reply has no data."""
+    xml_dict = xml_to_dict(xml)["rpc-reply"]
+    if "data" not in xml_dict:
+        return None
+    try:
+        return xml_dict["data"]["status"]["system"]["ont-linkages"]["ont-linkage"]
+    except (KeyError, TypeError):
+        return None
+
+
+def parse_ont_status_leaves(xml, leaves) -> tuple:
+    """Return ([ont-id], {leaf: [float | None]}) of an ONT status reply."""
+    ontids = []
+    columns = {leaf: [] for leaf in leaves}
+    for ont in _status_onts(xml):
+        status = ont.get("status") or {}
+        ontids.append(ont["ont-id"])
+        for leaf in leaves:
+            columns[leaf].append(_to_number(status.get(leaf)))
+    return ontids, columns
+
+
+def parse_vlan_ids(xml) -> list | None:
+    """Return the VLAN ids of a get_vlan_ids reply, None if the reply has no
+    data."""
+    data = xml_to_dict(xml)["rpc-reply"]["data"]
+    if data is None:
+        return None
+    vlans = data["config"]["system"]["vlan"]
+    if isinstance(vlans, dict):
+        vlans = [vlans]
+    return [vlan["vlan-id"] for vlan in vlans]
+
+
+def _to_number(value) -> float | None:
+    """Convert a status leaf such as "-18.52" or "-18.52 dBm" to a float."""
+    if isinstance(value, dict):
+        value = value.get("#text")
+    if value is None:
+        return None
+    match = NUMBER_REGEX.match(str(value).strip())
+    return float(match.group()) if match else None
@@ -2,10 +2,7 @@
 Collection of Netconf methods related to profiles
 """
 
-import xmltodict
-import jinja2
-
-JENV = jinja2.Environment(autoescape=True)
+from lib.axos_netconf.parsing import xml_to_dict
 
 
 class NetconfProfilesMixin:
@@ -23,11 +20,13 @@ class NetconfProfilesMixin:
             </config>
         """
 
-        response = self.get_config(nc_filter=("subtree", nc_filter))
+        response = self.get_config(
+            nc_filter=("subtree", nc_filter), with_defaults="report-all"
+        )
 
         data = {}
-        if xmltodict.parse(response.xml)["rpc-reply"]["data"] is not None:
-            details = xmltodict.parse(response.xml)["rpc-reply"]["data"]["config"][
+        if xml_to_dict(response.xml)["rpc-reply"]["data"] is not None:
+            details = xml_to_dict(response.xml)["rpc-reply"]["data"]["config"][
                 "profile"
             ]
 
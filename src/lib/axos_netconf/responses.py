@@ -1,14 +1,80 @@
 import re
 
 
+class _BufferReader:
+    """File like reader over a buffer, each reader has its own position."""
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        self._position = 0
+
+    def read(self, size=-1):
+        start = self._position
+        end = len(self._buffer) if size is None or size < 0 else start + size
+        self._position = min(end, len(self._buffer))
+        return self._buffer[start : self._position]
+
+
 class NetconfResponse:
-    """Model for all session returns."""
+    """Model for all session returns.
 
-    def __init__(self, ok=True, err=None, data=None, xml=None):
+    A reply spilled to disk (see framing.py) is held as a memory mapped
+    buffer instead of xml text.  xml decodes it on every access, streaming
+    parsers should read buffer, open() or iterparse() instead.
+    """
+
+    def __init__(self, ok=True, err=None, data=None, xml=None, buffer=None):
         self.ok = ok
         if err is not None:
             # Remove marking present
             err = re.sub(r"\s*\^\n", "", err)
         self.err = err
         self.data = data
-        self.xml = xml
+        self._xml = xml
+        self._buffer = buffer
+
+    @property
+    def error(self):
+        """Alias of err matching the ncclient reply attribute."""
+        return self.err
+
+    @property
+    def xml(self):
+        if self._xml is None and self._buffer is not None:
+            return str(self._buffer, "utf-8")
+        return self._xml
+
+    @xml.setter
+    def xml(self, xml):
+        self._xml = xml
+        self._buffer = None
+
+    @property
+    def spilled(self) -> bool:
+        """True if the reply is held on disk rather than in memory."""
+        return self._buffer is not None
+
+    @property
+    def path(self):
+        """Return the path of the file holding a spilled reply, None for
+        replies held in memory.  The file is removed once the response and
+        every other reference to its buffer are released."""
+        return getattr(self._buffer, "path", None)
+
+    @property
+    def buffer(self):
+        """Return the reply as UTF-8 bytes or a memory mapped buffer."""
+        if self._buffer is not None:
+            return self._buffer
+        return self._xml.encode("utf-8") if self._xml is not None else None
+
+    def open(self):
+        """Return a file like reader of the reply for etree.parse and
+        other streaming parsers."""
+        return _BufferReader(self.buffer or b"")
+
+    def iterparse(self, **kwargs):
+        """Return an lxml iterparse iterator over the reply."""
+        from lxml import etree
+
+        return etree.iterparse(self.open(), **kwargs)
@@ -4,16 +4,54 @@ Core set of Netconf session operations.
 Design choices:
 * known issue with ncclient create_subscription with using filters
 * All create_subscription functions will use dispatch
+* A session may be shared between threads.  ncclient serializes writes to
+    the SSH channel and correlates replies by message-id so each thread
+    waits only for its own reply while others have requests in flight.
+    Connecting and reconnecting are serialized by the session.
+* Notifications are taken on a separate session (open_notification_session)
+    so they never queue up behind, or in front of, RPC replies.  ncclient
+    does not support a second channel on the same SSH transport.
 
 """
 
-import ncclient
-from ncclient.operations import RPCError
-from ncclient import manager
-from lxml import etree
+import threading
 
 from lib.axos_netconf.errors import NetconfAuthenticationError, NetconfSessionError
 from lib.axos_netconf.responses import NetconfResponse
+from lib.axos_netconf.ssh_profile import ssh_connect_params, tuned_transport
+
+
+class _Flight:
+    """A read in progress shared by every caller asking for it."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.response = None
+        self.error = None
+
+
+def _canonical(xml) -> str:
+    """Return XML text, or an element, in canonical form so equivalent
+    filters written differently compare equal."""
+    from lxml import etree
+
+    try:
+        if isinstance(xml, str):
+            xml = etree.fromstring(
+                xml, parser=etree.XMLParser(remove_blank_text=True)
+            )
+        return etree.tostring(xml, method="c14n").decode("utf-8")
+    except (etree.LxmlError, ValueError):
+        # xpath or fragment filter
+        return " ".join(str(xml).split())
+
+
+def _filter_key(nc_filter):
+    if nc_filter is None:
+        return None
+    if isinstance(nc_filter, tuple):
+        return (nc_filter[0], _canonical(nc_filter[1]))
+    return _canonical(nc_filter)
 
 
 class NetconfSessionMixin:
@@ -22,7 +60,19 @@ class NetconfSessionMixin:
     a wrapper around the ncclient.manager class.
     """
 
-    def __init__(self, hostname, port, timeout, username, password, devicename=None):
+    def __init__(
+        self,
+        hostname,
+        port,
+        timeout,
+        username,
+        password,
+        devicename=None,
+        with_defaults=None,
+        ssh_profile=None,
+        spill_threshold=None,
+        parse_pool=None,
+    ):
         self.hostname = hostname
         self.port = port
         self.timeout = timeout
@@ -31,6 +81,23 @@ class NetconfSessionMixin:
         self.password = password
         self.session = None
         self.devicename = devicename
+        # get-config with-defaults mode (report-all, trim, explicit,
+        # report-all-tagged), None leaves it to the device
+        self.with_defaults = with_defaults
+        # SSH auth and algorithm settings, see ssh_profile.py
+        self.ssh_profile = ssh_profile
+        # replies over spill_threshold bytes are kept on disk memory mapped,
+        # None keeps every reply in memory
+        self.spill_threshold = spill_threshold
+        # process pool running reply parsers, see parsing.py
+        self.parse_pool = parse_pool
+        self._reply_stats = {}
+        # concurrent identical reads share one rpc
+        self.singleflight = True
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self._flight_stats = {"reads": 0, "coalesced": 0}
+        self._connect_lock = threading.RLock()
 
     def connect(self, retry=True):
         """Attempt to establish a netconf session.  If retry is True, then
@@ -40,24 +107,44 @@ class NetconfSessionMixin:
         to the device once.  If the connection fails, then the connect
         session will raise a NetconfSessionError exception.
         """
+        with self._connect_lock:
+            return self._connect(retry)
+
+    def _connect(self, retry):
+        import ncclient.transport
+        from ncclient import manager
+        from lib.axos_netconf.framing import ChunkedFramingDeviceHandler
+
         if retry:
             retry = 0
         else:
             retry = self.retry - 1
 
+        # only password authentication unless the ssh profile says otherwise
+        auth_params = ssh_connect_params(self.ssh_profile)
+        password = self.password
+        if self.ssh_profile and "password" not in (
+            self.ssh_profile.get("auth_order") or ["password"]
+        ):
+            password = None
+
         while retry < self.retry:
             try:
-                # allow_agents = False when authentication via username/password
-                self.session = manager.connect(
-                    host=self.hostname,
-                    port=self.port,
-                    username=self.username,
-                    password=self.password,
-                    hostkey_verify=False,
-                    timeout=self.timeout,
-                    allow_agent=False,
-                    device_params={"name": "default"},
-                )
+                with tuned_transport(self.ssh_profile):
+                    self.session = manager.connect(
+                        host=self.hostname,
+                        port=self.port,
+                        username=self.username,
+                        password=password,
+                        hostkey_verify=False,
+                        timeout=self.timeout,
+                        device_params={
+                            "name": "default",
+                            "handler": ChunkedFramingDeviceHandler,
+                            "spill_threshold": self.spill_threshold,
+                        },
+                        **auth_params,
+                    )
                 break
             except ncclient.transport.AuthenticationError as err:
                 self.session = None
@@ -83,9 +170,33 @@ class NetconfSessionMixin:
 
     def disconnect(self):
         """Close the netconf session"""
-        if self.session is not None:
-            self.session.close_session()
-            self.session = None
+        with self._connect_lock:
+            if self.session is not None:
+                session, self.session = self.session, None
+                session.close_session()
+
+    def clone(self):
+        """Return a new, not yet connected, session to the same device using
+        the same connection parameters."""
+        return type(self)(
+            self.hostname,
+            self.port,
+            self.timeout,
+            self.username,
+            self.password,
+            devicename=self.devicename,
+            with_defaults=self.with_defaults,
+            ssh_profile=self.ssh_profile,
+            spill_threshold=self.spill_threshold,
+            parse_pool=self.parse_pool,
+        )
+
+    def open_notification_session(self):
+        """Return a new connected session to the same device for taking
+        notifications, leaving this session to carry RPCs only."""
+        conn = self.clone()
+        conn.connect()
+        return conn
 
     def __enter__(self):
         """Context manager establish a netconf session"""
@@ -102,43 +213,64 @@ class NetconfSessionMixin:
         connected, then raise a NetconfSessionError exception.
         """
 
-        if self.session is None or not self.session.connected:
+        if self.session is not None and self.session.connected:
+            return
+        with self._connect_lock:
+            # another thread may have reconnected while waiting for the lock
+            if self.session is not None and self.session.connected:
+                return
             try:
-                self.session.connect()
+                self.connect()
             except Exception as err:
                 raise NetconfSessionError(
                     f"Failed to reconnect to device: {err}"
                 ) from err
 
-    def get_config(self, nc_filter=None):
+    def get_config(self, nc_filter=None, with_defaults=None):
         """Get the running config from the device.  If filter is not None,
         get the config based on the filter.  The filter may be a
-        subtree filter or an xpath filter."""
+        subtree filter or an xpath filter.  with_defaults selects the
+        with-defaults mode for this call, by default the session
+        with_defaults is used."""
 
-        self.__check_session_connected()
+        if with_defaults is None:
+            with_defaults = self.with_defaults
 
-        try:
-            response = self.session.get_config(
-                "running", filter=nc_filter, with_defaults="report-all"
-            )
-            return response
-        except Exception as err:
-            raise NetconfSessionError(f"Netconf get-config failed: {err}") from err
+        def _get_config():
+            self.__check_session_connected()
+            try:
+                response = self.session.get_config(
+                    "running", filter=nc_filter, with_defaults=with_defaults
+                )
+                return self._reply_response("get-config", response.xml)
+            except Exception as err:
+                raise NetconfSessionError(f"Netconf get-config failed: {err}") from err
+
+        return self._read_once(
+            ("get-config", "running", with_defaults, _filter_key(nc_filter)),
+            _get_config,
+        )
 
     def get(self, nc_filter=None):
         """Get from the device.  This is not for use for configuration.  If filter
         is not None get the config based on the filter.  The filter may be a
         subtree filter or an xpath filter."""
-        self.__check_session_connected()
 
-        try:
-            response = self.session.get(filter=nc_filter)
-            return response
-        except Exception as err:
-            raise NetconfSessionError(f"Netconf get failed: {err}") from err
+        def _get():
+            self.__check_session_connected()
+            try:
+                response = self.session.get(filter=nc_filter)
+                return self._reply_response("get", response.xml)
+            except Exception as err:
+                raise NetconfSessionError(f"Netconf get failed: {err}") from err
+
+        return self._read_once(
+            ("get", "operational", None, _filter_key(nc_filter)), _get
+        )
 
     def edit_config(self, config):
         """Edit the running config on the device."""
+        from ncclient.operations import RPCError
 
         self.__check_session_connected()
 
@@ -151,22 +283,176 @@ class NetconfSessionMixin:
             raise NetconfSessionError(f"Netconf edit-config failed: {err}") from err
 
     def dispatch(self, rpc_command):
-        """Dispatch an RPC execute command to the device."""
+        """Dispatch an RPC execute command to the device.  Concurrent
+        identical get and get-config commands share one rpc."""
+        from lxml import etree
+        from ncclient.operations import RPCError
+
+        rpc_element = etree.fromstring(rpc_command)
+
+        def _dispatch():
+            self.__check_session_connected()
+            try:
+                response = self.session.dispatch(rpc_command=rpc_element)
+                return self._reply_response("dispatch", response.xml)
+            except RPCError as err:
+                return NetconfResponse(ok=False, err=err.args[0])
+            except Exception as err:
+                raise NetconfSessionError(f"Netconf dispatch failed: {err}") from err
+
+        if etree.QName(rpc_element).localname not in ("get", "get-config"):
+            return _dispatch()
+        return self._read_once(
+            ("dispatch", None, None, _canonical(rpc_element)), _dispatch
+        )
+
+    def get_reply_stats(self) -> dict:
+        """Return {operation: {"replies": count, "size": bytes}} of the
+        replies received by get, get_config and dispatch."""
+        with self._flights_lock:
+            return {op: dict(stats) for op, stats in self._reply_stats.items()}
+
+    def reset_reply_stats(self):
+        with self._flights_lock:
+            self._reply_stats = {}
+
+    def _reply_response(self, operation, xml) -> NetconfResponse:
+        """Count a reply and return it as a NetconfResponse, backed by the
+        memory mapped reply if it was spilled to disk."""
+        from lib.axos_netconf.framing import spilled_buffer
+
+        buffer = spilled_buffer(xml)
+        self._count_reply(operation, xml if buffer is None else buffer)
+        return NetconfResponse(xml=xml if buffer is None else None, buffer=buffer)
+
+    def submit_parse(self, parser, response: NetconfResponse, *args):
+        """Run parser(reply, *args), a module level parser of parsing.py,
+        in the parse pool of the session returning a Future.  Without a pool
+        the parser runs inline.
+
+        The reply is passed as bytes, or for a spilled reply as a file like
+        reader with its own position, so a response shared by single-flight
+        readers can be parsed any number of times.  Pool workers read a
+        spilled reply from its file rather than being sent a copy."""
+        from concurrent.futures import Future
+        from lib.axos_netconf.parsing import parse_file
+
+        if self.parse_pool is not None:
+            if response.path is None:
+                return self.parse_pool.submit(parser, response.buffer, *args)
+            future = self.parse_pool.submit(parse_file, parser, response.path, *args)
+            # the file is removed with its buffer, keep it until parsed
+            buffer = response.buffer
+            future.add_done_callback(lambda _: buffer)
+            return future
+
+        future = Future()
+        try:
+            reply = response.open() if response.spilled else response.buffer
+            future.set_result(parser(reply, *args))
+        except Exception as err:
+            future.set_exception(err)
+        return future
+
+    def parse_reply(self, parser, response: NetconfResponse, *args):
+        """Return parser(reply, *args), see submit_parse."""
+        return self.submit_parse(parser, response, *args).result()
+
+    def _count_reply(self, operation, xml):
+        with self._flights_lock:
+            stats = self._reply_stats.setdefault(operation, {"replies": 0, "size": 0})
+            stats["replies"] += 1
+            if isinstance(xml, str):
+                # _Message returns its received bytes without encoding
+                xml = xml.encode("utf-8")
+            stats["size"] += len(xml) if xml else 0
+
+    def get_singleflight_stats(self) -> dict:
+        """Return the number of reads made and how many of them were served
+        by a read already in flight."""
+        with self._flights_lock:
+            stats = dict(self._flight_stats)
+            stats["in flight"] = len(self._flights)
+        return stats
+
+    def _read_once(self, key, read):
+        """Call read() unless an identical read is already in flight, in which
+        case wait for it and share its response."""
+        if not self.singleflight:
+            return read()
+
+        with self._flights_lock:
+            self._flight_stats["reads"] += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+            else:
+                self._flight_stats["coalesced"] += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.response
+
+        try:
+            flight.response = read()
+            return flight.response
+        except Exception as err:
+            flight.error = err
+            raise
+        finally:
+            with self._flights_lock:
+                del self._flights[key]
+            flight.event.set()
+
+    def dispatch_pipelined(self, rpc_commands, window=8):
+        """Dispatch several RPC execute commands without waiting for each reply
+        before sending the next, keeping up to window requests outstanding.
+        Yields a NetconfResponse per command in the order given."""
+        from lxml import etree
+        from ncclient.operations import Dispatch, RaiseMode, TimeoutExpiredError
 
         self.__check_session_connected()
 
+        outstanding = []
+        rpc_commands = iter(rpc_commands)
         try:
-            response = self.session.dispatch(
-                rpc_command=(etree.fromstring(rpc_command))
-            )
-            return NetconfResponse(xml=response.xml)
-        except RPCError as err:
-            return NetconfResponse(ok=False, err=err.args[0])
+            while True:
+                for rpc_command in rpc_commands:
+                    rpc = Dispatch(
+                        self.session._session,
+                        device_handler=self.session._device_handler,
+                        async_mode=True,
+                        timeout=self.timeout,
+                        raise_mode=RaiseMode.NONE,
+                    )
+                    rpc.request(rpc_command=etree.fromstring(rpc_command))
+                    outstanding.append(rpc)
+                    if len(outstanding) >= window:
+                        break
+                if not outstanding:
+                    return
+
+                rpc = outstanding.pop(0)
+                if not rpc.event.wait(self.timeout):
+                    raise TimeoutExpiredError(
+                        "ncclient timed out while waiting for an rpc reply."
+                    )
+                if rpc.error is not None:
+                    raise rpc.error
+                if rpc.reply.error is not None:
+                    yield NetconfResponse(ok=False, err=rpc.reply.error.args[0])
+                else:
+                    yield self._reply_response("dispatch", rpc.reply.xml)
         except Exception as err:
             raise NetconfSessionError(f"Netconf dispatch failed: {err}") from err
 
     def take_session_notification(self, block=False, timeout=30):
         """Attempt to retrieve notification from queue of received notifications."""
+        from ncclient.operations import RPCError
 
         self.__check_session_connected()
 
@@ -181,3 +467,22 @@ class NetconfSessionMixin:
             raise NetconfSessionError(
                 f"Netconf take_notification failed: {err}"
             ) from err
+
+    def add_notification_listener(self, callback, errback=None):
+        """Deliver notifications received on this session to callback(xml) as
+        they arrive instead of queueing them for take_session_notification.
+        errback(err) is called if the session transport fails.
+
+        The listener is bound to the current connection and must be added
+        again after a reconnect.
+        """
+        from ncclient.transport.session import NotificationHandler
+        from lib.axos_netconf.listeners import NotificationForwarder
+
+        self.__check_session_connected()
+
+        transport = self.session._session
+        handler = transport.get_listener_instance(NotificationHandler)
+        if handler is not None:
+            transport.remove_listener(handler)
+        transport.add_listener(NotificationForwarder(callback, errback))
@@ -0,0 +1,144 @@
+"""
+SSH transport tuning for Netconf sessions.
+
+An SSH profile is a dictionary of connection settings:
+
+    {
+        "auth_order": ["password"],         # password, publickey, agent
+        "look_for_keys": False,             # search ~/.ssh for keys
+        "key_filename": None,               # key file or list of key files
+        "kex": ["curve25519-sha256"],       # preferred key exchange
+        "ciphers": ["aes128-ctr"],          # preferred ciphers
+        "macs": ["hmac-sha2-256"],          # preferred MACs
+        "compression": False,               # SSH compression
+    }
+
+Design choices:
+* ncclient always tries keys (key_filename, agent, ~/.ssh) before the
+    password, auth_order therefore selects which methods are tried rather
+    than reordering them.
+* ncclient creates its paramiko Transport internally with no hook to set
+    algorithms before negotiation, its sock argument only replaces the
+    socket.  paramiko.Transport is replaced by a subclass applying the
+    profile of the connecting thread only while a tuned connect creates its
+    transport.  The replacement is made under a lock and undone as soon as
+    that transport exists, so tuned connects negotiate concurrently and
+    other threads creating a transport meanwhile get paramiko's defaults.
+    paramiko is only imported when a tuned profile is first used.
+* Preferred algorithms are moved to the front of paramiko's lists, the
+    remaining algorithms are kept so negotiation still succeeds against
+    devices not supporting them.
+"""
+
+import threading
+from contextlib import contextmanager
+
+AUTH_METHODS = ("password", "publickey", "agent")
+
+_LOCAL = threading.local()
+_PATCH_LOCK = threading.Lock()
+_TUNED_TRANSPORT = None
+
+
+def _prefer(preferred, available) -> tuple:
+    """Return available with the preferred algorithms it supports first."""
+    preferred = [name for name in preferred or () if name in available]
+    return tuple(preferred + [name for name in available if name not in preferred])
+
+
+def _tune(transport):
+    """Apply the SSH profile of the current thread to a new transport."""
+    profile = getattr(_LOCAL, "profile", None)
+    if not profile:
+        return
+    options = transport.get_security_options()
+    if profile.get("kex"):
+        options.kex = _prefer(profile["kex"], options.kex)
+    if profile.get("ciphers"):
+        options.ciphers = _prefer(profile["ciphers"], options.ciphers)
+    if profile.get("macs"):
+        options.digests = _prefer(profile["macs"], options.digests)
+    if profile.get("compression"):
+        transport.use_compression(True)
+
+
+def _tuned_transport_class(transport_class):
+    """Return the subclass of paramiko's Transport applying the SSH profile
+    of the current thread, transport_class being the original."""
+    global _TUNED_TRANSPORT
+
+    if _TUNED_TRANSPORT is None:
+
+        class _TunedTransport(transport_class):
+            """paramiko Transport applying the SSH profile of the current
+            thread."""
+
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                _tune(self)
+                _unpatch()
+
+        _TUNED_TRANSPORT = _TunedTransport
+    return _TUNED_TRANSPORT
+
+
+def _patch():
+    """Replace paramiko.Transport until this thread creates a transport."""
+    import paramiko
+
+    _PATCH_LOCK.acquire()
+    _LOCAL.original = paramiko.Transport
+    paramiko.Transport = _tuned_transport_class(paramiko.Transport)
+
+
+def _unpatch():
+    """Restore paramiko.Transport if this thread replaced it."""
+    original = getattr(_LOCAL, "original", None)
+    if original is None:
+        return
+    import paramiko
+
+    paramiko.Transport = original
+    _LOCAL.original = None
+    _PATCH_LOCK.release()
+
+
+def ssh_connect_params(profile: dict | None) -> dict:
+    """Return the ncclient manager.connect authentication arguments for a
+    profile.  Without a profile only password authentication is used."""
+    if not profile:
+        return {"allow_agent": False, "look_for_keys": False}
+
+    auth_order = profile.get("auth_order") or ["password"]
+    unknown = set(auth_order) - set(AUTH_METHODS)
+    if unknown:
+        raise ValueError(f"Unknown SSH auth methods {sorted(unknown)}")
+
+    params = {
+        "allow_agent": "agent" in auth_order,
+        "look_for_keys": "publickey" in auth_order
+        and bool(profile.get("look_for_keys")),
+    }
+    if "publickey" in auth_order and profile.get("key_filename"):
+        params["key_filename"] = profile["key_filename"]
+    return params
+
+
+@contextmanager
+def tuned_transport(profile: dict | None):
+    """Apply the algorithm and compression settings of profile to the
+    first SSH transport created by this thread within the context."""
+    tuned = profile and any(
+        profile.get(name) for name in ("kex", "ciphers", "macs", "compression")
+    )
+    if not tuned:
+        yield
+        return
+    _patch()
+    _LOCAL.profile = profile
+    try:
+        yield
+    finally:
+        # still replaced if the connect failed before creating its transport
+        _unpatch()
+        _LOCAL.profile = None
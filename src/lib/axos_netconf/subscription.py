@@ -2,7 +2,7 @@
 Netconf subscription related methods (pubsub)
 """
 
-import xmltodict
+from lib.axos_netconf.parsing import xml_to_dict
 import copy
 
 
@@ -25,7 +25,7 @@ class NetconfSubscriptionMixin:
         response = self.dispatch(rpc_command=get_event_stream_list_rpc_cmd)
 
         if response.ok:
-            xml_dict = xmltodict.parse(response.xml)["rpc-reply"]
+            xml_dict = xml_to_dict(response.xml)["rpc-reply"]
             try:
                 streams = xml_dict["data"]["netconf"]["streams"]["stream"]
             except (KeyError, TypeError):
@@ -98,9 +98,15 @@ class NetconfSubscriptionMixin:
         if response.ok:
             if response.xml is None:
                 return self.NetconfResponse(data=None)
-            xml_dict = xmltodict.parse(response.xml)["notification"]
-            if "@xmlns" in xml_dict:
-                del xml_dict["@xmlns"]
-            return self.NetconfResponse(data=xml_dict)
+            return self.NetconfResponse(data=self.parse_notification(response.xml))
 
         return self.NetconfResponse(ok=False, err=response.err)
+
+    def parse_notification(self, xml: str) -> dict:
+        """Convert a raw notification into the dictionary form returned by
+        take_notification."""
+
+        xml_dict = xml_to_dict(xml)["notification"]
+        if "@xmlns" in xml_dict:
+            del xml_dict["@xmlns"]
+        return xml_dict
@@ -2,7 +2,7 @@
 Collection of Netconf methods related to system level operations.
 """
 
-import xmltodict
+from lib.axos_netconf.parsing import xml_to_dict
 from lib.axos_netconf.responses import NetconfResponse
 
 
@@ -20,7 +20,7 @@ class NetconfSystemMixin:
         """
         response = self.get_config(nc_filter=("subtree", nc_filter))
         if response.ok:
-            location = xmltodict.parse(response.xml)["rpc-reply"]["data"]["config"][
+            location = xml_to_dict(response.xml)["rpc-reply"]["data"]["config"][
                 "system"
             ]["location"]
             return NetconfResponse(
@@ -0,0 +1,15 @@
+"""
+Jinja2 environment shared by the Netconf mixins.
+
+Created at first use so importing the mixins does not import Jinja2.
+"""
+
+import functools
+
+
+@functools.cache
+def jinja_env():
+    """Return the default Jinja2 environment with autoescaping."""
+    import jinja2
+
+    return jinja2.Environment(autoescape=True)
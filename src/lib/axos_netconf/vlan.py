@@ -2,10 +2,8 @@
 Collection of Netconf methods related to vlans
 """
 
-import xmltodict
-import jinja2
-
-JENV = jinja2.Environment(autoescape=True)
+from lib.axos_netconf.parsing import parse_vlan_ids, xml_to_dict
+from lib.axos_netconf.templates import jinja_env
 
 
 class NetconfVlanMixin:
@@ -68,7 +66,7 @@ class NetconfVlanMixin:
                 </config>
             </config>
         """
-        template = JENV.from_string(template)
+        template = jinja_env().from_string(template)
         config = template.render(
             vlan_id=str(vlan_id),
             mode=str(mode),
@@ -98,11 +96,13 @@ class NetconfVlanMixin:
                 </system>
             </config>
         """
-        response = self.get_config(nc_filter=("subtree", nc_filter))
+        response = self.get_config(
+            nc_filter=("subtree", nc_filter), with_defaults="report-all"
+        )
 
         data = {}
-        if xmltodict.parse(response.xml)["rpc-reply"]["data"] is not None:
-            details = xmltodict.parse(response.xml)["rpc-reply"]["data"]["config"][
+        if xml_to_dict(response.xml)["rpc-reply"]["data"] is not None:
+            details = xml_to_dict(response.xml)["rpc-reply"]["data"]["config"][
                 "system"
             ]["vlan"]
             data["vlan_id"] = details["vlan-id"]
@@ -139,16 +139,9 @@ class NetconfVlanMixin:
         response = self.get_config(nc_filter=("subtree", nc_filter))
 
         data = {}
-        if xmltodict.parse(response.xml)["rpc-reply"]["data"] is not None:
-            details = xmltodict.parse(response.xml)["rpc-reply"]["data"]["config"][
-                "system"
-            ]["vlan"]
-            data["vlan_ids"] = []
-            if isinstance(details, list):
-                for vlan_id in details:
-                    data["vlan_ids"].append(vlan_id["vlan-id"])
-            else:
-                data["vlan_ids"].append(details["vlan-id"])
+        vlan_ids = self.parse_reply(parse_vlan_ids, response)
+        if vlan_ids is not None:
+            data["vlan_ids"] = vlan_ids
 
         return {"data": data}
 
@@ -187,8 +180,8 @@ class NetconfVlanMixin:
         """
         response = self.get(nc_filter=nc_filter)
         data = {}
-        if xmltodict.parse(response.xml)["rpc-reply"]["data"] is not None:
-            details = xmltodict.parse(response.xml)["rpc-reply"]["data"]["status"][
+        if xml_to_dict(response.xml)["rpc-reply"]["data"] is not None:
+            details = xml_to_dict(response.xml)["rpc-reply"]["data"]["status"][
                 "system"
             ]["ont-simulation"]["vlans"]["simvlans"]
             data["simvlans"] = []
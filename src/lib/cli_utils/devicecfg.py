@@ -21,6 +21,14 @@ device_conn_params = devices.get_device_connection_params("simob", "netconf")
 
 
 Example device file:
+ssh_profiles:
+    fast:
+        auth_order: ['password']
+        look_for_keys: false
+        kex: ['curve25519-sha256@libssh.org']
+        ciphers: ['aes128-ctr']
+        macs: ['hmac-sha2-256']
+        compression: false
 devices:
     simob:
         type: 'axos'
@@ -32,6 +40,7 @@ devices:
                 password: "calixsupport"
                 port: 830
                 timeout: 60
+                ssh_profile: fast
             ssh:
                 type: 'ssh'
                 host: "10.137.12.159"
@@ -57,7 +66,14 @@ from typing import Optional, Dict, Union, Literal, List, IO
 from ipaddress import IPv4Address, IPv6Address
 from fqdn import FQDN
 import yaml
-from pydantic import BaseModel, constr, Field, field_validator, ConfigDict
+from pydantic import (
+    BaseModel,
+    constr,
+    Field,
+    field_validator,
+    model_validator,
+    ConfigDict,
+)
 
 from lib.cli_utils.errors import DeviceCfgError
 
@@ -126,6 +142,19 @@ class SmxRestConnectionModel(BaseModel):
         return _validate_host(value)
 
 
+class SshProfileModel(BaseModel):
+    """SSH transport tuning parameters referenced by connections"""
+
+    model_config = ConfigDict(extra="ignore")
+    auth_order: List[Literal["password", "publickey", "agent"]] = ["password"]
+    look_for_keys: bool = False
+    key_filename: Optional[Union[str, List[str]]] = None
+    kex: Optional[List[str]] = None
+    ciphers: Optional[List[str]] = None
+    macs: Optional[List[str]] = None
+    compression: bool = False
+
+
 class NetconfConnectionModel(BaseModel):
     """Netconf device connection parameters"""
 
@@ -136,6 +165,7 @@ class NetconfConnectionModel(BaseModel):
     password: constr(max_length=255)
     port: Optional[int] = Field(ge=1, le=65535, default=830)
     timeout: Optional[int] = Field(ge=1, le=120, default=60)
+    ssh_profile: Optional[str] = None
 
     # class Config:
     #     """Pydantic model configuration"""
@@ -220,8 +250,23 @@ class DevicesModel(BaseModel):
     """Multiple devices model"""
 
     model_config = ConfigDict(extra="ignore")
+    ssh_profiles: Optional[Dict[str, SshProfileModel]] = {}
     devices: Dict[str, DeviceModel]
 
+    @model_validator(mode="after")
+    def ssh_profiles_must_exist(self) -> "DevicesModel":
+        """Validate connections only reference defined ssh profiles"""
+        profiles = self.ssh_profiles or {}
+        for device_name, device in self.devices.items():
+            for connection_name, connection in device.connections.items():
+                profile = getattr(connection, "ssh_profile", None)
+                if profile is not None and profile not in profiles:
+                    raise ValueError(
+                        f"Unknown ssh_profile {profile} in device {device_name} "
+                        f"connection {connection_name}"
+                    )
+        return self
+
     # class Config:
     #     """Pydantic model configuration"""
 
@@ -289,7 +334,9 @@ class Devices:
     """Device class for all devices"""
 
     def __init__(self, fileobj: Union[str, IO]):
-        self.__devices = self.__get_devices(fileobj)
+        devices_model = self.__get_devices(fileobj)
+        self.__devices = devices_model.devices
+        self.__ssh_profiles = devices_model.ssh_profiles or {}
 
     @property
     def devices(self) -> DevicesModel:
@@ -301,6 +348,15 @@ class Devices:
         """Return the device names"""
         return list(self.devices.keys())
 
+    @property
+    def ssh_profile_names(self) -> List[str]:
+        """Return the ssh profile names"""
+        return list(self.__ssh_profiles.keys())
+
+    def get_ssh_profile(self, name: str) -> Optional[SshProfileModel]:
+        """Return the ssh profile model or None if not found"""
+        return self.__ssh_profiles.get(name)
+
     def get_device(self, name: str) -> Device:
         """Return the device model or None if not found"""
         device_model = None
@@ -308,14 +364,14 @@ class Devices:
             device_model = Device(self.devices[name])
         return device_model
 
-    def __get_devices(self, fileobj: Union[str, IO]) -> Dict:
-        """Return the validated device model"""
+    def __get_devices(self, fileobj: Union[str, IO]) -> DevicesModel:
+        """Return the validated devices model"""
         data = self.__load_yaml_file(fileobj)
         if data is None or data == {}:
             raise DeviceCfgError("No data in devices yaml file.")
         if len(data.get("devices")) == 0:
             raise DeviceCfgError("No devices defined in devices yaml file.")
-        return DevicesModel(**data).devices
+        return DevicesModel(**data)
 
     # TODO - future remove this method favoring device method
     def get_device_connection_params(
@@ -330,6 +386,16 @@ class Devices:
             )
         return device_connection_params_model
 
+    def get_device_ssh_profile(self, name: str, connection_name: str) -> Optional[dict]:
+        """Return the ssh profile of a device connection as a dictionary
+        suitable for NetconfSession(ssh_profile=...) or None if the
+        connection has none"""
+        connection_params = self.get_device_connection_params(name, connection_name)
+        profile_name = getattr(connection_params, "ssh_profile", None)
+        if profile_name is None:
+            return None
+        return self.get_ssh_profile(profile_name).model_dump()
+
     def __load_yaml_file(self, fileobj: Union[str, IO]) -> dict:
         """Return configuration file as dictionary."""
         try:
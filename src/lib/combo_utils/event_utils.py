@@ -0,0 +1,45 @@
+"""
+File: event_utils.py
+
+Description:
+Helpers for working with exa-events notifications as returned by
+NetconfSession.take_notification (xmltodict form).
+"""
+
+# ONT presence events and the ONT state each one leaves behind
+ONT_PRESENCE_EVENTS = {
+    "ont-arrival": "present",
+    "ont-departure": "missing",
+}
+
+
+def split_notification(notif_data: dict) -> tuple[str | None, dict]:
+    """Return the event name and event body of a notification.
+
+    The event is the first element after eventTime.  Generic event
+    wrappers carrying a name leaf (e.g. <event><name>ont-arrival</name>)
+    report that name instead of the wrapper element name.
+    """
+    for tag, body in notif_data.items():
+        if tag in ("eventTime", "@xmlns") or tag.startswith("@"):
+            continue
+        if not isinstance(body, dict):
+            return tag, {}
+        body = {k: v for k, v in body.items() if not k.startswith("@")}
+        name = body.get("name")
+        if isinstance(name, str):
+            return name, body
+        return tag, body
+    return None, {}
+
+
+def get_event_ont_id(body: dict) -> str | None:
+    """Return the ONT id an event body refers to, if any."""
+    ontid = body.get("ont-id")
+    if isinstance(ontid, dict):
+        ontid = ontid.get("#text")
+    return ontid
+
+
+def get_event_time(notif_data: dict) -> str | None:
+    return notif_data.get("eventTime")
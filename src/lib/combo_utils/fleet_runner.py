@@ -0,0 +1,284 @@
+"""
+File: fleet_runner.py
+
+Description: Houses the FleetRunner class which runs a task against every
+device of a Devices inventory from several worker processes.
+
+A single process sweeping thousands of devices is limited by the GIL and
+by the sockets one process can service.  FleetRunner splits the devices
+into one shard per worker process, each worker connecting up to
+sessions_per_process devices at a time with a thread pool.  Results are
+streamed back to the parent over a queue as each device finishes:
+
+    def ont_count(conn, devicename):
+        return conn.get_ont_count().data
+
+    runner = FleetRunner(Devices("config/devices.yaml"), ont_count, processes=8)
+    for devicename, response in runner.run():
+        print(devicename, response.ok, response.data)
+
+The task is called as task(conn, devicename) with a connected
+NetconfSession and its return value becomes the data of the device's
+NetconfResponse.  Workers are spawned, so the task must be a module level
+function and its return value picklable.  session_class, a module level
+NetconfSession subclass, replaces the session connecting each device.
+
+If a worker process dies, the devices of its shard without a result are
+given to a new worker, up to retries times, then reported as failed.
+
+With a JobJournal every result is recorded as the step of the device, and
+devices on which the step is already done are skipped, so a run that died
+part way is resumed by running it again with the same journal:
+
+    journal = JobJournal("audit.db", "audit 2024-06")
+    FleetRunner(devices, audit, journal=journal, step="audit").run_all()
+"""
+
+import multiprocessing
+import os
+import pickle
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from lib.base_logger import getlogger
+from lib.axos_netconf.base import NetconfSession
+from lib.axos_netconf.responses import NetconfResponse
+from lib.cli_utils.devicecfg import Devices
+from lib.combo_utils.job_journal import JobJournal
+
+LOGGER = getlogger(__name__)
+
+
+def _run_device(task, params: dict, session_class=NetconfSession) -> bytes:
+    """Run the task on one device returning its pickled NetconfResponse."""
+    devicename = params["devicename"]
+    try:
+        with session_class(**params) as conn:
+            response = NetconfResponse(data=task(conn, devicename))
+    except Exception as err:
+        response = NetconfResponse(ok=False, err=str(err))
+    try:
+        return pickle.dumps(response)
+    except Exception as err:
+        return pickle.dumps(
+            NetconfResponse(ok=False, err=f"Task result cannot be pickled: {err}")
+        )
+
+
+def _worker(shard_id: int, shard: list, task, results, sessions: int, session_class):
+    """Worker process running the task on the devices of a shard."""
+    with ThreadPoolExecutor(max_workers=sessions) as executor:
+        futures = {
+            executor.submit(_run_device, task, params, session_class): params[
+                "devicename"
+            ]
+            for params in shard
+        }
+        for future in as_completed(futures):
+            results.put((shard_id, futures[future], future.result()))
+    # no more results from this shard
+    results.put((shard_id, None, None))
+
+
+class FleetRunner:
+    """Runs a task on every device of an inventory, sharded over worker
+    processes."""
+
+    def __init__(
+        self,
+        devices: Devices,
+        task,
+        connection: str = "netconf",
+        devicenames: list | None = None,
+        processes: int | None = None,
+        sessions_per_process: int = 16,
+        retries: int = 1,
+        journal: JobJournal | None = None,
+        step: str = "run",
+        session_class=NetconfSession,
+    ):
+        """devicenames limits the run to some devices of the inventory,
+        processes defaults to the number of CPUs.  Results are recorded in
+        journal, if given, as step."""
+        self.devices = devices
+        self.task = task
+        self.connection = connection
+        self.devicenames = devicenames
+        self.processes = processes or os.cpu_count() or 1
+        self.sessions_per_process = sessions_per_process
+        self.retries = retries
+        self.journal = journal
+        self.step = step
+        self.session_class = session_class
+        self.stats = {"devices": 0, "failed": 0, "skipped": 0, "worker restarts": 0}
+
+    def run(self):
+        """Run the task on every device yielding (devicename,
+        NetconfResponse) as results arrive."""
+        self.stats = {"devices": 0, "failed": 0, "skipped": 0, "worker restarts": 0}
+        params, missing = self._get_device_params()
+        if self.journal is not None:
+            names = [device["devicename"] for device in params]
+            pending = set(self.journal.get_pending(names, self.step))
+            self.stats["skipped"] = len(params) - len(pending)
+            params = [device for device in params if device["devicename"] in pending]
+            for device in params:
+                self.journal.start(device["devicename"], self.step)
+        for devicename in missing:
+            yield self._result(
+                devicename,
+                NetconfResponse(
+                    ok=False, err=f"No netconf connection {self.connection}"
+                ),
+            )
+
+        nshards = min(self.processes, len(params))
+        shards = [params[i::nshards] for i in range(nshards)]
+        # shard -> {devicename: params} of devices without a result
+        pending = {
+            shard_id: {device["devicename"]: device for device in shard}
+            for shard_id, shard in enumerate(shards)
+        }
+        attempts = {shard_id: 0 for shard_id in pending}
+
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        workers = {
+            shard_id: self._start_worker(context, shard_id, shard, results)
+            for shard_id, shard in enumerate(shards)
+        }
+        try:
+            while workers:
+                try:
+                    item = results.get(timeout=1.0)
+                except queue.Empty:
+                    item = None
+                if item is not None:
+                    result = self._receive(item, pending, workers)
+                    if result is not None:
+                        yield result
+                    continue
+
+                for shard_id, process in list(workers.items()):
+                    if process.is_alive():
+                        continue
+                    # collect what the worker sent before it exited
+                    for result in self._drain(results, pending, workers):
+                        yield result
+                    if shard_id not in workers:
+                        continue
+                    process.join()
+                    del workers[shard_id]
+                    unfinished = list(pending[shard_id].values())
+                    if not unfinished:
+                        continue
+                    if attempts[shard_id] < self.retries:
+                        attempts[shard_id] += 1
+                        self.stats["worker restarts"] += 1
+                        LOGGER.warning(
+                            f"Fleet worker {shard_id} exited with code "
+                            f"{process.exitcode}, retrying {len(unfinished)} devices"
+                        )
+                        workers[shard_id] = self._start_worker(
+                            context, shard_id, unfinished, results
+                        )
+                        continue
+                    pending[shard_id] = {}
+                    for device in unfinished:
+                        yield self._result(
+                            device["devicename"],
+                            NetconfResponse(
+                                ok=False,
+                                err=f"Fleet worker exited with code {process.exitcode}",
+                            ),
+                        )
+        finally:
+            for process in workers.values():
+                process.terminate()
+                process.join()
+            results.close()
+
+    def run_all(self) -> dict:
+        """Run the task on every device returning {devicename:
+        NetconfResponse}."""
+        return dict(self.run())
+
+    def _get_device_params(self) -> tuple:
+        """Return the NetconfSession parameters of the devices to run and the
+        names of devices without a netconf connection."""
+        params = []
+        missing = []
+        for devicename in self.devicenames or self.devices.device_names:
+            conn_params = self.devices.get_device_connection_params(
+                devicename, self.connection
+            )
+            if conn_params is None or conn_params.type != "netconf":
+                missing.append(devicename)
+                continue
+            params.append(
+                {
+                    "hostname": conn_params.host,
+                    "port": conn_params.port,
+                    "timeout": conn_params.timeout,
+                    "username": conn_params.username,
+                    "password": conn_params.password,
+                    "devicename": devicename,
+                    "ssh_profile": self.devices.get_device_ssh_profile(
+                        devicename, self.connection
+                    ),
+                }
+            )
+        return params, missing
+
+    def _start_worker(self, context, shard_id: int, shard: list, results):
+        process = context.Process(
+            target=_worker,
+            args=(
+                shard_id,
+                shard,
+                self.task,
+                results,
+                self.sessions_per_process,
+                self.session_class,
+            ),
+            name=f"fleet-worker-{shard_id}",
+        )
+        process.daemon = True
+        process.start()
+        return process
+
+    def _receive(self, item: tuple, pending: dict, workers: dict):
+        """Handle a message from a worker returning (devicename,
+        NetconfResponse) for a new result, otherwise None."""
+        shard_id, devicename, payload = item
+        if devicename is None:
+            process = workers.pop(shard_id, None)
+            if process is not None:
+                process.join()
+            return None
+        if pending[shard_id].pop(devicename, None) is None:
+            # already reported by an earlier attempt of the shard
+            return None
+        return self._result(devicename, pickle.loads(payload))
+
+    def _drain(self, results, pending: dict, workers: dict):
+        while True:
+            try:
+                item = results.get_nowait()
+            except queue.Empty:
+                return
+            result = self._receive(item, pending, workers)
+            if result is not None:
+                yield result
+
+    def _result(self, devicename: str, response: NetconfResponse) -> tuple:
+        self.stats["devices"] += 1
+        if not response.ok:
+            self.stats["failed"] += 1
+            LOGGER.error(f"{devicename}: fleet task failed: {response.err}")
+        if self.journal is not None:
+            if response.ok:
+                self.journal.done(devicename, self.step)
+            else:
+                self.journal.failed(devicename, self.step, response.err)
+        return devicename, response
@@ -0,0 +1,276 @@
+"""
+File: interface_counters.py
+
+Description: Houses the InterfaceCounterCollector class which samples the
+ietf-interfaces statistics of one AXOS system and computes per interface
+deltas and rates between samples.
+
+Every sample is a single get of all interface statistics.  The reply is
+decoded straight into flat arrays, one row per interface and one column
+per counter in COUNTERS, so a polling cycle does not build per interface
+dictionaries.  Rows are only reassigned when the set of interfaces
+changes.
+
+    collector = InterfaceCounterCollector(conn, interval=60)
+    collector.start()
+
+    collector.get_rate("1/1/x1", "in-octets")      # octets per second
+    collector.get_rates("out-errors")              # array aligned with names
+
+Counter wraps are handled using the counter width (counter32 or
+counter64).  A changed discontinuity-time, or a decrease too large to be
+a wrap, is treated as a reset and the new value is used as the delta.
+A counter missing from a sample, or reported without a value, loses its
+baseline: when it is reported again its delta starts from zero.
+"""
+
+import threading
+import time
+from array import array
+
+from lxml import etree
+
+from lib.base_logger import getlogger
+from lib.axos_netconf.base import NetconfSession
+
+LOGGER = getlogger(__name__)
+
+IF_NS = "urn:ietf:params:xml:ns:yang:ietf-interfaces"
+
+# counter name -> width in bits
+COUNTERS = {
+    "in-octets": 64,
+    "in-unicast-pkts": 64,
+    "in-broadcast-pkts": 64,
+    "in-multicast-pkts": 64,
+    "in-discards": 32,
+    "in-errors": 32,
+    "in-unknown-protos": 32,
+    "out-octets": 64,
+    "out-unicast-pkts": 64,
+    "out-broadcast-pkts": 64,
+    "out-multicast-pkts": 64,
+    "out-discards": 32,
+    "out-errors": 32,
+}
+COUNTER_COLUMNS = {name: i for i, name in enumerate(COUNTERS)}
+COUNTER_INDEX = {f"{{{IF_NS}}}{name}": i for i, name in enumerate(COUNTERS)}
+COUNTER_MODULUS = [2**width for width in COUNTERS.values()]
+
+_INTERFACE_TAG = f"{{{IF_NS}}}interface"
+_NAME_TAG = f"{{{IF_NS}}}name"
+_STATISTICS_TAG = f"{{{IF_NS}}}statistics"
+_DISCONTINUITY_TAG = f"{{{IF_NS}}}discontinuity-time"
+
+
+class InterfaceCounterCollector:
+    """Samples interface counters of a system keeping the previous sample,
+    deltas and rates in compact arrays."""
+
+    def __init__(self, conn: NetconfSession, interval: float = 60, callback=None):
+        """callback(collector) is called after every successful sample taken
+        by the polling thread."""
+        self.conn = conn
+        self.interval = interval
+        self.callback = callback
+        self.enabled = False
+
+        self.names = []  # row -> interface name
+        self.last_sample = None  # time of the last sample
+        self.elapsed = None  # seconds between the last two samples
+
+        self._ncounters = len(COUNTERS)
+        self._rows = {}  # interface name -> row
+        self._discontinuity = []  # row -> discontinuity-time
+        self._values = array("Q")
+        self._previous = array("Q")
+        self._present = array("b")  # row, counter -> 1 if reported this sample
+        self._previous_present = array("b")
+        self._deltas = array("Q")
+        self._rates = array("d")
+        self._lock = threading.Lock()
+        self._poller = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Take the first sample and start sampling every interval seconds."""
+        self.sample()
+        self.enabled = True
+        self._stop.clear()
+        self._poller = threading.Thread(target=self._poll_loop)
+        self._poller.daemon = True
+        self._poller.start()
+
+    def stop(self):
+        self.enabled = False
+        self._stop.set()
+        if self._poller is not None:
+            self._poller.join()
+            self._poller = None
+
+    def sample(self) -> bool:
+        """Read all interface statistics and update deltas and rates
+        returning True if successful."""
+        response = self.conn.get_interface_statistics(parse=False)
+        now = time.monotonic()
+        if not response.ok:
+            LOGGER.error(
+                f"{self.conn.devicename}: interface statistics failed: {response.err}"
+            )
+            return False
+
+        root = etree.fromstring(response.buffer)
+        with self._lock:
+            self._decode(root)
+            if self.last_sample is not None:
+                self.elapsed = now - self.last_sample
+                self._compute(self.elapsed)
+            self.last_sample = now
+        return True
+
+    def get_delta(self, name: str, counter: str) -> int | None:
+        """Return the change of a counter over the last interval."""
+        with self._lock:
+            cell = self._cell(name, counter)
+            return self._deltas[cell] if cell is not None else None
+
+    def get_rate(self, name: str, counter: str) -> float | None:
+        """Return the per second rate of a counter over the last interval."""
+        with self._lock:
+            cell = self._cell(name, counter)
+            return self._rates[cell] if cell is not None else None
+
+    def get_value(self, name: str, counter: str) -> int | None:
+        with self._lock:
+            cell = self._cell(name, counter)
+            return self._values[cell] if cell is not None else None
+
+    def get_rates(self, counter: str) -> array:
+        """Return the rates of one counter for every interface, aligned with
+        names."""
+        column = COUNTER_COLUMNS[counter]
+        with self._lock:
+            return self._rates[column :: self._ncounters]
+
+    def get_deltas(self, counter: str) -> array:
+        """Return the deltas of one counter for every interface, aligned with
+        names."""
+        column = COUNTER_COLUMNS[counter]
+        with self._lock:
+            return self._deltas[column :: self._ncounters]
+
+    def _cell(self, name: str, counter: str) -> int | None:
+        row = self._rows.get(name)
+        if row is None or self.elapsed is None:
+            return None
+        cell = row * self._ncounters + COUNTER_COLUMNS[counter]
+        return cell if self._present[cell] else None
+
+    def _decode(self, root):
+        """Decode the reply into _values, moving the last values into
+        _previous.  Interfaces no longer reported are dropped."""
+        ncounters = self._ncounters
+        self._values, self._previous = self._previous, self._values
+        self._present, self._previous_present = self._previous_present, self._present
+
+        interfaces = [
+            element
+            for element in root.iter(_INTERFACE_TAG)
+            if element.find(_STATISTICS_TAG) is not None
+        ]
+        names = [element.findtext(_NAME_TAG) for element in interfaces]
+        if names != self.names:
+            self._reindex(names)
+
+        values = self._values
+        present = self._present
+        for row, element in enumerate(interfaces):
+            base = row * ncounters
+            for column in range(ncounters):
+                present[base + column] = 0
+            for leaf in element.find(_STATISTICS_TAG):
+                if leaf.tag == _DISCONTINUITY_TAG:
+                    if leaf.text != self._discontinuity[row]:
+                        if self._discontinuity[row] is not None:
+                            self._reset_row(row)
+                        self._discontinuity[row] = leaf.text
+                    continue
+                column = COUNTER_INDEX.get(leaf.tag)
+                if column is None or leaf.text is None or not leaf.text.strip():
+                    continue
+                values[base + column] = int(leaf.text)
+                present[base + column] = 1
+
+    def _reindex(self, names: list):
+        """Rebuild the arrays for a new set of interfaces keeping the
+        previous values of interfaces still present."""
+        ncounters = self._ncounters
+        size = len(names) * ncounters
+        previous = array("Q", bytes(8 * size))
+        previous_present = array("b", bytes(size))
+        discontinuity = [None] * len(names)
+        rows = {}
+        for row, name in enumerate(names):
+            rows[name] = row
+            old = self._rows.get(name)
+            if old is None:
+                continue
+            old_base = old * ncounters
+            base = row * ncounters
+            previous[base : base + ncounters] = self._previous[
+                old_base : old_base + ncounters
+            ]
+            previous_present[base : base + ncounters] = self._previous_present[
+                old_base : old_base + ncounters
+            ]
+            discontinuity[row] = self._discontinuity[old]
+
+        self.names = names
+        self._rows = rows
+        self._discontinuity = discontinuity
+        self._values = array("Q", bytes(8 * size))
+        self._previous = previous
+        self._present = array("b", bytes(size))
+        self._previous_present = previous_present
+        self._deltas = array("Q", bytes(8 * size))
+        self._rates = array("d", bytes(8 * size))
+
+    def _reset_row(self, row: int):
+        base = row * self._ncounters
+        for column in range(self._ncounters):
+            self._previous[base + column] = 0
+
+    def _compute(self, elapsed: float):
+        values = self._values
+        previous = self._previous
+        deltas = self._deltas
+        rates = self._rates
+        present = self._present
+        previous_present = self._previous_present
+        ncounters = self._ncounters
+
+        for cell in range(len(values)):
+            if not present[cell] or not previous_present[cell]:
+                # no baseline, a new interface or a counter reported again
+                deltas[cell] = 0
+                rates[cell] = 0.0
+                continue
+            delta = values[cell] - previous[cell]
+            if delta < 0:
+                modulus = COUNTER_MODULUS[cell % ncounters]
+                delta += modulus
+                if delta > modulus // 2:
+                    # not a wrap, the counter was reset
+                    delta = values[cell]
+            deltas[cell] = delta
+            rates[cell] = delta / elapsed if elapsed > 0 else 0.0
+
+    def _poll_loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                if self.sample() and self.callback is not None:
+                    self.callback(self)
+            except Exception as err:
+                LOGGER.error(
+                    f"{self.conn.devicename}: interface statistics failed: {err}"
+                )
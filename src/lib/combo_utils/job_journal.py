@@ -0,0 +1,155 @@
+"""
+File: job_journal.py
+
+Description: Houses the JobJournal class, a durable SQLite record of which
+steps of a long fleet job (VLAN builds, ONT upgrades, audits, ...) have
+completed on which device, so a job interrupted part way is resumed
+instead of started over.
+
+Every (device, step) of a job is recorded as running when started and as
+done or failed when finished.  On resume only steps not done are run
+again, i.e. failed steps, steps that were running when the process died
+and steps that never ran:
+
+    journal = JobJournal("vlan-build.db", "vlan 100 build")
+    for devicename in journal.get_pending(devicenames, "edit-vlan"):
+        journal.start(devicename, "edit-vlan")
+        response = sessions[devicename].edit_vlan(...)
+        if response.ok:
+            journal.done(devicename, "edit-vlan")
+        else:
+            journal.failed(devicename, "edit-vlan", response.err)
+
+Several jobs may share one journal file, each job is identified by its
+name.  Passing resume=False clears the records of the job and starts it
+over.  Records are committed as they are made (WAL mode), surviving the
+process being killed.
+"""
+
+import sqlite3
+import threading
+import time
+
+from lib.base_logger import getlogger
+
+LOGGER = getlogger(__name__)
+
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS steps (
+    job TEXT NOT NULL,
+    device TEXT NOT NULL,
+    step TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    detail TEXT,
+    updated REAL NOT NULL,
+    PRIMARY KEY (job, device, step)
+)
+"""
+
+
+class JobJournal:
+    """Durable per device, per step completion record of a fleet job."""
+
+    def __init__(self, path: str, job: str, resume: bool = True):
+        """path is the SQLite file, created if missing."""
+        self.path = path
+        self.job = job
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            self._db.execute(_SCHEMA)
+            if not resume:
+                self._db.execute("DELETE FROM steps WHERE job = ?", (job,))
+        summary = self.get_summary()
+        if summary:
+            LOGGER.info(f"Resuming job {job}: {summary}")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def start(self, device: str, step: str):
+        """Record a step as running on a device."""
+        self._record(device, step, RUNNING, None, attempt=True)
+
+    def done(self, device: str, step: str, detail: str | None = None):
+        """Record a step as completed on a device."""
+        self._record(device, step, DONE, detail)
+
+    def failed(self, device: str, step: str, err: str | None = None):
+        """Record a step as failed on a device."""
+        self._record(device, step, FAILED, err)
+
+    def get_state(self, device: str, step: str) -> str | None:
+        """Return running, done or failed, or None if the step never ran."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT state FROM steps WHERE job = ? AND device = ? AND step = ?",
+                (self.job, device, step),
+            ).fetchone()
+        return row[0] if row else None
+
+    def is_done(self, device: str, step: str) -> bool:
+        return self.get_state(device, step) == DONE
+
+    def get_done(self, step: str | None = None) -> set:
+        """Return the (device, step) pairs completed, only those of one step
+        if step is given."""
+        query = "SELECT device, step FROM steps WHERE job = ? AND state = ?"
+        params = [self.job, DONE]
+        if step is not None:
+            query += " AND step = ?"
+            params.append(step)
+        with self._lock:
+            return set(self._db.execute(query, params).fetchall())
+
+    def get_pending(self, devices, step: str) -> list:
+        """Return the devices, in order, on which step has not completed."""
+        done = {device for device, _ in self.get_done(step)}
+        return [device for device in devices if device not in done]
+
+    def get_failures(self) -> dict:
+        """Return {(device, step): err} of the failed steps."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT device, step, detail FROM steps WHERE job = ? AND state = ?",
+                (self.job, FAILED),
+            ).fetchall()
+        return {(device, step): detail for device, step, detail in rows}
+
+    def get_summary(self) -> dict:
+        """Return the number of steps in each state."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT state, COUNT(*) FROM steps WHERE job = ? GROUP BY state",
+                (self.job,),
+            ).fetchall()
+        return dict(rows)
+
+    def _record(self, device: str, step: str, state: str, detail, attempt=False):
+        with self._lock, self._db:
+            self._db.execute(
+                """
+                INSERT INTO steps (job, device, step, state, attempts, detail, updated)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (job, device, step) DO UPDATE SET
+                    state = excluded.state,
+                    attempts = attempts + excluded.attempts,
+                    detail = excluded.detail,
+                    updated = excluded.updated
+                """,
+                (self.job, device, step, state, int(attempt), detail, time.time()),
+            )
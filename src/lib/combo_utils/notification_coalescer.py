@@ -0,0 +1,195 @@
+"""
+File: notification_coalescer.py
+
+Description: Houses the NotificationCoalescer class which sits between
+take_notification and the notification handlers and collapses bursts of
+related events (e.g. ONT arrive/depart flapping during fiber work) into a
+single event per window.
+
+Events are grouped by a key, by default the ONT id plus the event type
+(ont-arrival and ont-departure count as one "presence" type).  The first
+event of a group opens a window; when the window closes only the net
+change is emitted: the last event, annotated with how many events were
+folded into it.  A flap that ended in the state it started from, ONT
+presence or oper-state, is no change and is not emitted.  Events without a
+key are passed straight through.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from lib.base_logger import getlogger
+from lib.combo_utils.event_utils import (
+    ONT_PRESENCE_EVENTS,
+    get_event_ont_id,
+    get_event_time,
+    split_notification,
+)
+
+LOGGER = getlogger(__name__)
+
+
+def ont_event_key(notif_data: dict) -> tuple | None:
+    """Default coalescing key: (ont-id, event type) or None for events that
+    do not refer to an ONT."""
+    event, body = split_notification(notif_data)
+    ontid = get_event_ont_id(body)
+    if event is None or ontid is None:
+        return None
+    if event in ONT_PRESENCE_EVENTS:
+        event = "ont-presence"
+    return (ontid, event)
+
+
+def ont_event_state(notif_data: dict) -> str | None:
+    """Return the ONT state an event leaves behind, present or missing for
+    presence events, otherwise its oper-state, None if it has none."""
+    event, body = split_notification(notif_data)
+    state = ONT_PRESENCE_EVENTS.get(event, body.get("oper-state"))
+    return state if isinstance(state, str) else None
+
+
+class NotificationCoalescer:
+    """
+    Coalesces notifications over a window and hands the result to
+    emit(notif_data, source).
+
+    The emitted notification is the last one received for its key with a
+    "coalesced" entry added:
+        count            - number of events folded together
+        flaps            - count - 1
+        first-event-time - eventTime of the first event in the window
+        changed          - False when an ONT presence or oper-state flap
+                           ended in the state it started from
+
+    Groups that ended where they started are not emitted at all unless
+    drop_unchanged is False.
+    """
+
+    def __init__(
+        self,
+        emit,
+        window: float = 30.0,
+        key=ont_event_key,
+        drop_unchanged: bool = True,
+    ):
+        self.emit = emit
+        self.window = window
+        self.key = key
+        self.drop_unchanged = drop_unchanged
+        self.enabled = False
+
+        self._pending = OrderedDict()  # (source, key) -> group, oldest first
+        self._states = {}  # (source, key) -> state left by the last event
+        self._cond = threading.Condition()
+        self._flusher = None
+
+    def start(self):
+        """Start the background thread emitting groups as their window closes."""
+        self.enabled = True
+        self._flusher = threading.Thread(target=self._flush_loop)
+        self._flusher.daemon = True
+        self._flusher.start()
+
+    def stop(self):
+        """Stop the background thread, emitting everything still pending."""
+        with self._cond:
+            self.enabled = False
+            self._cond.notify()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+
+    def submit(self, notif_data: dict, source=None):
+        """Add a notification.  source identifies where it came from (e.g. a
+        device name) and is part of the grouping key."""
+        key = self.key(notif_data)
+        if key is None:
+            self.emit(notif_data, source)
+            return
+
+        state = ont_event_state(notif_data)
+        with self._cond:
+            group = self._pending.get((source, key))
+            if group is None:
+                self._pending[(source, key)] = {
+                    "deadline": time.monotonic() + self.window,
+                    "source": source,
+                    "count": 1,
+                    "first": notif_data,
+                    "last": notif_data,
+                    "start": self._start_state((source, key), notif_data, state),
+                }
+                self._cond.notify()
+            else:
+                group["count"] += 1
+                group["last"] = notif_data
+                if group["start"] is None and state != self._states.get(
+                    (source, key)
+                ):
+                    # the first event changed the state from this one
+                    group["start"] = state
+            if state is not None:
+                self._states[(source, key)] = state
+
+    def _start_state(self, group_key, notif_data: dict, state) -> str | None:
+        """Return the state before the first event of a group, None if it is
+        not known yet."""
+        start = self._states.get(group_key)
+        if start is not None:
+            return start
+        event, _ = split_notification(notif_data)
+        if event in ONT_PRESENCE_EVENTS:
+            # an ONT departing was present and one arriving was missing
+            return "present" if state == "missing" else "missing"
+        return None
+
+    def flush(self, now: float | None = None):
+        """Emit every group whose window has closed by now, or every group
+        when now is None."""
+        due = []
+        with self._cond:
+            while self._pending:
+                group_key, group = next(iter(self._pending.items()))
+                if now is not None and group["deadline"] > now:
+                    break
+                del self._pending[group_key]
+                due.append(group)
+        for group in due:
+            self._emit_group(group)
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                if not self.enabled:
+                    return
+                timeout = None
+                if self._pending:
+                    oldest = next(iter(self._pending.values()))
+                    timeout = max(0.0, oldest["deadline"] - time.monotonic())
+                self._cond.wait(timeout)
+            self.flush(time.monotonic())
+
+    def _emit_group(self, group: dict):
+        first, last = group["first"], group["last"]
+        changed = True
+        if group["count"] > 1 and group["start"] is not None:
+            # an event that alternated back to where it started
+            changed = ont_event_state(last) != group["start"]
+
+        if not changed and self.drop_unchanged:
+            return
+
+        notif_data = dict(last)
+        notif_data["coalesced"] = {
+            "count": group["count"],
+            "flaps": group["count"] - 1,
+            "first-event-time": get_event_time(first),
+            "changed": changed,
+        }
+        try:
+            self.emit(notif_data, group["source"])
+        except Exception as err:
+            LOGGER.error(f"Coalesced notification handler failed: {err}")
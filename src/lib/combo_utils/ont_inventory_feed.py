@@ -0,0 +1,200 @@
+"""
+File: ont_inventory_feed.py
+
+Description: Houses the OntInventoryFeed class which turns periodic ONT
+inventory snapshots of one AXOS system into change events.
+
+Each poll reads get_discovered_onts and get_ont_states, keys the result by
+ont-id and compares it with the previous poll.  Only ONTs that changed are
+reported, so polling gives event level output where notifications are not
+available or not trusted:
+
+    feed = OntInventoryFeed(conn, emit=print, interval=60)
+    feed.start()
+
+    {"event": "ont-moved", "ont-id": "101", "port": "1/1/xp4",
+     "previous-port": "1/1/xp3", "oper-state": "present", ...}
+
+event is one of:
+    ont-arrived       - ONT not in the previous snapshot, or now linked to
+                        a PON port and not missing after having no linkage
+                        or being missing
+    ont-departed      - ONT in the previous snapshot but not this one, or
+                        one linked and not missing that lost its linkage or
+                        went missing
+    ont-moved         - ONT discovered on a different PON port
+    ont-state-changed - any other change of oper-state or linkage state
+"""
+
+import threading
+import time
+
+from lib.base_logger import getlogger
+from lib.axos_netconf.base import NetconfSession
+from lib.combo_utils.ont_utils import as_list
+
+LOGGER = getlogger(__name__)
+
+# snapshot record layout, tuples so records compare and hash cheaply
+PORT, LINKAGE_STATE, OPER_STATE = range(3)
+
+
+def _on_port(record: tuple | None) -> bool:
+    """True if a snapshot record is of an ONT linked to a PON port and not
+    missing."""
+    return (
+        record is not None
+        and record[PORT] is not None
+        and record[OPER_STATE] != "missing"
+    )
+
+
+def diff_snapshots(previous: dict, current: dict) -> list:
+    """Compare two {ont-id: (port, linkage-state, oper-state)} snapshots
+    returning the change events between them.  Linear in the size of the
+    snapshots."""
+    events = []
+    for ontid, record in current.items():
+        old = previous.get(ontid)
+        if old == record:
+            continue
+        if old is None or (_on_port(record) and not _on_port(old)):
+            events.append(_event("ont-arrived", ontid, record, old))
+        elif _on_port(old) and not _on_port(record):
+            events.append(_event("ont-departed", ontid, record, old))
+        elif old[PORT] != record[PORT]:
+            events.append(_event("ont-moved", ontid, record, old))
+        else:
+            events.append(_event("ont-state-changed", ontid, record, old))
+    for ontid in previous.keys() - current.keys():
+        events.append(_event("ont-departed", ontid, None, previous[ontid]))
+    return events
+
+
+def _event(event: str, ontid: str, record: tuple | None, old: tuple | None = None):
+    record = record or (None, None, None)
+    old = old or (None, None, None)
+    return {
+        "event": event,
+        "ont-id": ontid,
+        "port": record[PORT],
+        "linkage-state": record[LINKAGE_STATE],
+        "oper-state": record[OPER_STATE],
+        "previous-port": old[PORT],
+        "previous-linkage-state": old[LINKAGE_STATE],
+        "previous-oper-state": old[OPER_STATE],
+    }
+
+
+class OntInventoryFeed:
+    """Polls the ONT inventory of a system and emits the differences between
+    consecutive snapshots."""
+
+    def __init__(
+        self,
+        conn: NetconfSession,
+        emit=None,
+        interval: float = 60,
+        include_states: bool = True,
+        emit_initial: bool = False,
+    ):
+        """emit(event) is called for every change event.  include_states
+        False skips get_ont_states, only arrivals, departures, moves and
+        linkage state changes are reported.  emit_initial True reports every
+        ONT of the first snapshot as arrived."""
+        self.conn = conn
+        self.emit = emit
+        self.interval = interval
+        self.include_states = include_states
+        self.emit_initial = emit_initial
+        self.enabled = False
+        self.last_poll = None
+
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._poller = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Take the first snapshot and start polling every interval seconds."""
+        self.poll()
+        self.enabled = True
+        self._stop.clear()
+        self._poller = threading.Thread(target=self._poll_loop)
+        self._poller.daemon = True
+        self._poller.start()
+
+    def stop(self):
+        self.enabled = False
+        self._stop.set()
+        if self._poller is not None:
+            self._poller.join()
+            self._poller = None
+
+    def poll(self) -> list | None:
+        """Take a snapshot and emit the changes since the previous one.
+        Returns the events, or None if the inventory could not be read in
+        which case the previous snapshot is kept."""
+        current = self.get_snapshot()
+        if current is None:
+            return None
+
+        with self._lock:
+            previous = self._snapshot
+            self._snapshot = current
+            self.last_poll = time.time()
+        if previous is None and not self.emit_initial:
+            return []
+
+        events = diff_snapshots(previous or {}, current)
+        if events:
+            LOGGER.info(f"{self.conn.devicename}: {len(events)} ONT inventory changes")
+        if self.emit is not None:
+            for event in events:
+                self.emit(event)
+        return events
+
+    def get_snapshot(self) -> dict | None:
+        """Read the inventory as {ont-id: (port, linkage-state, oper-state)}."""
+        discovered = self.conn.get_discovered_onts()
+        if not discovered.ok:
+            LOGGER.error(
+                f"{self.conn.devicename}: ONT inventory poll failed: {discovered.err}"
+            )
+            return None
+
+        oper_states = {}
+        if self.include_states:
+            states = self.conn.get_ont_states()
+            if not states.ok:
+                LOGGER.error(
+                    f"{self.conn.devicename}: ONT inventory poll failed: {states.err}"
+                )
+                return None
+            for ont in as_list((states.data or {}).get("states")):
+                status = ont.get("status") or {}
+                oper_states[ont["ont-id"]] = status.get("oper-state")
+
+        snapshot = {}
+        for ont in as_list((discovered.data or {}).get("discovered onts")):
+            ontid = ont["ont-id"]
+            snapshot[ontid] = (
+                f"{ont['shelf-id']}/{ont['slot-id']}/{ont['pon-port']}",
+                ont.get("state"),
+                oper_states.pop(ontid, None),
+            )
+        # provisioned ONTs with a state but no linkage
+        for ontid, oper_state in oper_states.items():
+            snapshot[ontid] = (None, None, oper_state)
+        return snapshot
+
+    def get_ont_ids(self) -> list:
+        with self._lock:
+            return list(self._snapshot or ())
+
+    def _poll_loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as err:
+                LOGGER.error(f"{self.conn.devicename}: ONT inventory poll failed: {err}")
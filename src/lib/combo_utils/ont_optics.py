@@ -0,0 +1,138 @@
+"""
+File: ont_optics.py
+
+Description:
+Bulk ONT optical level and PON counter sweeps.
+
+collect_ont_optics reads the optics (and optionally the PON error
+counters) of every ONT on a system or on selected cards with a few
+sharded requests and returns them as aligned columns, one entry per ONT:
+
+    sweep = collect_ont_optics(conn, cards=[(1, 1)])
+    sweep["ont-ids"], sweep["ports"], sweep["opt-signal-level"]
+
+Leaf columns are array("d") of floats, missing values are NaN.  Threshold
+checks and per PON port aggregates are computed column by column:
+
+    out_of_range(sweep)
+    aggregate_by_port(sweep, "opt-signal-level")
+"""
+
+import math
+from array import array
+
+from lib.base_logger import getlogger
+from lib.axos_netconf.base import NetconfSession
+from lib.axos_netconf.ont import ONT_OPTICS_LEAVES, ONT_PON_COUNTER_LEAVES
+from lib.combo_utils.ont_utils import as_list
+
+LOGGER = getlogger(__name__)
+
+# (low, high) acceptable range per leaf, optical levels in dBm
+DEFAULT_OPTICS_LIMITS = {
+    "opt-signal-level": (-28.0, -8.0),
+    "olt-rx-opt-level": (-30.0, -8.0),
+}
+
+
+def collect_ont_optics(
+    conn: NetconfSession,
+    cards: list | None = None,
+    include_pon_statistics: bool = True,
+    shard_size: int = 500,
+) -> dict | None:
+    """Sweep the ONTs discovered on a system, or only on the given
+    [(shelf, slot)] cards, returning {"ont-ids", "ports", leaf, ...} columns
+    aligned by ONT, or None if the sweep failed."""
+    response = conn.get_discovered_onts()
+    if not response.ok:
+        LOGGER.error(f"{conn.devicename}: cannot read discovered ONTs: {response.err}")
+        return None
+
+    wanted = {(str(shelf), str(slot)) for shelf, slot in cards} if cards else None
+    ports = {}
+    for ont in as_list((response.data or {}).get("discovered onts")):
+        if wanted is not None and (ont["shelf-id"], ont["slot-id"]) not in wanted:
+            continue
+        ports[ont["ont-id"]] = f"{ont['shelf-id']}/{ont['slot-id']}/{ont['pon-port']}"
+
+    ontids = list(ports)
+    sweep = {
+        "ont-ids": ontids,
+        "ports": [ports[ontid] for ontid in ontids],
+    }
+    getters = [(conn.get_ont_optics, ONT_OPTICS_LEAVES)]
+    if include_pon_statistics:
+        getters.append((conn.get_ont_pon_statistics, ONT_PON_COUNTER_LEAVES))
+
+    position = {ontid: i for i, ontid in enumerate(ontids)}
+    for getter, leaves in getters:
+        response = getter(ontids, shard_size=shard_size)
+        if not response.ok:
+            LOGGER.error(f"{conn.devicename}: ONT sweep failed: {response.err}")
+            return None
+        rows = [position[ontid] for ontid in response.data["ont-ids"]]
+        for leaf in leaves:
+            column = array("d", [math.nan]) * len(ontids)
+            for row, value in zip(rows, response.data[leaf]):
+                if value is not None:
+                    column[row] = value
+            sweep[leaf] = column
+    return sweep
+
+
+def check_thresholds(sweep: dict, limits: dict | None = None) -> dict:
+    """Return {leaf: [bool]} marking ONTs outside the (low, high) range of
+    each leaf in limits.  Missing values are not flagged."""
+    limits = DEFAULT_OPTICS_LIMITS if limits is None else limits
+    masks = {}
+    for leaf, (low, high) in limits.items():
+        values = sweep.get(leaf)
+        if values is None:
+            continue
+        # comparisons with NaN are False
+        masks[leaf] = [value < low or value > high for value in values]
+    return masks
+
+
+def out_of_range(sweep: dict, limits: dict | None = None) -> dict:
+    """Return {ont-id: [leaf, ...]} for ONTs outside any of the limits."""
+    flagged = {}
+    for leaf, mask in check_thresholds(sweep, limits).items():
+        for ontid, outside in zip(sweep["ont-ids"], mask):
+            if outside:
+                flagged.setdefault(ontid, []).append(leaf)
+    return flagged
+
+
+def aggregate_by_port(sweep: dict, leaf: str) -> dict:
+    """Return {port: {"count", "min", "max", "mean", "sum"}} of a leaf over
+    the ONTs of each PON port, ignoring missing values."""
+    aggregates = {}
+    for port, value in zip(sweep["ports"], sweep[leaf]):
+        if math.isnan(value):
+            continue
+        aggregate = aggregates.get(port)
+        if aggregate is None:
+            aggregates[port] = {
+                "count": 1,
+                "min": value,
+                "max": value,
+                "sum": value,
+            }
+            continue
+        aggregate["count"] += 1
+        aggregate["min"] = min(aggregate["min"], value)
+        aggregate["max"] = max(aggregate["max"], value)
+        aggregate["sum"] += value
+
+    return {
+        port: {
+            "count": aggregate["count"],
+            "min": aggregate["min"],
+            "max": aggregate["max"],
+            "mean": aggregate["sum"] / aggregate["count"],
+            "sum": aggregate["sum"],
+        }
+        for port, aggregate in sorted(aggregates.items())
+    }
@@ -0,0 +1,202 @@
+"""
+File: ont_reboot.py
+
+Description:
+Rate-limited bulk ONT reboot orchestration.
+
+bulk_ont_reboot takes a mix of ONT ids, PON ports and serial numbers,
+expands them to individual ONTs and reboots them with at most
+max_in_flight ONTs rebooting at once and no more than rate reboots per
+second.  Each rebooted ONT is followed until its oper-state returns to
+present and the outcome is reported per ONT:
+
+    outcomes = bulk_ont_reboot(conn, ["101", "1/1/xp3", ("CXNK", "1A2B3C")])
+    outcomes["101"]
+    {"target": "101", "status": "recovered", "err": None, "recovery_time": 92.4}
+
+status is one of:
+    recovered - ONT went down and came back present
+    failed    - the reboot command was rejected or could not be sent
+    timeout   - ONT was not present again within recovery_timeout
+    untracked - rebooted by serial number with no ONT provisioned for it
+"""
+
+import time
+
+from lib.base_logger import getlogger
+from lib.axos_netconf.base import NetconfSession
+from lib.axos_netconf.errors import NetconfSessionError
+from lib.axos_netconf.responses import NetconfResponse
+from lib.combo_utils.ont_utils import (
+    OntPortResolver,
+    get_ont_port_resolver,
+    is_pon_port,
+)
+
+LOGGER = getlogger(__name__)
+
+PRESENT = "present"
+
+
+def _expand_targets(
+    conn: NetconfSession, targets: list, resolver: OntPortResolver
+) -> list:
+    """Expand targets into a list of (key, target, ontid, serial) work items.
+    ONT ids and PON ports are strings, serials are (vendorid, serial) tuples
+    or {"vendor-id": .., "serial-number": ..} dicts."""
+    items = []
+    for target in targets:
+        if isinstance(target, (str, int)):
+            if is_pon_port(str(target)):
+                for ontid in resolver.get_ont_ids(target):
+                    items.append((ontid, target, ontid, None))
+            else:
+                items.append((str(target), target, str(target), None))
+            continue
+
+        if isinstance(target, dict):
+            serial = (target["vendor-id"], target["serial-number"])
+        elif isinstance(target, tuple):
+            serial = tuple(target)
+        else:
+            continue
+        try:
+            response = conn.get_ont_id_by_serial(serial[1])
+        except NetconfSessionError as err:
+            LOGGER.error(f"ONT {serial[0]}{serial[1]} lookup failed: {err}")
+            response = NetconfResponse(ok=False, err=str(err))
+        ontid = response.data["ont-id"] if response.ok else None
+        key = ontid if ontid is not None else f"{serial[0]}{serial[1]}"
+        items.append((key, target, ontid, serial))
+    return items
+
+
+def _reboot(conn: NetconfSession, ontid: str | None, serial: tuple | None):
+    """Reboot an ONT returning a failed response if the session fails."""
+    try:
+        if serial is not None:
+            return conn.perform_ont_reboot_by_serial(*serial)
+        return conn.perform_ont_reboot_by_ontid(ontid)
+    except NetconfSessionError as err:
+        return NetconfResponse(ok=False, err=str(err))
+
+
+def bulk_ont_reboot(
+    conn: NetconfSession,
+    targets: list,
+    max_in_flight: int = 8,
+    rate: float = 1.0,
+    recovery_timeout: float = 600,
+    poll_interval: float = 10,
+    settle_time: float = 30,
+    resolver: OntPortResolver | None = None,
+) -> dict:
+    """Reboot many ONTs with controlled parallelism returning a dictionary of
+    outcomes keyed by ont-id (vendor-id + serial for untracked serials).
+
+    An ONT that is seen present again without a down state being observed
+    between polls is counted as recovered once settle_time has passed.
+    PON ports are resolved through resolver, by default the resolver of the
+    session, reusing its cached discovery between calls.  A failed status poll
+    leaves the ONTs as they were, they time out if polls keep failing.
+    """
+    if rate <= 0:
+        raise ValueError(f"rate must be greater than 0, not {rate}")
+    if max_in_flight < 1:
+        raise ValueError(f"max_in_flight must be at least 1, not {max_in_flight}")
+    if resolver is None:
+        resolver = get_ont_port_resolver(conn)
+    items = _expand_targets(conn, targets, resolver)
+    pending = list(reversed(items))
+    outcomes = {}
+    in_flight = {}  # ont-id -> {"key", "target", "start", "down"}
+    next_reboot = 0.0
+    next_poll = 0.0
+
+    while pending or in_flight:
+        now = time.monotonic()
+
+        # issue reboots while below the in-flight and rate limits
+        while pending and len(in_flight) < max_in_flight and now >= next_reboot:
+            key, target, ontid, serial = pending.pop()
+            response = _reboot(conn, ontid, serial)
+            next_reboot = now + 1.0 / rate
+
+            if not response.ok:
+                LOGGER.error(f"ONT {key} reboot failed: {response.err}")
+                outcomes[key] = {
+                    "target": target,
+                    "status": "failed",
+                    "err": response.err,
+                    "recovery_time": None,
+                }
+            elif ontid is None:
+                LOGGER.warning(f"ONT {key} rebooted, no provisioned ONT to follow")
+                outcomes[key] = {
+                    "target": target,
+                    "status": "untracked",
+                    "err": None,
+                    "recovery_time": None,
+                }
+            else:
+                LOGGER.info(f"ONT {key} rebooting")
+                in_flight[ontid] = {
+                    "key": key,
+                    "target": target,
+                    "start": now,
+                    "down": False,
+                }
+                if len(in_flight) == 1:
+                    next_poll = now + poll_interval
+            now = time.monotonic()
+
+        # follow rebooting ONTs until present again
+        if in_flight and now >= next_poll:
+            try:
+                response = conn.get_ont_operating_statuses(list(in_flight.keys()))
+            except NetconfSessionError as err:
+                response = NetconfResponse(ok=False, err=str(err))
+            if response.ok:
+                oper_states = response.data["statuses"]
+            else:
+                # nothing is known of the ONTs, only check for timeouts
+                LOGGER.warning(f"ONT status poll failed: {response.err}")
+                oper_states = None
+            for ontid, state in list(in_flight.items()):
+                elapsed = time.monotonic() - state["start"]
+                err = f"no status after {elapsed:.0f}s: {response.err}"
+                if oper_states is not None:
+                    oper_state = oper_states.get(ontid)
+                    err = f"oper-state {oper_state} after {elapsed:.0f}s"
+                    if oper_state != PRESENT:
+                        state["down"] = True
+                    elif state["down"] or elapsed >= settle_time:
+                        LOGGER.info(f"ONT {state['key']} recovered in {elapsed:.1f}s")
+                        outcomes[state["key"]] = {
+                            "target": state["target"],
+                            "status": "recovered",
+                            "err": None,
+                            "recovery_time": elapsed,
+                        }
+                        del in_flight[ontid]
+                        continue
+                if elapsed >= recovery_timeout:
+                    LOGGER.error(f"ONT {state['key']} did not recover")
+                    outcomes[state["key"]] = {
+                        "target": state["target"],
+                        "status": "timeout",
+                        "err": err,
+                        "recovery_time": None,
+                    }
+                    del in_flight[ontid]
+            next_poll = time.monotonic() + poll_interval
+
+        wake = []
+        if in_flight:
+            wake.append(next_poll)
+        if pending and len(in_flight) < max_in_flight:
+            wake.append(next_reboot)
+        if wake:
+            time.sleep(max(0.0, min(wake) - time.monotonic()))
+
+    return outcomes
@@ -0,0 +1,219 @@
+"""
+File: ont_state_tracker.py
+
+Description: Houses the OntStateTracker class which keeps a live in-memory
+table of ONT states for one AXOS system.
+
+The table is seeded once from get_ont_states/get_discovered_onts and then
+kept current by applying exa-events notifications as they arrive, for
+example by subscribing apply_notification to a SubscriptionManager topic:
+
+    tracker = OntStateTracker(conn, resync_interval=900)
+    tracker.start()
+    pub.subscribe(tracker.apply_notification, "ont-events")
+
+    tracker.get_ont_state("101")
+    tracker.get_onts_on_port("1/1/xp3", state="missing")
+
+A periodic resync rebuilds the table from the system to correct drift
+from missed notifications.  Notifications applied while the system is
+read are applied again to the rebuilt table, so they are not lost to a
+snapshot read before them.
+"""
+
+import threading
+import time
+
+from lib.base_logger import getlogger
+from lib.axos_netconf.base import NetconfSession
+from lib.combo_utils.event_utils import (
+    ONT_PRESENCE_EVENTS,
+    get_event_ont_id,
+    split_notification,
+)
+from lib.combo_utils.ont_utils import as_list
+
+LOGGER = getlogger(__name__)
+
+
+class OntStateTracker:
+    """
+    Live table of ONT oper-state and PON port location keyed by ont-id,
+    indexed by (port, oper-state) so per-port questions are answered
+    without scanning the table.
+    """
+
+    def __init__(self, conn: NetconfSession, resync_interval: float | None = 900):
+        self.conn = conn
+        self.resync_interval = resync_interval
+        self.enabled = False
+        self.last_sync = None
+
+        self._lock = threading.Lock()
+        self._onts = {}  # ont-id -> {"oper-state", "port", "linkage-state"}
+        self._by_port = {}  # (port, oper-state | None) -> set of ont-ids
+        # (ont-id, oper-state, port) applied during a resync, None otherwise
+        self._replay = None
+        self._resync_lock = threading.Lock()
+        self._resyncer = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Seed the table and start periodic resyncs if resync_interval is set."""
+        self.resync()
+        if self.resync_interval:
+            self.enabled = True
+            self._stop.clear()
+            self._resyncer = threading.Thread(target=self._resync_loop)
+            self._resyncer.daemon = True
+            self._resyncer.start()
+
+    def stop(self):
+        self.enabled = False
+        self._stop.set()
+        if self._resyncer is not None:
+            self._resyncer.join()
+            self._resyncer = None
+
+    def resync(self) -> bool:
+        """Rebuild the table from the system returning True if successful."""
+        with self._resync_lock:
+            with self._lock:
+                self._replay = []
+            try:
+                return self._resync()
+            finally:
+                with self._lock:
+                    self._replay = None
+
+    def _resync(self) -> bool:
+        states = self.conn.get_ont_states()
+        discovered = self.conn.get_discovered_onts()
+        if not states.ok or not discovered.ok:
+            LOGGER.error(
+                f"{self.conn.devicename}: ONT state resync failed: "
+                f"{states.err or discovered.err}"
+            )
+            return False
+
+        onts = {}
+        for ont in as_list((states.data or {}).get("states")):
+            status = ont.get("status") or {}
+            onts[ont["ont-id"]] = {
+                "oper-state": status.get("oper-state"),
+                "port": None,
+                "linkage-state": None,
+            }
+        for ont in as_list((discovered.data or {}).get("discovered onts")):
+            record = onts.setdefault(
+                ont["ont-id"],
+                {"oper-state": None, "port": None, "linkage-state": None},
+            )
+            record["port"] = f"{ont['shelf-id']}/{ont['slot-id']}/{ont['pon-port']}"
+            record["linkage-state"] = ont.get("state")
+
+        by_port = {}
+        for ontid, record in onts.items():
+            self._index(by_port, ontid, record)
+
+        with self._lock:
+            # notifications that arrived while the system was read
+            for ontid, oper_state, port in self._replay:
+                self._apply(onts, by_port, ontid, oper_state, port)
+            drift = sum(
+                1 for ontid, record in onts.items() if self._onts.get(ontid) != record
+            )
+            drift += sum(1 for ontid in self._onts if ontid not in onts)
+            if self.last_sync is not None and drift:
+                LOGGER.info(
+                    f"{self.conn.devicename}: ONT state resync corrected "
+                    f"{drift} entries"
+                )
+            self._onts = onts
+            self._by_port = by_port
+            self.last_sync = time.time()
+        return True
+
+    def apply_notification(self, notif_data: dict):
+        """Apply a single exa-events notification to the table.  Events that
+        do not refer to an ONT are ignored."""
+        event, body = split_notification(notif_data)
+        ontid = get_event_ont_id(body)
+        if ontid is None:
+            return
+
+        oper_state = ONT_PRESENCE_EVENTS.get(event, body.get("oper-state"))
+        port = None
+        if "shelf-id" in body and "slot-id" in body and "pon-port" in body:
+            port = f"{body['shelf-id']}/{body['slot-id']}/{body['pon-port']}"
+        if oper_state is None and port is None:
+            return
+
+        with self._lock:
+            self._apply(self._onts, self._by_port, ontid, oper_state, port)
+            if self._replay is not None:
+                self._replay.append((ontid, oper_state, port))
+
+    def get_ont_state(self, ontid: str) -> dict | None:
+        """Return a copy of the table entry for an ONT or None if unknown."""
+        with self._lock:
+            record = self._onts.get(str(ontid))
+            return dict(record) if record is not None else None
+
+    def get_ont_oper_state(self, ontid: str) -> str | None:
+        with self._lock:
+            record = self._onts.get(str(ontid))
+            return record["oper-state"] if record is not None else None
+
+    def get_onts_on_port(self, port: str, state: str | None = None) -> set:
+        """Return the ont-ids on a PON port (e.g. 1/1/xp3), optionally only
+        those in the given oper-state."""
+        with self._lock:
+            return set(self._by_port.get((port, state), ()))
+
+    def count_onts_on_port(self, port: str, state: str | None = None) -> int:
+        with self._lock:
+            return len(self._by_port.get((port, state), ()))
+
+    def get_ont_ids(self) -> list:
+        with self._lock:
+            return list(self._onts.keys())
+
+    def _resync_loop(self):
+        while not self._stop.wait(self.resync_interval):
+            try:
+                self.resync()
+            except Exception as err:
+                LOGGER.error(f"{self.conn.devicename}: ONT state resync failed: {err}")
+
+    @classmethod
+    def _apply(cls, onts: dict, by_port: dict, ontid: str, oper_state, port):
+        record = onts.get(ontid)
+        if record is None:
+            record = {"oper-state": None, "port": None, "linkage-state": None}
+            onts[ontid] = record
+        else:
+            cls._unindex(by_port, ontid, record)
+        if oper_state is not None:
+            record["oper-state"] = oper_state
+        if port is not None:
+            record["port"] = port
+        cls._index(by_port, ontid, record)
+
+    @staticmethod
+    def _index(by_port: dict, ontid: str, record: dict):
+        if record["port"] is None:
+            return
+        by_port.setdefault((record["port"], None), set()).add(ontid)
+        by_port.setdefault((record["port"], record["oper-state"]), set()).add(ontid)
+
+    @staticmethod
+    def _unindex(by_port: dict, ontid: str, record: dict):
+        if record["port"] is None:
+            return
+        for key in ((record["port"], None), (record["port"], record["oper-state"])):
+            ontids = by_port.get(key)
+            if ontids is not None:
+                ontids.discard(ontid)
+                if not ontids:
+                    del by_port[key]
@@ -0,0 +1,361 @@
+"""
+File: ont_upgrade.py
+
+Description: Houses the OntUpgradePipeline class which runs the ONT
+upgrade flow (download, install, activate, commit) for many upgrade
+classes across many AXOS systems.
+
+Each (device, upgrade class) pair is a job that moves through the stages
+in order.  Jobs run concurrently with a fleet-wide limit per stage, e.g.
+only a few downloads from the image server at once while activations run
+wider.  After each stage command the card statuses are polled, starting
+at poll_min seconds and backing off towards poll_max while nothing
+changes.  Completed stages are recorded in a checkpoint file, or in a
+JobJournal as "<upgrade class>:<stage>" steps of each device, so a run
+interrupted part way resumes where it left off.
+
+ONT upgrade card statuses are reported per system rather than per class,
+so by default only one job per device is in a stage at a time
+(per_device_limit).  The upgrade classes of one device therefore take
+turns, each stage command being polled to completion before the next
+class starts its stage; devices still run in parallel.  A higher limit
+only makes sense if the cards of the release report each class apart.
+
+A job that fails to reach its card statuses gives up after
+max_failed_polls failed or empty polls in a row, well before the stage
+timeout.
+
+Example:
+    pipeline = OntUpgradePipeline(
+        sessions={"e9-1": conn1, "e9-2": conn2},
+        release_name="23.4.0.0",
+        directory_path="/images",
+        stage_limits={"download": 4},
+        checkpoint="upgrade-23.4.json",
+    )
+    results = pipeline.run()
+
+set_ont_upgrade_server points the ONT upgrade server of many systems at a
+new image server, one edit-config per system, fanned out over a thread
+pool.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from lib.base_logger import getlogger
+from lib.axos_netconf.base import NetconfSession
+from lib.axos_netconf.errors import NetconfSessionError
+from lib.axos_netconf.responses import NetconfResponse
+from lib.combo_utils.job_journal import JobJournal
+from lib.combo_utils.ont_utils import as_list
+
+LOGGER = getlogger(__name__)
+
+STAGES = ("download", "install", "activate", "commit")
+
+
+def set_ont_upgrade_server(
+    sessions: dict,
+    hostname: str,
+    username: str,
+    password: str,
+    max_workers: int = 32,
+) -> dict:
+    """Set the ONT upgrade server on many devices returning a dictionary of
+    NetconfResponse keyed by device name."""
+
+    def _set(conn: NetconfSession) -> NetconfResponse:
+        try:
+            return conn.edit_ont_upgrade_server(hostname, username, password)
+        except Exception as err:
+            return NetconfResponse(ok=False, err=str(err))
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(_set, conn): devicename
+            for devicename, conn in sessions.items()
+        }
+        for future in as_completed(futures):
+            devicename = futures[future]
+            response = future.result()
+            if not response.ok:
+                LOGGER.error(f"{devicename}: set ONT upgrade server failed: {response.err}")
+            results[devicename] = response
+    return results
+
+
+class OntUpgradePipeline:
+    """Pipelined ONT upgrade across upgrade classes and devices."""
+
+    # card status values meaning a stage is still running or has failed
+    BUSY_STATUSES = (
+        "progress",
+        "pending",
+        "downloading",
+        "installing",
+        "activating",
+        "committing",
+    )
+    FAILED_STATUSES = ("fail", "error", "abort")
+
+    def __init__(
+        self,
+        sessions: dict,
+        release_name: str,
+        directory_path: str,
+        upgrade_classes: list | None = None,
+        stage_limits: dict | None = None,
+        per_device_limit: int = 1,
+        checkpoint: str | None = None,
+        poll_min: float = 5,
+        poll_max: float = 120,
+        stage_timeout: float = 3600,
+        progress=None,
+        max_workers: int = 32,
+        journal: JobJournal | None = None,
+        max_failed_polls: int = 10,
+    ):
+        self.sessions = sessions
+        self.release_name = release_name
+        self.directory_path = directory_path
+        self.upgrade_classes = upgrade_classes
+        self.checkpoint = checkpoint
+        self.poll_min = poll_min
+        self.poll_max = poll_max
+        self.stage_timeout = stage_timeout
+        self.progress = progress
+        self.max_workers = max_workers
+        # failed or empty card status polls in a row failing a stage
+        self.max_failed_polls = max_failed_polls
+        # journal of a job for this release, used instead of the checkpoint
+        # file to resume when given
+        self.journal = journal
+
+        stage_limits = stage_limits or {}
+        self._stage_slots = {
+            stage: threading.BoundedSemaphore(stage_limits.get(stage, max_workers))
+            for stage in STAGES
+        }
+        self._device_slots = {
+            name: threading.BoundedSemaphore(per_device_limit) for name in sessions
+        }
+        self._lock = threading.Lock()
+        self._completed = self._load_checkpoint()
+        self._results = {}
+
+    def run(self) -> dict:
+        """Run all jobs to completion returning a dictionary keyed by
+        (device, upgrade class) of {"stage", "status", "err"} where stage
+        is the last completed stage."""
+        jobs = []
+        for devicename in self.sessions:
+            for upgrade_class in self._get_upgrade_classes(devicename):
+                jobs.append((devicename, upgrade_class))
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._run_job, *job): job for job in jobs}
+            for future in as_completed(futures):
+                if future.exception() is not None:
+                    self._fail_job(*futures[future], future.exception())
+        return dict(self._results)
+
+    def _fail_job(self, devicename: str, upgrade_class: str, err: Exception):
+        """Record a job that raised as failed in the stage it was in."""
+        with self._lock:
+            done = self._completed.get(f"{devicename}|{upgrade_class}")
+            self._results[(devicename, upgrade_class)] = {
+                "stage": done,
+                "status": "failed",
+                "err": str(err),
+            }
+        index = STAGES.index(done) + 1 if done else 0
+        stage = STAGES[min(index, len(STAGES) - 1)]
+        LOGGER.error(f"{devicename} {upgrade_class}: {stage} failed: {err}")
+        try:
+            self._report(devicename, upgrade_class, stage, "failed")
+            if self.journal is not None:
+                self.journal.failed(devicename, f"{upgrade_class}:{stage}", str(err))
+        except Exception as exc:
+            LOGGER.error(f"{devicename} {upgrade_class}: cannot record failure: {exc}")
+
+    def get_progress(self) -> dict:
+        """Return the number of jobs that have completed each stage."""
+        counts = {stage: 0 for stage in STAGES}
+        with self._lock:
+            for stage in self._completed.values():
+                for done in STAGES[: STAGES.index(stage) + 1]:
+                    counts[done] += 1
+        return counts
+
+    def _get_upgrade_classes(self, devicename: str) -> list:
+        if self.upgrade_classes is not None:
+            return list(self.upgrade_classes)
+        response = self._call(devicename, "get_ont_upgrade_classes")
+        if not response.ok or not response.data:
+            LOGGER.error(f"{devicename}: cannot read ONT upgrade classes")
+            return []
+        try:
+            classes = response.data["config"]["system"]["ont-upgrade-class"]
+        except (KeyError, TypeError):
+            return []
+        return [entry["name"] for entry in as_list(classes)]
+
+    def _run_job(self, devicename: str, upgrade_class: str):
+        key = f"{devicename}|{upgrade_class}"
+        with self._lock:
+            done = self._completed.get(key)
+        remaining = STAGES[STAGES.index(done) + 1 :] if done else STAGES
+        result = {"stage": done, "status": "done", "err": None}
+
+        for stage in remaining:
+            with self._device_slots[devicename], self._stage_slots[stage]:
+                self._report(devicename, upgrade_class, stage, "started")
+                if self.journal is not None:
+                    self.journal.start(devicename, f"{upgrade_class}:{stage}")
+                try:
+                    err = self._run_stage(devicename, upgrade_class, stage)
+                except Exception as exc:
+                    err = str(exc)
+            if err is not None:
+                LOGGER.error(f"{devicename} {upgrade_class}: {stage} failed: {err}")
+                self._report(devicename, upgrade_class, stage, "failed")
+                if self.journal is not None:
+                    self.journal.failed(devicename, f"{upgrade_class}:{stage}", err)
+                result.update(status="failed", err=err)
+                break
+            result["stage"] = stage
+            self._save_checkpoint(key, stage)
+            if self.journal is not None:
+                self.journal.done(devicename, f"{upgrade_class}:{stage}")
+            self._report(devicename, upgrade_class, stage, "done")
+
+        with self._lock:
+            self._results[(devicename, upgrade_class)] = result
+
+    def _run_stage(self, devicename: str, upgrade_class: str, stage: str) -> str | None:
+        """Run one stage command and wait for the cards to finish returning an
+        error string or None if successful."""
+        if stage == "install":
+            response = self._call(
+                devicename,
+                "perform_ont_upgrade_install",
+                self.release_name,
+                self.directory_path,
+                upgrade_class,
+            )
+        else:
+            response = self._call(
+                devicename,
+                f"perform_ont_upgrade_{stage}",
+                self.release_name,
+                upgrade_class,
+            )
+        if not response.ok:
+            return response.err
+        return self._wait_for_cards(devicename)
+
+    def _wait_for_cards(self, devicename: str) -> str | None:
+        """Poll card statuses with adaptive backoff until none are busy.  A
+        poll that fails or reads no card statuses tells nothing of the
+        stage, polling goes on until the stage times out or max_failed_polls
+        such polls were made in a row."""
+        interval = self.poll_min
+        deadline = time.monotonic() + self.stage_timeout
+        previous = None
+        failed_polls = 0
+        while True:
+            time.sleep(interval)
+            try:
+                response = self._call(devicename, "get_ont_upgrade_card_statuses")
+            except NetconfSessionError as err:
+                response = NetconfResponse(ok=False, err=str(err))
+            statuses = []
+            if response.ok and response.data:
+                statuses = [
+                    str(card.get("status", "")).lower()
+                    for card in as_list(response.data["statuses"])
+                ]
+            if statuses:
+                failed_polls = 0
+                failed = [
+                    s for s in statuses if any(f in s for f in self.FAILED_STATUSES)
+                ]
+                if failed:
+                    return f"card status {failed[0]}"
+                if not any(b in s for s in statuses for b in self.BUSY_STATUSES):
+                    return None
+            else:
+                failed_polls += 1
+                if not response.ok:
+                    LOGGER.warning(
+                        f"{devicename}: card status poll failed: {response.err}"
+                    )
+                if failed_polls >= self.max_failed_polls:
+                    last = response.err or "no card statuses"
+                    return f"no card statuses after {failed_polls} polls: {last}"
+            if time.monotonic() > deadline:
+                if not statuses:
+                    last = response.err or "no card statuses"
+                    return f"timed out without card statuses, last poll: {last}"
+                return f"timed out with card statuses {statuses}"
+            if statuses == previous:
+                interval = min(interval * 1.5, self.poll_max)
+            else:
+                interval = self.poll_min
+            previous = statuses
+
+    def _call(self, devicename: str, method: str, *args):
+        """Call a session method, sessions are shared by the jobs of a
+        device (see session.py)."""
+        conn: NetconfSession = self.sessions[devicename]
+        return getattr(conn, method)(*args)
+
+    def _report(self, devicename: str, upgrade_class: str, stage: str, state: str):
+        LOGGER.info(f"{devicename} {upgrade_class}: {stage} {state}")
+        if self.progress is not None:
+            self.progress(devicename, upgrade_class, stage, state)
+
+    def _load_checkpoint(self) -> dict:
+        if self.journal is not None:
+            return self._load_journal()
+        if self.checkpoint is None or not os.path.exists(self.checkpoint):
+            return {}
+        with open(self.checkpoint, "r", encoding="utf8") as infile:
+            data = json.load(infile)
+        if data.get("release") != self.release_name:
+            LOGGER.warning(
+                f"Ignoring checkpoint {self.checkpoint} for release {data.get('release')}"
+            )
+            return {}
+        return data.get("completed", {})
+
+    def _load_journal(self) -> dict:
+        """Return the last completed stage of each job in the journal."""
+        completed = {}
+        for devicename, step in self.journal.get_done():
+            upgrade_class, _, stage = step.rpartition(":")
+            if stage not in STAGES:
+                continue
+            key = f"{devicename}|{upgrade_class}"
+            done = completed.get(key)
+            if done is None or STAGES.index(stage) > STAGES.index(done):
+                completed[key] = stage
+        return completed
+
+    def _save_checkpoint(self, key: str, stage: str):
+        with self._lock:
+            self._completed[key] = stage
+            if self.checkpoint is None:
+                return
+            tmpfile = f"{self.checkpoint}.tmp"
+            with open(tmpfile, "w", encoding="utf8") as outfile:
+                json.dump(
+                    {"release": self.release_name, "completed": self._completed},
+                    outfile,
+                )
+            os.replace(tmpfile, self.checkpoint)
@@ -11,19 +11,20 @@ import threading
 import time
 import re
 
-from app.base_logger import getlogger
-from app.lib.axos_netconf.base import NetconfSession
+from lib.base_logger import getlogger
+from lib.axos_netconf.base import NetconfSession
 
 LOGGER = getlogger(__name__)
 
+# ponport_regex = re.compile(r"^[1-9]\/[1-2]\/xp([1-9]{1,2})$")
+PON_PORT_REGEX = re.compile(r"^[1-9]\/[1-2]\/[xg]p([1-9][0-9]?)$")
+
 
 def is_pon_port(string: str) -> bool:
     """Checks if the entered string is a PON port
     Valid format = [1-9]/[1-2]/xp[1-48]
     """
-    # ponport_regex = re.compile(r"^[1-9]\/[1-2]\/xp([1-9]{1,2})$")
-    ponport_regex = re.compile(r"^[1-9]\/[1-2]\/[xg]p([1-9]{1,2})$")
-    match = ponport_regex.match(string)
+    match = PON_PORT_REGEX.match(string)
     if not match:
         return False
     if int(match.group(1)) > 48:
@@ -31,6 +32,16 @@ def is_pon_port(string: str) -> bool:
     return True
 
 
+def as_list(value) -> list:
+    """xmltodict returns a dict for a single entry and a list for several,
+    return either as a list."""
+    if value is None:
+        return []
+    if isinstance(value, dict):
+        return [value]
+    return value
+
+
 def get_discovered_onts(conn: NetconfSession, format: type = list) -> list | dict:
     """Get the current discovered onts and return them as a list or dictionary"""
     response = conn.get_discovered_onts()
@@ -88,14 +99,78 @@ def ont_list2dict(conn: NetconfSession, ont_list: list) -> dict:
     return ont_dict
 
 
-def ont_ports_to_ids(conn: NetconfSession, id_list: list) -> list:
-    discovered_onts = get_discovered_onts(conn, format=list)
-    new_id_list = id_list[:]
-    for id in id_list:
-        if is_pon_port(id):
-            index = new_id_list.index(id)
-            new_id_list.remove(id)
-            for ont in discovered_onts:
-                if f"{ont['shelf-id']}/{ont['slot-id']}/{ont['pon-port']}" == id:
-                    new_id_list.insert(index, ont["ont-id"])
-    return new_id_list
+class OntPortResolver:
+    """
+    Resolves PON ports to the ONTs discovered on them.
+
+    Discovery results are cached for ttl seconds and indexed by
+    (shelf, slot, pon) so resolving a list of ids and ports is linear in
+    the length of the list.  Discovery is only read when a port actually
+    needs resolving.
+    """
+
+    def __init__(self, conn: NetconfSession, ttl: float = 60):
+        self.conn = conn
+        self.ttl = ttl
+        self._index = None  # (shelf, slot, pon) -> [ont-id]
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Drop the cached discovery results."""
+        with self._lock:
+            self._index = None
+
+    def get_ont_ids(self, port: str) -> list:
+        """Return the ids of the ONTs discovered on a PON port (e.g. 1/1/xp3)."""
+        return list(self._get_index().get(tuple(port.split("/")), ()))
+
+    def resolve(self, id_list: list) -> list:
+        """Return id_list with every PON port replaced, in place, by the ids of
+        the ONTs discovered on it."""
+        new_id_list = []
+        index = None
+        for id in id_list:
+            if not is_pon_port(id):
+                new_id_list.append(id)
+                continue
+            if index is None:
+                index = self._get_index()
+            new_id_list.extend(index.get(tuple(id.split("/")), ()))
+        return new_id_list
+
+    def _get_index(self) -> dict:
+        with self._lock:
+            if self._index is None or time.monotonic() >= self._expires:
+                index = {}
+                for ont in get_discovered_onts(self.conn, format=list) or []:
+                    key = (str(ont["shelf-id"]), str(ont["slot-id"]), ont["pon-port"])
+                    index.setdefault(key, []).append(ont["ont-id"])
+                self._index = index
+                self._expires = time.monotonic() + self.ttl
+            return self._index
+
+
+_resolver_lock = threading.Lock()
+
+
+def ont_ports_to_ids(
+    conn: NetconfSession, id_list: list, resolver: OntPortResolver | None = None
+) -> list:
+    """Replace PON ports in a list of ONT ids with the ids of the ONTs
+    discovered on them, using resolver or else the resolver of the session
+    so discovery is cached across calls."""
+    if resolver is None:
+        resolver = get_ont_port_resolver(conn)
+    return resolver.resolve(id_list)
+
+
+def get_ont_port_resolver(conn: NetconfSession) -> OntPortResolver:
+    """Return the OntPortResolver held by a session, created at first use and
+    shared by every caller using the session."""
+    with _resolver_lock:
+        resolver = getattr(conn, "ont_port_resolver", None)
+        if resolver is None:
+            resolver = OntPortResolver(conn)
+            conn.ont_port_resolver = resolver
+        return resolver
@@ -0,0 +1,333 @@
+"""
+File: poll_scheduler.py
+
+Description: Houses the PollScheduler class which runs recurring NETCONF
+read jobs (health checks, ONT states, interface counters, ...) across
+many AXOS systems.
+
+Each job is a subtree filter polled every interval seconds on one device.
+Jobs start at a random phase within their interval, and every run is
+jittered, so jobs added together do not fire together.  Jobs on the same
+device that fall due within merge_window seconds of each other are served
+by one get whose filter is the union of theirs.  Each job then receives
+only its own slice of the reply, as if it had sent its own get:
+
+    scheduler = PollScheduler({"e9-1": conn1, "e9-2": conn2})
+    scheduler.add_job("e9-1", "ont-states", ONT_STATES_FILTER, 300, on_states)
+    scheduler.add_job("e9-1", "alarms", ALARMS_FILTER, 60, on_alarms)
+    scheduler.start()
+
+    def on_states(devicename, response):
+        xmltodict.parse(response.xml)["rpc-reply"]["data"]
+
+The number of gets in flight per device is limited by max_rpcs_per_device.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from lxml import etree
+
+from lib.base_logger import getlogger
+from lib.axos_netconf.base import NetconfSession
+from lib.axos_netconf.responses import NetconfResponse
+
+LOGGER = getlogger(__name__)
+
+NETCONF_NS = "urn:ietf:params:xml:ns:netconf:base:1.0"
+
+
+def _parse_filter(nc_filter: str) -> list:
+    """Return the top level filter elements of a subtree filter given with
+    or without its enclosing <filter> element."""
+    root = etree.fromstring(f"<filter>{nc_filter.strip()}</filter>")
+    if len(root) == 1 and etree.QName(root[0]).localname == "filter":
+        root = root[0]
+    return [element for element in root if isinstance(element.tag, str)]
+
+
+def _is_content_match(element) -> bool:
+    return len(element) == 0 and bool((element.text or "").strip())
+
+
+def _merge_key(element) -> tuple:
+    """Elements are merged when they have the same tag and the same content
+    match children, i.e. they select the same list entries."""
+    matches = tuple(
+        sorted(
+            (child.tag, child.text.strip())
+            for child in element
+            if isinstance(child.tag, str) and _is_content_match(child)
+        )
+    )
+    return (element.tag, (element.text or "").strip(), matches)
+
+
+def _merge_into(target: list, elements: list):
+    for element in elements:
+        key = _merge_key(element)
+        for existing in target:
+            if _merge_key(existing) != key:
+                continue
+            if len(existing) == 0:
+                # selection node already selects everything below it
+                break
+            if len(element) == 0:
+                existing[:] = []
+                break
+            children = [child for child in existing if isinstance(child.tag, str)]
+            _merge_into(
+                children,
+                [
+                    child
+                    for child in element
+                    if isinstance(child.tag, str) and not _is_content_match(child)
+                ],
+            )
+            existing[:] = children
+            break
+        else:
+            target.append(_copy(element))
+
+
+def _copy(element):
+    copy = etree.Element(element.tag, nsmap=element.nsmap)
+    copy.text = element.text if _is_content_match(element) else None
+    copy[:] = [_copy(child) for child in element if isinstance(child.tag, str)]
+    return copy
+
+
+def merge_filters(filters: list) -> str:
+    """Merge subtree filters into a single <filter type="subtree"> element
+    selecting the union of what each of them selects.  The filter may have
+    several top level elements (e.g. status and interfaces-state), it is
+    passed to get as it is rather than as a ("subtree", criteria) tuple,
+    which takes a single element."""
+    if len(filters) == 1:
+        merged = _parse_filter(filters[0])
+    else:
+        merged = []
+        for nc_filter in filters:
+            _merge_into(merged, _parse_filter(nc_filter))
+    subtree = etree.Element(
+        f"{{{NETCONF_NS}}}filter", nsmap={None: NETCONF_NS}, type="subtree"
+    )
+    for element in merged:
+        element.tail = None
+        subtree.append(element)
+    return etree.tostring(subtree, encoding="unicode")
+
+
+def _matches(value: str, wanted: str) -> bool:
+    value, wanted = value.strip(), wanted.strip()
+    # identityref values may carry different prefixes
+    return value == wanted or value.split(":")[-1] == wanted.split(":")[-1]
+
+
+def _select(data, filter_children: list):
+    """Apply filter_children to the children of data returning a filtered
+    copy of data or None if data does not match."""
+    content_matches = [child for child in filter_children if _is_content_match(child)]
+    for match in content_matches:
+        if not any(
+            child.tag == match.tag and _matches(child.text or "", match.text)
+            for child in data
+        ):
+            return None
+
+    result = etree.Element(data.tag, nsmap=data.nsmap)
+    others = [child for child in filter_children if not _is_content_match(child)]
+    if not others:
+        # only content match nodes, every child is selected
+        result[:] = [_deepcopy(child) for child in data]
+        return result
+
+    for match in content_matches:
+        for child in data:
+            if child.tag == match.tag:
+                result.append(_deepcopy(child))
+    for child in data:
+        for node in others:
+            if child.tag != node.tag:
+                continue
+            if len(node) == 0:
+                result.append(_deepcopy(child))
+                break
+            selected = _select(child, list(node))
+            if selected is not None:
+                result.append(selected)
+                break
+    return result
+
+
+def _deepcopy(element):
+    copy = etree.fromstring(etree.tostring(element))
+    copy.tail = None
+    return copy
+
+
+def apply_filter(reply_xml: str, nc_filter: str) -> str:
+    """Return the rpc-reply reply_xml reduced to what nc_filter selects."""
+    reply = etree.fromstring(reply_xml.encode("utf-8"))
+    data = reply.find(f"{{{NETCONF_NS}}}data")
+    result = etree.Element(f"{{{NETCONF_NS}}}rpc-reply", nsmap={None: NETCONF_NS})
+    sliced = etree.SubElement(result, f"{{{NETCONF_NS}}}data")
+    if data is not None:
+        filtered = _select(data, _parse_filter(nc_filter))
+        if filtered is not None:
+            sliced[:] = list(filtered)
+    return etree.tostring(result, encoding="unicode")
+
+
+class _PollJob:
+    def __init__(self, devicename, name, nc_filter, interval, callback, due):
+        self.devicename = devicename
+        self.name = name
+        self.nc_filter = nc_filter
+        self.interval = interval
+        self.callback = callback
+        self.due = due
+        self.running = False
+
+
+class PollScheduler:
+    """Runs recurring subtree filter gets across devices, merging the gets
+    of jobs that fall due together on the same device."""
+
+    def __init__(
+        self,
+        sessions: dict,
+        max_rpcs_per_device: int = 1,
+        jitter: float = 0.05,
+        merge_window: float = 5.0,
+        max_workers: int = 16,
+    ):
+        """sessions is {devicename: NetconfSession}.  Each run is moved by up
+        to jitter * interval either way."""
+        self.sessions = sessions
+        self.jitter = jitter
+        self.merge_window = merge_window
+        self.max_workers = max_workers
+        self.enabled = False
+        self.stats = {"gets": 0, "jobs run": 0, "merged": 0, "skipped": 0}
+
+        self._device_slots = {
+            name: threading.BoundedSemaphore(max_rpcs_per_device) for name in sessions
+        }
+        self._jobs = {}  # (devicename, name) -> _PollJob
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._executor = None
+        self._runner = None
+
+    def add_job(
+        self, devicename: str, name: str, nc_filter: str, interval: float, callback
+    ):
+        """Poll nc_filter on devicename every interval seconds calling
+        callback(devicename, response) with a NetconfResponse holding the
+        job's slice of the reply."""
+        if devicename not in self.sessions:
+            raise KeyError(f"Unknown device {devicename}")
+        _parse_filter(nc_filter)
+        due = time.monotonic() + random.uniform(0, interval)
+        with self._lock:
+            self._jobs[(devicename, name)] = _PollJob(
+                devicename, name, nc_filter, interval, callback, due
+            )
+        self._wakeup.set()
+
+    def remove_job(self, devicename: str, name: str):
+        with self._lock:
+            self._jobs.pop((devicename, name), None)
+
+    def get_job_names(self, devicename: str) -> list:
+        with self._lock:
+            return [name for device, name in self._jobs if device == devicename]
+
+    def start(self):
+        self.enabled = True
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self._runner = threading.Thread(target=self._run)
+        self._runner.daemon = True
+        self._runner.start()
+
+    def stop(self):
+        self.enabled = False
+        self._wakeup.set()
+        if self._runner is not None:
+            self._runner.join()
+            self._runner = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _run(self):
+        while self.enabled:
+            now = time.monotonic()
+            batches = {}
+            with self._lock:
+                due = [job for job in self._jobs.values() if job.due <= now]
+                devices = {job.devicename for job in due}
+                for job in self._jobs.values():
+                    if job.devicename not in devices:
+                        continue
+                    if job.due > now + self.merge_window:
+                        continue
+                    if job.running:
+                        self.stats["skipped"] += 1
+                    else:
+                        job.running = True
+                        batches.setdefault(job.devicename, []).append(job)
+                    self._reschedule(job, now)
+                next_due = min((job.due for job in self._jobs.values()), default=None)
+
+            for devicename, jobs in batches.items():
+                self._executor.submit(self._poll, devicename, jobs)
+
+            self._wakeup.clear()
+            timeout = None if next_due is None else max(0.0, next_due - time.monotonic())
+            self._wakeup.wait(timeout)
+
+    def _reschedule(self, job: _PollJob, now: float):
+        offset = random.uniform(-self.jitter, self.jitter) * job.interval
+        job.due = max(job.due + job.interval, now) + offset
+        if job.due <= now:
+            job.due = now + job.interval
+
+    def _poll(self, devicename: str, jobs: list):
+        try:
+            conn: NetconfSession = self.sessions[devicename]
+            nc_filter = merge_filters([job.nc_filter for job in jobs])
+            with self._device_slots[devicename]:
+                try:
+                    reply = conn.get(nc_filter=nc_filter)
+                    response = NetconfResponse(
+                        ok=reply.ok,
+                        err=reply.err,
+                        xml=reply.xml,
+                    )
+                except Exception as err:
+                    response = NetconfResponse(ok=False, err=str(err))
+            with self._lock:
+                self.stats["gets"] += 1
+                self.stats["jobs run"] += len(jobs)
+                self.stats["merged"] += len(jobs) - 1
+
+            for job in jobs:
+                job_response = response
+                if response.ok and len(jobs) > 1:
+                    job_response = NetconfResponse(
+                        xml=apply_filter(response.xml, job.nc_filter)
+                    )
+                try:
+                    job.callback(devicename, job_response)
+                except Exception as err:
+                    LOGGER.error(f"{devicename}: poll job {job.name} failed: {err}")
+        except Exception as err:
+            LOGGER.error(f"{devicename}: poll failed: {err}")
+        finally:
+            with self._lock:
+                for job in jobs:
+                    job.running = False
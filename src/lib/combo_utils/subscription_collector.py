@@ -0,0 +1,248 @@
+"""
+File: subscription_collector.py
+
+Description: Houses the SubscriptionCollector class which holds exa-events
+subscriptions to many AXOS systems from a single process.
+
+Notifications from every device are merged into one queue and tagged with
+the name of the device they came from.  Delivery is driven by each session's
+own transport through a notification listener, so no listener thread blocks
+in take_notification per device.  A single supervisor thread connects,
+subscribes and, on failure, reconnects and resubscribes devices with a
+backoff.
+
+Example:
+    collector = SubscriptionCollector("region-west", notifCategories="PON")
+    for conn in sessions:
+        collector.add_device(conn)
+    collector.start()
+    collector.run()  # publishes on pubsub topic "region-west"
+"""
+
+import queue
+import threading
+import time
+from pubsub import pub
+
+from lib.base_logger import getlogger
+from lib.axos_netconf.base import NetconfSession
+from lib.axos_netconf.responses import NetconfResponse
+from lib.combo_utils.notification_coalescer import NotificationCoalescer
+
+LOGGER = getlogger(__name__)
+
+
+def _format_notification_categories(notifCategories: str | list | None) -> list | None:
+    """Converts notification categories to a list or None type."""
+    if isinstance(notifCategories, str):
+        return notifCategories.replace(" ", "").split(",")
+    if isinstance(notifCategories, list) and len(notifCategories) == 0:
+        return None
+    return notifCategories
+
+
+class SubscriptionCollector:
+    """
+    Holds exa-events subscriptions to many AXOS systems and merges their
+    notifications into a single stream tagged with the device name.
+
+    Devices are keyed by the devicename of their session, falling back to
+    the hostname when no devicename was given.
+
+    With coalesce_window set, run() collapses bursts of related events per
+    device over that many seconds before publishing, see
+    NotificationCoalescer.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        notifCategories: str | list | None = None,
+        reconnect_interval: float = 5,
+        max_reconnect_interval: float = 300,
+        queue_size: int = 0,
+        coalesce_window: float | None = None,
+    ):
+        self.name = name
+        self.notification_categories = _format_notification_categories(
+            notifCategories
+        )
+        self.reconnect_interval = reconnect_interval
+        self.max_reconnect_interval = max_reconnect_interval
+        self.enabled = False
+
+        self._devices = {}  # devicename -> per device state
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._supervisor = None
+
+        self.coalescer = None
+        if coalesce_window:
+            self.coalescer = NotificationCoalescer(
+                self._publish, window=coalesce_window
+            )
+
+    def add_device(self, conn: NetconfSession) -> str:
+        """Add a device session to the collector returning the device name used
+        to tag its notifications.  The session is connected and subscribed by
+        the supervisor thread."""
+        devicename = conn.devicename or conn.hostname
+        with self._lock:
+            self._devices[devicename] = {
+                "conn": conn,
+                "subscribed": False,
+                "generation": 0,
+                "retry_at": 0.0,
+                "backoff": self.reconnect_interval,
+            }
+        self._wakeup.set()
+        return devicename
+
+    def remove_device(self, devicename: str):
+        """Stop collecting from a device and close its session."""
+        with self._lock:
+            device = self._devices.pop(devicename, None)
+        if device is not None:
+            self._close(device)
+
+    def get_device_names(self) -> list:
+        return list(self._devices.keys())
+
+    def get_subscribed_device_names(self) -> list:
+        return [name for name, dev in self._devices.items() if dev["subscribed"]]
+
+    def start(self):
+        """Start the supervisor thread which subscribes all devices."""
+        self.enabled = True
+        if self.coalescer is not None:
+            self.coalescer.start()
+        self._supervisor = threading.Thread(target=self._supervise)
+        self._supervisor.daemon = True
+        self._supervisor.start()
+
+    def stop(self):
+        """Stop the supervisor thread and close all device sessions."""
+        self.enabled = False
+        self._wakeup.set()
+        if self._supervisor is not None:
+            self._supervisor.join()
+            self._supervisor = None
+        if self.coalescer is not None:
+            self.coalescer.stop()
+        with self._lock:
+            devices = list(self._devices.values())
+        for device in devices:
+            self._close(device)
+
+    def take_notification(
+        self, block: bool = True, timeout: float | None = None
+    ) -> NetconfResponse:
+        """Take the next notification from the merged stream.
+        Returning response.data = None if no notification is available,
+        otherwise response.data = {"device": name, "notification": dict}.
+        """
+        try:
+            devicename, conn, xml = self._queue.get(block=block, timeout=timeout)
+        except queue.Empty:
+            return NetconfResponse(data=None)
+        return NetconfResponse(
+            data={"device": devicename, "notification": conn.parse_notification(xml)}
+        )
+
+    def run(self):
+        """Publish merged notifications on the pubsub topic named after the
+        collector until the collector is stopped."""
+        while self.enabled:
+            response = self.take_notification(block=True, timeout=1)
+            if not (response.ok and response.data):
+                continue
+            if self.coalescer is not None:
+                self.coalescer.submit(
+                    response.data["notification"], source=response.data["device"]
+                )
+            else:
+                self._publish(response.data["notification"], response.data["device"])
+
+    def _publish(self, notif_data: dict, devicename: str):
+        pub.sendMessage(self.name, device=devicename, notif_data=notif_data)
+
+    def _supervise(self):
+        while self.enabled:
+            # cleared before the scan, a device lost during the scan sets
+            # it again and is picked up by the next pass
+            self._wakeup.clear()
+            now = time.monotonic()
+            with self._lock:
+                due = [
+                    (name, dev)
+                    for name, dev in self._devices.items()
+                    if not dev["subscribed"] and dev["retry_at"] <= now
+                ]
+            for devicename, device in due:
+                if not self.enabled:
+                    break
+                self._subscribe(devicename, device)
+
+            with self._lock:
+                retry_times = [
+                    dev["retry_at"]
+                    for dev in self._devices.values()
+                    if not dev["subscribed"]
+                ]
+            wait = self.max_reconnect_interval
+            if retry_times:
+                wait = max(0.0, min(retry_times) - time.monotonic())
+            self._wakeup.wait(wait)
+
+    def _subscribe(self, devicename: str, device: dict):
+        """Connect and subscribe a single device, scheduling a retry with
+        exponential backoff on failure."""
+        conn = device["conn"]
+        self._close(device)
+        device["generation"] += 1
+        generation = device["generation"]
+        try:
+            conn.connect(retry=False)
+            conn.add_notification_listener(
+                lambda xml: self._queue.put((devicename, conn, xml)),
+                lambda err: self._on_session_error(devicename, generation, err),
+            )
+            response = conn.create_subscription(self.notification_categories)
+        except Exception as err:
+            response = NetconfResponse(ok=False, err=str(err))
+
+        if response.ok:
+            LOGGER.info(f"{devicename}: exa-event subscription created")
+            device["subscribed"] = True
+            device["backoff"] = self.reconnect_interval
+            return
+
+        LOGGER.error(
+            f"{devicename}: failed to subscribe, retrying in "
+            f"{device['backoff']}s: {response.err}"
+        )
+        self._close(device)
+        device["retry_at"] = time.monotonic() + device["backoff"]
+        device["backoff"] = min(device["backoff"] * 2, self.max_reconnect_interval)
+
+    def _on_session_error(self, devicename: str, generation: int, err: Exception):
+        """Called from the session transport when a device connection fails."""
+        with self._lock:
+            device = self._devices.get(devicename)
+            if device is None or device["generation"] != generation:
+                return
+            device["subscribed"] = False
+            device["retry_at"] = time.monotonic() + device["backoff"]
+        LOGGER.warning(f"{devicename}: subscription session lost: {err}")
+        self._wakeup.set()
+
+    def _close(self, device: dict):
+        conn = device["conn"]
+        device["subscribed"] = False
+        if conn.session is None:
+            return
+        try:
+            conn.disconnect()
+        except Exception:
+            conn.session = None
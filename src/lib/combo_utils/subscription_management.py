@@ -6,17 +6,27 @@ Description: Houses the subscription_manager class, instances of which
 can be used to listen for subscription events on an AXOS system.
 The subscription manager requires a NETCONF connection to the AXOS system
 you want notifications from, this connection can be one already in use
-by other toolbox functions but this may not be ideal if you plan to change
-the filters of the subscription.
+by other toolbox functions.  Notifications are taken on a separate
+session opened from it, so RPCs on the connection passed in are never
+held up by notifications and the connection is never reset.
 """
 
+import json
 import threading
-from app.base_logger import getlogger
-from app.lib.axos_netconf.base import NetconfSession
+import time
+import warnings
+from lib.base_logger import getlogger
+from lib.axos_netconf.base import NetconfSession
+from lib.combo_utils.event_utils import get_event_time
+from lib.combo_utils.notification_coalescer import NotificationCoalescer
 from pubsub import pub
 
 LOGGER = getlogger(__name__)
 
+# seconds a copy of a notification received on one session may lag the
+# copy received on the other
+DUPLICATE_WINDOW = 5.0
+
 
 class SubscriptionManager:
     """
@@ -26,6 +36,20 @@ class SubscriptionManager:
     and using pubsub library publishes a message containing the
     notification data allowing the user to create subscription
     functions in their code to parse the data.
+
+    The subscription is made on a session of its own (notification_conn).
+    Filter changes are make-before-break: the new filter is subscribed on a
+    further session and consumers are switched over to it before the old
+    session is closed.  Notifications received on both sessions are only
+    published once: every notification is recorded by its eventTime before
+    it is published and, while two sessions are listened to and for
+    DUPLICATE_WINDOW seconds after, copies arriving on the other session
+    are dropped.  Outside a filter change repeated notifications are all
+    published.
+
+    With coalesce_window set, bursts of related events (e.g. ONT flaps)
+    are collapsed over that many seconds before being published, see
+    NotificationCoalescer.
     """
 
     def __init__(
@@ -33,57 +57,126 @@ class SubscriptionManager:
         conn: NetconfSession,
         name: str,
         notifCategories: str | list | None = None,
+        overlap: float = 2.0,
+        coalesce_window: float | None = None,
     ):
         self.conn = conn
+        self.notification_conn = None
         self.name = name
         self.enabled = True
+        self.overlap = overlap  # seconds both sessions are listened to
         self.notification_categories = self._format_notification_categories(
             notifCategories
         )
         self._prev_notification_categories = None
 
-        self.update_subscription(restart_conn=False)  # create initial subscription
+        self._lock = threading.Lock()
+        self._listening = set()  # sessions whose notifications are published
+        self._listeners = {}  # session -> listener thread
+        self._seen = {}  # (eventTime, notification) -> time published
+        # copies are dropped until then once back to a single session
+        self._dedup_until = 0.0
+
+        self.coalescer = None
+        if coalesce_window:
+            self.coalescer = NotificationCoalescer(
+                lambda notif_data, source: pub.sendMessage(
+                    self.name, notif_data=notif_data
+                ),
+                window=coalesce_window,
+            )
+            self.coalescer.start()
+
+        self.update_subscription()  # create initial subscription
 
     def _format_notification_categories(
         self, notifCategories: str | list | None
     ) -> list | None:
         """Converts notification categories to a list or None type."""
         if type(notifCategories) is str:
-            notifCategories.replace(" ", "")  # remove all spaces from string
+            notifCategories = notifCategories.replace(" ", "")  # remove all spaces
             return notifCategories.split(",")  # if string is a comma seperated list
         elif type(notifCategories) is list and len(notifCategories) == 0:
             return None
         else:
             return notifCategories
 
-    def update_subscription(self, restart_conn=True):
+    def update_subscription(self, restart_conn: bool | None = None):
         """
-        Update the subscription categories by resetting the netconf connection
-        and creating a new subscription using the contents of the
-        notification_categories property.
+        Update the subscription categories by creating a new subscription
+        using the contents of the notification_categories property.
 
-        (WARNING: Doing this resets the NETCONF connection
-        the subscription_manager instance is using!!!)
+        A new notification session is opened and subscribed with the new
+        categories.  Once it is listening, consumers are switched over to it
+        and the previous notification session is closed after the overlap
+        period.
+
+        restart_conn is deprecated and ignored, the connection passed in is
+        never reset.
         """
-        # Reset the subscription categories by disconnecting and reconnecting
-        if restart_conn:
-            self.conn.disconnect()  # disconnect the netconf session
-            self.conn.connect()  # reconnect the netconf session
+        if restart_conn is not None:
+            warnings.warn(
+                "restart_conn is deprecated and ignored, subscriptions are "
+                "always made on a notification session of their own",
+                DeprecationWarning,
+                stacklevel=2,
+            )
+        try:
+            conn = self.conn.open_notification_session()
+        except Exception as err:
+            LOGGER.critical(f"{self.conn.devicename}: {err}")
+            self._revert_notification_categories()
+            return
         # Create the new subscription with the updated notification categories
-        response = self.conn.create_subscription(self.notification_categories)
+        response = conn.create_subscription(self.notification_categories)
         if not response.ok:
             LOGGER.critical(
                 f"Failed to create exa-event subscription with notifCategories:\
                  {self.notification_categories}"
             )
             if response.err:
-                LOGGER.critical(f"{self.conn.devicename}: {response.err}")
-            # revert to previous categories on failure
+                LOGGER.critical(f"{conn.devicename}: {response.err}")
+            conn.disconnect()
+            # revert to previous categories on failure, the previous
+            # subscription is still active on its own session
+            self._revert_notification_categories()
+            return
+
+        old_conn = self.notification_conn
+        with self._lock:
+            self._listening.add(conn)
+        self._start_listener_thread(conn)
+
+        # switch consumers to the new session, then retire the old one
+        self.notification_conn = conn
+        self._prev_notification_categories = None
+        if old_conn is not None:
+            retire = threading.Timer(self.overlap, self._retire, args=(old_conn,))
+            retire.daemon = True
+            retire.start()
+
+    def _revert_notification_categories(self):
+        if self._prev_notification_categories is not None:
             self.notification_categories = self._prev_notification_categories
             self._prev_notification_categories = None
-            self.update_subscription()
-        else:
-            self.start_listener()
+
+    def _retire(self, conn: NetconfSession):
+        """Stop publishing notifications from a session replaced by a filter
+        change and close it."""
+        with self._lock:
+            self._listening.discard(conn)
+            self._dedup_until = time.monotonic() + DUPLICATE_WINDOW
+        self._close(conn)
+
+    def _close(self, conn: NetconfSession):
+        """Close a notification session once its listener has stopped."""
+        listener = self._listeners.pop(conn, None)
+        if listener is not None and listener is not threading.current_thread():
+            listener.join(timeout=5)
+        try:
+            conn.disconnect()
+        except Exception as err:
+            LOGGER.warning(f"{conn.devicename}: {err}")
 
     def add_notification_categories(self, newCategories: str | list):
         """
@@ -95,41 +188,92 @@ class SubscriptionManager:
         )  # back up previous categories
         # create blank list if no categories were present
         if self.notification_categories is None:
-            self.notificiation_categories = []
+            self.notification_categories = []
         newCategories = self._format_notification_categories(newCategories)
-        self.notification_categories += (
-            newCategories  # add the subscriptions to the existing ones
-        )
+        self.notification_categories = (
+            self.notification_categories + newCategories
+        )  # add the subscriptions to the existing ones
 
     def start_listener(self):
         # create and start the notification listener thread
-        self.notification_listener = threading.Thread(target=self._listener)
+        with self._lock:
+            self._listening.add(self.notification_conn)
+        self._start_listener_thread(self.notification_conn)
+
+    def _start_listener_thread(self, conn: NetconfSession):
+        self.notification_listener = threading.Thread(
+            target=self._listener, args=(conn,)
+        )
         self.notification_listener.daemon = True
+        self._listeners[conn] = self.notification_listener
         self.notification_listener.start()
 
     def stop_listener(self):
-        self.notification_listener.stop()
+        self.enabled = False
+        if self.coalescer is not None:
+            self.coalescer.stop()
+        if self.notification_conn is not None:
+            with self._lock:
+                self._listening.discard(self.notification_conn)
+            self._close(self.notification_conn)
+            self.notification_conn = None
 
     def remove_notification_categories(self, categoriesToRemove: str | list):
         """
         Remove existing categories from the subsciption filter
         """
-        self._prev_notification_categories = (
+        categoriesToRemove = self._format_notification_categories(categoriesToRemove)
+        if self.notification_categories is None or not categoriesToRemove:
+            LOGGER.warning(f"{self.conn.devicename}: no categories to remove")
+            return
+        self._prev_notification_categories = list(
             self.notification_categories
         )  # back up previous categories
-        categoriesToRemove = self._format_notification_categories(categoriesToRemove)
         # remove category from list
-        for category in categoriesToRemove:
-            self.notification_categories.remove(category)
+        self.notification_categories = [
+            category
+            for category in self.notification_categories
+            if category not in categoriesToRemove
+        ]
         # recreate the subscription with the updated categories
         self.update_subscription()
 
     def get_current_notification_categories(self) -> list:
         return self.notification_categories
 
-    def _listener(self):
-        while self.enabled:
-            response = self.conn.take_notification(block=True, timeout=None)
-            if response.ok and response.data:
+    def _publish(self, notif_data: dict):
+        """Publish a notification, skipping copies already published from the
+        other session during a filter change.  The notification is recorded
+        before it is published so a copy taken from the other session at the
+        same time is dropped."""
+        key = (get_event_time(notif_data), json.dumps(notif_data, sort_keys=True))
+        now = time.monotonic()
+        with self._lock:
+            overlapping = len(self._listening) > 1 or now < self._dedup_until
+            if overlapping and key in self._seen:
+                return
+            self._seen.pop(key, None)
+            self._seen[key] = now
+            # forget notifications no copy can still arrive for, oldest first
+            expired = now - DUPLICATE_WINDOW
+            while self._seen:
+                seen, published = next(iter(self._seen.items()))
+                if published >= expired:
+                    break
+                del self._seen[seen]
+        if self.coalescer is not None:
+            self.coalescer.submit(notif_data)
+        else:
+            pub.sendMessage(self.name, notif_data=notif_data)
+
+    def _listener(self, conn: NetconfSession):
+        while self.enabled and conn in self._listening:
+            try:
+                response = conn.take_notification(block=True, timeout=1)
+            except Exception as err:
+                if conn in self._listening:
+                    LOGGER.error(f"{conn.devicename}: {err}")
+                break
+            if response.ok and response.data and conn in self._listening:
                 # print(response.data)  # for debugging
-                pub.sendMessage(self.name, notif_data=response.data)
+                self._publish(response.data)
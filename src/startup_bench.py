@@ -0,0 +1,126 @@
+"""
+Measures cold start time of the CLI entry points and fails when it goes
+over a budget.
+
+Each script is started repeat times in a new interpreter with --help and
+the min/median/mean wall times are reported.  Modules given with --module
+are timed the same way by importing them.  The exit code is 1 if the
+median of any of them is over the budget, so the check can run in CI or
+from make.
+
+* Terminal exports:
+export PYTHONPATH=${PYTHONPATH}:${PWD}
+
+Example:
+python startup_bench.py healthchk.py -m lib.axos_netconf.base -b 0.5
+
+"""
+
+from typing import List, Optional
+import os
+import statistics
+import subprocess
+import sys
+import time
+import typer
+from typing_extensions import Annotated
+
+from lib.base_logger import getlogger
+
+LOGGER = getlogger("startup_bench", "INFO")
+
+app = typer.Typer(
+    add_completion=False, context_settings={"help_option_names": ["-h", "--help"]}
+)
+
+
+def bench_command(command: List[str], repeat: int) -> List[float]:
+    """Return the wall times of repeat runs of command"""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        path for path in (os.getcwd(), env.get("PYTHONPATH")) if path
+    )
+    # first run compiles the byte code and is not counted
+    subprocess.run(command, env=env, capture_output=True, check=True)
+    elapsed = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, env=env, capture_output=True, check=True)
+        elapsed.append(time.perf_counter() - start)
+    return elapsed
+
+
+@app.command(help="Check CLI start up time against a budget")
+def startup_bench(
+    scripts: Annotated[
+        Optional[List[str]],
+        typer.Argument(help="scripts to start with --help", show_default=False),
+    ] = None,
+    modules: Annotated[
+        Optional[List[str]],
+        typer.Option(
+            "--module",
+            "-m",
+            help="module to time the import of, repeatable",
+            show_default=False,
+        ),
+    ] = None,
+    budget: Annotated[
+        float,
+        typer.Option(
+            "--budget",
+            "-b",
+            min=0.01,
+            help="Maximum median start up time in seconds",
+        ),
+    ] = 0.5,
+    repeat: Annotated[
+        int,
+        typer.Option(
+            "--repeat",
+            "-r",
+            min=1,
+            max=1000,
+            help="Number of starts per script or module",
+        ),
+    ] = 10,
+):
+    """
+    Start each script and import each module repeatedly and report times.
+    """
+
+    if not scripts and not modules:
+        scripts = ["healthchk.py"]
+
+    commands = {script: [sys.executable, script, "--help"] for script in scripts or []}
+    for module in modules or []:
+        commands[f"import {module}"] = [sys.executable, "-c", f"import {module}"]
+
+    over_budget = []
+    for name, command in commands.items():
+        try:
+            elapsed = bench_command(command, repeat)
+        except subprocess.CalledProcessError as err:
+            LOGGER.error(f"{name} failed.  error={err.stderr.decode(errors='replace')}")
+            over_budget.append(name)
+            continue
+        median = statistics.median(elapsed)
+        LOGGER.info(
+            f"{name} starts:{len(elapsed)} "
+            f"min:{min(elapsed):.3f}s median:{median:.3f}s "
+            f"mean:{statistics.mean(elapsed):.3f}s budget:{budget:.3f}s"
+        )
+        if median > budget:
+            over_budget.append(name)
+
+    if over_budget:
+        LOGGER.error(f"Start up over budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    try:
+        app()
+    except KeyboardInterrupt:
+        LOGGER.info("CTRL+C pressed - exiting")
+        sys.exit(1)
@@ -0,0 +1,146 @@
+"""
+Fixtures shared by the tests.
+"""
+
+import time
+import uuid
+
+import pytest
+from ncclient.transport.session import NetconfBase
+from pubsub import pub
+
+from lib.axos_netconf.errors import NetconfSessionError
+from lib.axos_netconf.responses import NetconfResponse
+
+
+@pytest.fixture
+def subscriber():
+    """Yield (topic, received notifications) of a new pubsub topic.
+    Notifications published with a device are received as (device,
+    notification)."""
+    topic = f"test-{uuid.uuid4().hex}"
+    received = []
+
+    def listener(notif_data, device=None):
+        received.append(notif_data if device is None else (device, notif_data))
+
+    pub.subscribe(listener, topic)
+    yield topic, received
+    pub.unsubscribe(listener, topic)
+
+
+@pytest.fixture
+def wait_for():
+    """Return wait_for(condition, timeout) polling condition() until it is
+    true or timeout seconds pass, returning its last value."""
+
+    def wait_for(condition, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return condition()
+
+    return wait_for
+
+
+class FakeRebootConn:
+    """ONTs go missing when rebooted and are present again on the next
+    status poll.  ONTs in raise_for raise a session error, those in reject
+    are refused and polls listed in failed_polls (by number) fail."""
+
+    def __init__(self, raise_for=(), reject=(), failed_polls=()):
+        self.raise_for = set(raise_for)
+        self.reject = set(reject)
+        self.failed_polls = set(failed_polls)
+        self.polls = 0
+        self.rebooted = []
+        self.states = {}
+
+    def perform_ont_reboot_by_ontid(self, ontid):
+        if ontid in self.raise_for:
+            raise NetconfSessionError("Netconf dispatch failed: session closed")
+        if ontid in self.reject:
+            return NetconfResponse(ok=False, err="ONT not found")
+        self.rebooted.append(ontid)
+        self.states[ontid] = "missing"
+        return NetconfResponse()
+
+    def get_ont_operating_statuses(self, ontids):
+        self.polls += 1
+        if self.polls in self.failed_polls:
+            return NetconfResponse(ok=False, err="timeout")
+        statuses = {ontid: self.states.get(ontid) for ontid in ontids}
+        for ontid in ontids:
+            self.states[ontid] = "present"
+        return NetconfResponse(data={"statuses": statuses})
+
+
+@pytest.fixture
+def reboot_conn():
+    """Return FakeRebootConn, a session rebooting ONTs."""
+    return FakeRebootConn
+
+
+class FakeUpgradeConn:
+    """Each ONT upgrade stage command is accepted, unless it is the reject
+    stage, and card statuses are read from polls, one response per poll,
+    the last one repeating."""
+
+    def __init__(self, polls=None, reject=None):
+        complete = NetconfResponse(
+            data={"statuses": {"card": "1/1", "status": "complete"}}
+        )
+        self.polls = list(polls or [complete])
+        self.reject = reject
+        self.commands = []
+        self.poll_count = 0
+
+    def _stage(self, stage, *args):
+        self.commands.append((stage,) + args)
+        if stage == self.reject:
+            return NetconfResponse(ok=False, err=f"{stage} rejected")
+        return NetconfResponse()
+
+    def perform_ont_upgrade_download(self, release, upgrade_class):
+        return self._stage("download", upgrade_class)
+
+    def perform_ont_upgrade_install(self, release, directory, upgrade_class):
+        return self._stage("install", upgrade_class)
+
+    def perform_ont_upgrade_activate(self, release, upgrade_class):
+        return self._stage("activate", upgrade_class)
+
+    def perform_ont_upgrade_commit(self, release, upgrade_class):
+        return self._stage("commit", upgrade_class)
+
+    def get_ont_upgrade_card_statuses(self):
+        self.poll_count += 1
+        if len(self.polls) > 1:
+            return self.polls.pop(0)
+        return self.polls[0]
+
+
+@pytest.fixture
+def upgrade_conn():
+    """Return FakeUpgradeConn, a session running ONT upgrade stages."""
+    return FakeUpgradeConn
+
+
+class FramedTransport:
+    """Transport side of a NETCONF 1.1 session collecting dispatched
+    messages."""
+
+    _base = NetconfBase.BASE_11
+
+    def __init__(self):
+        self.messages = []
+
+    def _dispatch_message(self, message):
+        self.messages.append(message)
+
+
+@pytest.fixture
+def framed_transport():
+    """Return a FramedTransport collecting the messages of a chunked
+    framing parser."""
+    return FramedTransport()
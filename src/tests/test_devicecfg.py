@@ -0,0 +1,71 @@
+"""
+Tests of ssh_profiles in the devices file.
+"""
+
+import io
+
+import pytest
+from pydantic import ValidationError
+
+from lib.cli_utils.devicecfg import Devices
+
+DEVICES = """
+ssh_profiles:
+    fast:
+        auth_order: ['publickey', 'password']
+        key_filename: /keys/id_ed25519
+        ciphers: ['aes128-ctr']
+devices:
+    e9-1:
+        type: 'axos'
+        connections:
+            netconf:
+                type: 'netconf'
+                host: "192.0.2.1"
+                username: "user"
+                password: "pass"
+                ssh_profile: {profile}
+            ssh:
+                type: 'ssh'
+                host: "192.0.2.1"
+                username: "user"
+                password: "pass"
+"""
+
+
+def _devices(profile="fast", text=DEVICES):
+    return Devices(io.StringIO(text.format(profile=profile)))
+
+
+def test_ssh_profile_of_connection():
+    devices = _devices()
+    assert devices.ssh_profile_names == ["fast"]
+    assert devices.get_device_ssh_profile("e9-1", "netconf") == {
+        "auth_order": ["publickey", "password"],
+        "look_for_keys": False,
+        "key_filename": "/keys/id_ed25519",
+        "kex": None,
+        "ciphers": ["aes128-ctr"],
+        "macs": None,
+        "compression": False,
+    }
+    # a connection without a profile
+    assert devices.get_device_ssh_profile("e9-1", "ssh") is None
+
+
+def test_unknown_ssh_profile():
+    with pytest.raises(ValidationError, match="Unknown ssh_profile slow in device"):
+        _devices(profile="slow")
+
+
+def test_unknown_auth_method():
+    text = DEVICES.replace("'publickey', 'password'", "'password', 'hostbased'")
+    with pytest.raises(ValidationError):
+        _devices(text=text)
+
+
+def test_without_ssh_profiles():
+    text = DEVICES.split("devices:", 1)[1].replace("ssh_profile: {profile}", "")
+    devices = Devices(io.StringIO("devices:" + text))
+    assert devices.ssh_profile_names == []
+    assert devices.get_device_ssh_profile("e9-1", "netconf") is None
@@ -0,0 +1,144 @@
+"""
+Tests of FleetRunner worker crashes, retries and resuming from a journal.
+
+Workers are spawned, the session class and tasks are therefore module
+level and report their runs through files in FLEET_TEST_DIR.
+"""
+
+import io
+import os
+import time
+import uuid
+
+import pytest
+
+from lib.axos_netconf.base import NetconfSession
+from lib.cli_utils.devicecfg import Devices
+from lib.combo_utils.fleet_runner import FleetRunner
+from lib.combo_utils.job_journal import DONE, JobJournal
+
+DEVICES = ["e9-1", "e9-2", "e9-3", "e9-4", "e9-5"]
+
+
+class FakeSession(NetconfSession):
+    """Session which does not connect."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+def _record_run(devicename):
+    directory = os.environ["FLEET_TEST_DIR"]
+    open(os.path.join(directory, f"{devicename}.{uuid.uuid4().hex}.run"), "w").close()
+
+
+def crash_on_e9_4(conn, devicename):
+    """Kill the worker the first time it runs e9-4."""
+    _record_run(devicename)
+    marker = os.path.join(os.environ["FLEET_TEST_DIR"], "crashed")
+    if devicename == "e9-4" and not os.path.exists(marker):
+        open(marker, "w").close()
+        # let the queue send the results of the shard so far
+        time.sleep(0.5)
+        os._exit(3)
+    return devicename.upper()
+
+
+def always_crash_on_e9_4(conn, devicename):
+    _record_run(devicename)
+    if devicename == "e9-4":
+        time.sleep(0.5)
+        os._exit(3)
+    return devicename.upper()
+
+
+def _runs(directory) -> dict:
+    runs = {}
+    for name in os.listdir(directory):
+        if name.endswith(".run"):
+            devicename = name.split(".")[0]
+            runs[devicename] = runs.get(devicename, 0) + 1
+    return runs
+
+
+@pytest.fixture
+def devices():
+    entries = "".join(
+        f"""
+    {devicename}:
+        type: 'axos'
+        connections:
+            netconf:
+                type: 'netconf'
+                host: "192.0.2.{number}"
+                username: "user"
+                password: "pass"
+"""
+        for number, devicename in enumerate(DEVICES, start=1)
+    )
+    return Devices(io.StringIO("devices:" + entries))
+
+
+@pytest.fixture
+def run_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "runs"
+    directory.mkdir()
+    monkeypatch.setenv("FLEET_TEST_DIR", str(directory))
+    return directory
+
+
+def test_crashed_shard_retried_once_and_done_devices_skipped(
+    devices, run_dir, tmp_path
+):
+    with JobJournal(str(tmp_path / "job.db"), "audit") as journal:
+        journal.start("e9-5", "audit")
+        journal.done("e9-5", "audit")
+        # shards are e9-1, e9-3 and e9-2, e9-4 run one device at a time
+        runner = FleetRunner(
+            devices,
+            crash_on_e9_4,
+            devicenames=DEVICES,
+            processes=2,
+            sessions_per_process=1,
+            journal=journal,
+            step="audit",
+            session_class=FakeSession,
+        )
+        results = runner.run_all()
+
+        assert sorted(results) == ["e9-1", "e9-2", "e9-3", "e9-4"]
+        assert all(response.ok for response in results.values())
+        assert results["e9-4"].data == "E9-4"
+        # the device running when the worker died is retried once, e9-2
+        # finished before the crash and the journal has e9-5 done
+        assert _runs(run_dir) == {"e9-1": 1, "e9-2": 1, "e9-3": 1, "e9-4": 2}
+        assert runner.stats == {
+            "devices": 4,
+            "failed": 0,
+            "skipped": 1,
+            "worker restarts": 1,
+        }
+        assert journal.get_pending(DEVICES, "audit") == []
+        assert journal.get_summary() == {DONE: 5}
+
+
+def test_crash_after_retries_reported_failed(devices, run_dir):
+    runner = FleetRunner(
+        devices,
+        always_crash_on_e9_4,
+        devicenames=["e9-2", "e9-4"],
+        processes=1,
+        sessions_per_process=1,
+        retries=1,
+        session_class=FakeSession,
+    )
+    results = runner.run_all()
+
+    assert results["e9-2"].ok
+    assert not results["e9-4"].ok
+    assert results["e9-4"].err == "Fleet worker exited with code 3"
+    assert _runs(run_dir) == {"e9-2": 1, "e9-4": 2}
+    assert runner.stats["worker restarts"] == 1
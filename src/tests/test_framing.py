@@ -0,0 +1,165 @@
+"""
+Tests of the NETCONF 1.1 chunked framing decoder and reply spilling.
+"""
+
+import gc
+import os
+import random
+
+import pytest
+from lxml import etree
+from ncclient.transport.errors import NetconfFramingError
+
+from lib.axos_netconf.framing import ChunkedFramingParser, spilled_buffer
+
+NETCONF_NS = "urn:ietf:params:xml:ns:netconf:base:1.0"
+
+
+def _reply(message_id: int, body: str = "<ok/>") -> bytes:
+    return (
+        f'<rpc-reply xmlns="{NETCONF_NS}" message-id="{message_id}">'
+        f"{body}</rpc-reply>"
+    ).encode("utf-8")
+
+
+def _frame(message: bytes, chunk_size: int) -> bytes:
+    """Return message in chunks of chunk_size bytes."""
+    framed = b""
+    for offset in range(0, len(message), chunk_size):
+        chunk = message[offset : offset + chunk_size]
+        framed += f"\n#{len(chunk)}\n".encode() + chunk
+    return framed + b"\n##\n"
+
+
+def _feed(transport, data: bytes, reads, spill_threshold=None) -> list:
+    """Feed data to a parser split into reads of the given sizes, the last
+    read taking the rest, and return the messages dispatched to transport."""
+    parser = ChunkedFramingParser(transport, spill_threshold=spill_threshold)
+    position = 0
+    for size in reads:
+        parser.parse(data[position : position + size])
+        position += size
+    parser.parse(data[position:])
+    return transport.messages
+
+
+MESSAGES = [
+    _reply(1),
+    _reply(2, "<data><hostname>Zürich-E9</hostname></data>"),
+    _reply(3, "<data>" + "<ont><ont-id>101</ont-id></ont>" * 200 + "</data>"),
+]
+STREAM = b"".join(
+    _frame(message, chunk_size)
+    for message, chunk_size in zip(MESSAGES, (4096, 7, 1000))
+)
+
+
+def test_one_read(framed_transport):
+    messages = _feed(framed_transport, STREAM, [])
+    assert [message.encode("utf-8") for message in messages] == MESSAGES
+    assert messages[1] == MESSAGES[1].decode("utf-8")
+
+
+def test_byte_at_a_time(framed_transport):
+    messages = _feed(framed_transport, STREAM, [1] * len(STREAM))
+    assert [message.encode("utf-8") for message in messages] == MESSAGES
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_reads(seed, framed_transport):
+    rng = random.Random(seed)
+    reads = [rng.randint(1, 40) for _ in range(len(STREAM) // 20)]
+    messages = _feed(framed_transport, STREAM, reads)
+    assert [message.encode("utf-8") for message in messages] == MESSAGES
+
+
+def test_character_split_across_chunks(framed_transport):
+    # the two bytes of ü end up in different chunks
+    messages = _feed(framed_transport, _frame(MESSAGES[1], 1), [])
+    assert messages == [MESSAGES[1].decode("utf-8")]
+
+
+def test_message_keeps_received_bytes(framed_transport):
+    (message,) = _feed(framed_transport, _frame(MESSAGES[1], 4096), [])
+    assert message.encode() is message.encode("utf-8")
+    assert message.encode("utf-16") == str(message).encode("utf-16")
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b"\n#abc\n<ok/>\n##\n",
+        b"<ok/>\n##\n",
+        b"\n#0\n\n##\n",
+        b"\n#4294967296\n",
+        b"\n#" + b"1" * 20 + b"\n",
+    ],
+)
+def test_invalid_chunk_header(data, framed_transport):
+    with pytest.raises(NetconfFramingError):
+        _feed(framed_transport, data, [])
+
+
+def test_partial_header_waits_for_more(framed_transport):
+    parser = ChunkedFramingParser(framed_transport)
+    framed = _frame(MESSAGES[0], 4096)
+    parser.parse(framed[:3])
+    assert framed_transport.messages == []
+    parser.parse(framed[3:])
+    assert [message.encode() for message in framed_transport.messages] == [MESSAGES[0]]
+
+
+ERROR_REPLY = _reply(
+    4,
+    "<rpc-error><error-type>application</error-type>"
+    "<error-tag>invalid-value</error-tag><error-severity>error</error-severity>"
+    "<error-message>" + "x" * 500 + "</error-message></rpc-error>",
+)
+
+
+def test_large_reply_spilled(framed_transport):
+    messages = _feed(framed_transport, STREAM, [], spill_threshold=1024)
+    assert [spilled_buffer(message) is None for message in messages] == [
+        True,
+        True,
+        False,
+    ]
+    stub = etree.fromstring(messages[2])
+    assert etree.QName(stub).localname == "rpc-reply"
+    assert stub.get("message-id") == "3"
+    assert len(stub) == 0
+    buffer = spilled_buffer(messages[2])
+    assert buffer[:] == MESSAGES[2]
+    assert os.path.exists(buffer.path)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_spilled_across_random_reads(seed, framed_transport):
+    rng = random.Random(seed)
+    reads = [rng.randint(1, 200) for _ in range(len(STREAM) // 100)]
+    messages = _feed(framed_transport, STREAM + STREAM, reads, spill_threshold=1024)
+    assert [message.encode("utf-8") for message in messages[:2] + messages[3:5]] == (
+        MESSAGES[:2] * 2
+    )
+    assert spilled_buffer(messages[2])[:] == MESSAGES[2]
+    assert spilled_buffer(messages[5])[:] == MESSAGES[2]
+
+
+def test_error_reply_not_spilled(framed_transport):
+    (message,) = _feed(
+        framed_transport, _frame(ERROR_REPLY, 100), [], spill_threshold=64
+    )
+    assert spilled_buffer(message) is None
+    assert message.encode("utf-8") == ERROR_REPLY
+
+
+def test_spill_file_removed_with_buffer(framed_transport):
+    (message,) = _feed(
+        framed_transport, _frame(MESSAGES[2], 1000), [], spill_threshold=64
+    )
+    path = spilled_buffer(message).path
+    assert os.path.exists(path)
+    framed_transport.messages.clear()
+    del message
+    gc.collect()
+    assert not os.path.exists(path)
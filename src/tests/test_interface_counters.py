@@ -0,0 +1,172 @@
+"""
+Tests of InterfaceCounterCollector deltas, rates, wraps and resets.
+"""
+
+import pytest
+
+from lib.axos_netconf.responses import NetconfResponse
+from lib.combo_utils import interface_counters
+from lib.combo_utils.interface_counters import InterfaceCounterCollector
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class FakeConn:
+    devicename = "e9-1"
+
+    def __init__(self):
+        self.interfaces = {}  # name -> {counter: value}
+
+    def get_interface_statistics(self, parse=True):
+        entries = []
+        for name, counters in self.interfaces.items():
+            leaves = "".join(
+                f"<{counter}>{value}</{counter}>" for counter, value in counters.items()
+            )
+            entries.append(
+                f"<interface><name>{name}</name>"
+                f"<statistics>{leaves}</statistics></interface>"
+            )
+        return NetconfResponse(
+            xml='<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" '
+            'message-id="1"><data><interfaces-state '
+            'xmlns="urn:ietf:params:xml:ns:yang:ietf-interfaces">'
+            f'{"".join(entries)}</interfaces-state></data></rpc-reply>'
+        )
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(interface_counters, "time", clock)
+    return clock
+
+
+def _collector(conn, clock, first, second, seconds=10):
+    """Sample first, then second seconds later."""
+    collector = InterfaceCounterCollector(conn)
+    conn.interfaces = first
+    assert collector.sample()
+    clock.now += seconds
+    conn.interfaces = second
+    assert collector.sample()
+    return collector
+
+
+def test_delta_and_rate(clock):
+    collector = _collector(
+        FakeConn(),
+        clock,
+        {"1/1/x1": {"in-octets": 1000, "out-errors": 3}},
+        {"1/1/x1": {"in-octets": 1600, "out-errors": 3}},
+    )
+    assert collector.get_delta("1/1/x1", "in-octets") == 600
+    assert collector.get_rate("1/1/x1", "in-octets") == 60.0
+    assert collector.get_delta("1/1/x1", "out-errors") == 0
+    # counters the device did not report
+    assert collector.get_delta("1/1/x1", "in-errors") is None
+    assert list(collector.get_rates("in-octets")) == [60.0]
+
+
+def test_counter32_wrap(clock):
+    collector = _collector(
+        FakeConn(),
+        clock,
+        {"1/1/x1": {"in-errors": 2**32 - 10}},
+        {"1/1/x1": {"in-errors": 5}},
+    )
+    assert collector.get_delta("1/1/x1", "in-errors") == 15
+
+
+def test_counter64_wrap(clock):
+    collector = _collector(
+        FakeConn(),
+        clock,
+        {"1/1/x1": {"in-octets": 2**64 - 100}},
+        {"1/1/x1": {"in-octets": 50}},
+    )
+    assert collector.get_delta("1/1/x1", "in-octets") == 150
+
+
+def test_large_decrease_is_a_reset(clock):
+    collector = _collector(
+        FakeConn(),
+        clock,
+        {"1/1/x1": {"in-errors": 1_000_000_000}},
+        {"1/1/x1": {"in-errors": 500}},
+    )
+    assert collector.get_delta("1/1/x1", "in-errors") == 500
+
+
+def test_discontinuity_time_change_is_a_reset(clock):
+    collector = _collector(
+        FakeConn(),
+        clock,
+        {
+            "1/1/x1": {
+                "discontinuity-time": "2024-06-01T10:00:00Z",
+                "in-octets": 1000,
+            }
+        },
+        {
+            "1/1/x1": {
+                "discontinuity-time": "2024-06-01T10:05:00Z",
+                "in-octets": 1200,
+            }
+        },
+    )
+    assert collector.get_delta("1/1/x1", "in-octets") == 1200
+
+
+def test_new_and_removed_interfaces(clock):
+    collector = _collector(
+        FakeConn(),
+        clock,
+        {"1/1/x1": {"in-octets": 100}, "1/1/x2": {"in-octets": 100}},
+        {"1/1/x2": {"in-octets": 300}, "1/1/x3": {"in-octets": 900}},
+    )
+    assert collector.names == ["1/1/x2", "1/1/x3"]
+    # the previous value of 1/1/x2 survives it moving row
+    assert collector.get_delta("1/1/x2", "in-octets") == 200
+    # no previous sample of 1/1/x3
+    assert collector.get_delta("1/1/x3", "in-octets") == 0
+    assert collector.get_delta("1/1/x1", "in-octets") is None
+
+
+def test_counter_reported_again_has_no_stale_baseline(clock):
+    conn = FakeConn()
+    collector = _collector(
+        conn,
+        clock,
+        {"1/1/x1": {"in-octets": 100, "in-errors": 7}},
+        {"1/1/x1": {"in-octets": 200}},
+    )
+    assert collector.get_delta("1/1/x1", "in-errors") is None
+    clock.now += 10
+    conn.interfaces = {"1/1/x1": {"in-octets": 300, "in-errors": 50}}
+    assert collector.sample()
+    # no delta against the value last seen two samples ago
+    assert collector.get_delta("1/1/x1", "in-errors") == 0
+    assert collector.get_delta("1/1/x1", "in-octets") == 100
+    clock.now += 10
+    conn.interfaces = {"1/1/x1": {"in-octets": 400, "in-errors": 54}}
+    assert collector.sample()
+    assert collector.get_delta("1/1/x1", "in-errors") == 4
+
+
+def test_empty_leaf_skipped(clock):
+    conn = FakeConn()
+    collector = _collector(
+        conn,
+        clock,
+        {"1/1/x1": {"in-octets": 100, "in-errors": 7}},
+        {"1/1/x1": {"in-octets": 200, "in-errors": ""}},
+    )
+    assert collector.get_delta("1/1/x1", "in-octets") == 100
+    assert collector.get_delta("1/1/x1", "in-errors") is None
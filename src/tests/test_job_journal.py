@@ -0,0 +1,63 @@
+"""
+Tests of JobJournal step records and resuming a job.
+"""
+
+from lib.combo_utils.job_journal import DONE, FAILED, RUNNING, JobJournal
+
+DEVICES = ["e9-1", "e9-2", "e9-3"]
+
+
+def test_step_states(tmp_path):
+    with JobJournal(str(tmp_path / "job.db"), "vlan 100 build") as journal:
+        assert journal.get_state("e9-1", "edit-vlan") is None
+        journal.start("e9-1", "edit-vlan")
+        assert journal.get_state("e9-1", "edit-vlan") == RUNNING
+        journal.done("e9-1", "edit-vlan")
+        journal.start("e9-2", "edit-vlan")
+        journal.failed("e9-2", "edit-vlan", "vlan in use")
+
+        assert journal.is_done("e9-1", "edit-vlan")
+        assert journal.get_state("e9-2", "edit-vlan") == FAILED
+        assert journal.get_failures() == {("e9-2", "edit-vlan"): "vlan in use"}
+        assert journal.get_summary() == {DONE: 1, FAILED: 1}
+
+
+def test_resume_runs_steps_not_done(tmp_path):
+    path = str(tmp_path / "job.db")
+    journal = JobJournal(path, "vlan 100 build")
+    journal.start("e9-1", "edit-vlan")
+    journal.done("e9-1", "edit-vlan")
+    journal.start("e9-2", "edit-vlan")
+    journal.failed("e9-2", "edit-vlan", "timeout")
+    # the process dies with e9-3 running
+    journal.start("e9-3", "edit-vlan")
+    journal.close()
+
+    with JobJournal(path, "vlan 100 build") as journal:
+        assert journal.get_pending(DEVICES, "edit-vlan") == ["e9-2", "e9-3"]
+        assert journal.get_pending(DEVICES, "audit") == DEVICES
+        journal.start("e9-2", "edit-vlan")
+        journal.done("e9-2", "edit-vlan")
+        assert journal.get_done("edit-vlan") == {
+            ("e9-1", "edit-vlan"),
+            ("e9-2", "edit-vlan"),
+        }
+        attempts = journal._db.execute(
+            "SELECT attempts FROM steps WHERE device = 'e9-2'"
+        ).fetchone()[0]
+        assert attempts == 2
+
+
+def test_resume_false_starts_over(tmp_path):
+    path = str(tmp_path / "job.db")
+    with JobJournal(path, "vlan 100 build") as journal:
+        journal.done("e9-1", "edit-vlan")
+    with JobJournal(path, "audit") as journal:
+        journal.done("e9-1", "audit")
+
+    with JobJournal(path, "vlan 100 build", resume=False) as journal:
+        assert journal.get_pending(DEVICES, "edit-vlan") == DEVICES
+        assert journal.get_summary() == {}
+    # other jobs sharing the file are kept
+    with JobJournal(path, "audit") as journal:
+        assert journal.is_done("e9-1", "audit")
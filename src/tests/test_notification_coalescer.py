@@ -0,0 +1,121 @@
+"""
+Tests of NotificationCoalescer flap windows.
+"""
+
+from lib.combo_utils.notification_coalescer import NotificationCoalescer
+
+
+def _presence(event, event_time, ont_id="101"):
+    return {"eventTime": event_time, event: {"ont-id": ont_id}}
+
+
+def _coalescer(**kwargs):
+    emitted = []
+    coalescer = NotificationCoalescer(
+        lambda notif_data, source: emitted.append((source, notif_data)), **kwargs
+    )
+    return coalescer, emitted
+
+
+def test_flap_back_to_start_is_not_emitted():
+    coalescer, emitted = _coalescer()
+    coalescer.submit(_presence("ont-departure", "t1"), "e9-1")
+    coalescer.submit(_presence("ont-arrival", "t2"), "e9-1")
+    coalescer.flush()
+    assert emitted == []
+
+
+def test_flap_is_emitted_as_net_change():
+    coalescer, emitted = _coalescer()
+    coalescer.submit(_presence("ont-departure", "t1"), "e9-1")
+    coalescer.submit(_presence("ont-arrival", "t2"), "e9-1")
+    coalescer.submit(_presence("ont-departure", "t3"), "e9-1")
+    coalescer.flush()
+
+    assert len(emitted) == 1
+    source, notif_data = emitted[0]
+    assert source == "e9-1"
+    assert notif_data["eventTime"] == "t3"
+    assert "ont-departure" in notif_data
+    assert notif_data["coalesced"] == {
+        "count": 3,
+        "flaps": 2,
+        "first-event-time": "t1",
+        "changed": True,
+    }
+
+
+def test_unchanged_flap_kept_when_asked():
+    coalescer, emitted = _coalescer(drop_unchanged=False)
+    coalescer.submit(_presence("ont-departure", "t1"), "e9-1")
+    coalescer.submit(_presence("ont-arrival", "t2"), "e9-1")
+    coalescer.flush()
+    assert [notif["coalesced"]["changed"] for _, notif in emitted] == [False]
+
+
+def test_groups_are_per_source_and_ont():
+    coalescer, emitted = _coalescer()
+    coalescer.submit(_presence("ont-departure", "t1", "101"), "e9-1")
+    coalescer.submit(_presence("ont-departure", "t1", "101"), "e9-2")
+    coalescer.submit(_presence("ont-departure", "t1", "102"), "e9-1")
+    coalescer.submit({"eventTime": "t1", "db-change": {"user": "admin"}}, "e9-1")
+
+    # events without an ONT are passed straight through
+    assert [notif["eventTime"] for _, notif in emitted] == ["t1"]
+    coalescer.flush()
+    assert len(emitted) == 4
+
+
+def test_flush_only_emits_closed_windows():
+    coalescer, emitted = _coalescer(window=30.0)
+    coalescer.submit(_presence("ont-departure", "t1"), "e9-1")
+    coalescer.flush(now=0.0)
+    assert emitted == []
+    coalescer.flush()
+    assert len(emitted) == 1
+
+
+def _oper_state(state, event_time, ont_id="101"):
+    return {
+        "eventTime": event_time,
+        "ont-oper-state-change": {"ont-id": ont_id, "oper-state": state},
+    }
+
+
+def test_oper_state_flap_back_to_start_is_not_emitted():
+    coalescer, emitted = _coalescer()
+    coalescer.submit(_oper_state("down", "t1"), "e9-1")
+    coalescer.submit(_oper_state("up", "t2"), "e9-1")
+    coalescer.submit(_oper_state("down", "t3"), "e9-1")
+    coalescer.submit(_oper_state("up", "t4"), "e9-1")
+    coalescer.flush()
+    assert emitted == []
+
+
+def test_oper_state_flap_is_emitted_as_net_change():
+    coalescer, emitted = _coalescer()
+    coalescer.submit(_oper_state("down", "t1"), "e9-1")
+    coalescer.submit(_oper_state("up", "t2"), "e9-1")
+    coalescer.submit(_oper_state("down", "t3"), "e9-1")
+    coalescer.flush()
+    assert [notif["eventTime"] for _, notif in emitted] == ["t3"]
+    assert emitted[0][1]["coalesced"]["changed"] is True
+
+
+def test_state_before_window_taken_from_earlier_events():
+    coalescer, emitted = _coalescer()
+    coalescer.submit(_oper_state("down", "t1"), "e9-1")
+    coalescer.flush()
+    assert len(emitted) == 1
+    # the ONT was down before the window, so it ends where it started
+    coalescer.submit(_oper_state("up", "t2"), "e9-1")
+    coalescer.submit(_oper_state("down", "t3"), "e9-1")
+    coalescer.flush()
+    assert len(emitted) == 1
+
+    coalescer.submit(_presence("ont-departure", "t4"), "e9-1")
+    coalescer.flush()
+    coalescer.submit(_presence("ont-arrival", "t5"), "e9-1")
+    coalescer.submit(_presence("ont-departure", "t6"), "e9-1")
+    coalescer.flush()
+    assert [notif["eventTime"] for _, notif in emitted] == ["t1", "t4"]
@@ -0,0 +1,172 @@
+"""
+Tests of get_discovered_onts single request and sharded reads.
+"""
+
+from lxml import etree
+
+from lib.axos_netconf.base import NetconfSession
+from lib.axos_netconf.responses import NetconfResponse
+
+GPON_NS = "http://www.calix.com/ns/exa/gpon-interface-base"
+
+
+def _reply(body: str) -> str:
+    return (
+        '<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" '
+        f'message-id="1"><data>{body}</data></rpc-reply>'
+    )
+
+
+def _linkages_reply(linkages: list, count: int | None = None) -> str:
+    entries = "".join(
+        f"<ont-linkage><ont-id>{ontid}</ont-id><shelf-id>{shelf}</shelf-id>"
+        f"<slot-id>{slot}</slot-id><pon-port>xp1</pon-port>"
+        "<state>confirmed</state></ont-linkage>"
+        for ontid, shelf, slot in linkages
+    )
+    if count is not None:
+        entries += f"<ont-count>{count}</ont-count>"
+    return _reply(
+        '<status xmlns="http://www.calix.com/ns/exa/base"><system>'
+        f'<ont-linkages xmlns="{GPON_NS}">{entries}</ont-linkages>'
+        "</system></status>"
+    )
+
+
+class FakeSession(NetconfSession):
+    """Session answering from a list of (ont-id, shelf, slot) linkages."""
+
+    def __init__(self, linkages: list, pons: list):
+        super().__init__("192.0.2.1", 830, 30, "user", "pass", devicename="e9-1")
+        self.linkages = list(linkages)
+        self.pons = pons
+        self.calls = []
+        # linkage leaving once counted
+        self.departed = None
+
+    def get(self, nc_filter=None):
+        self.calls.append("get_ont_count")
+        response = NetconfResponse(
+            xml=_reply(
+                '<status xmlns="http://www.calix.com/ns/exa/base"><system>'
+                f'<ont-linkages xmlns="{GPON_NS}">'
+                f"<ont-count>{len(self.linkages)}</ont-count>"
+                "</ont-linkages></system></status>"
+            )
+        )
+        if self.departed is not None:
+            self.linkages.remove(self.departed)
+            self.departed = None
+        return response
+
+    def get_config(self, nc_filter=None, with_defaults=None):
+        self.calls.append("get_config")
+        interfaces = "".join(
+            f"<interface><name>{name}</name><enabled>true</enabled></interface>"
+            for name in self.pons
+        )
+        return NetconfResponse(
+            xml=_reply(
+                '<interfaces xmlns="urn:ietf:params:xml:ns:yang:ietf-interfaces">'
+                f"{interfaces}</interfaces>"
+            )
+        )
+
+    def dispatch(self, rpc_command):
+        self.calls.append("dispatch")
+        return NetconfResponse(
+            xml=_linkages_reply(self.linkages, count=len(self.linkages))
+        )
+
+    def dispatch_pipelined(self, rpc_commands, window=8):
+        for rpc_command in rpc_commands:
+            element = etree.fromstring(rpc_command)
+            shelf = element.findtext(f".//{{{GPON_NS}}}shelf-id")
+            slot = element.findtext(f".//{{{GPON_NS}}}slot-id")
+            self.calls.append(("shard", int(shelf), int(slot)))
+            yield NetconfResponse(
+                xml=_linkages_reply(
+                    [
+                        linkage
+                        for linkage in self.linkages
+                        if (linkage[1], linkage[2]) == (int(shelf), int(slot))
+                    ]
+                )
+            )
+
+
+LINKAGES = [
+    ("101", 1, 1),
+    ("102", 1, 1),
+    ("201", 1, 2),
+    ("301", 3, 1),
+]
+PONS = ["1/1/xp1", "1/1/xp2", "1/2/xp1", "3/1/xp4"]
+
+
+def _ont_ids(response) -> list:
+    return sorted(ont["ont-id"] for ont in response.data["discovered onts"])
+
+
+def test_small_system_single_request():
+    conn = FakeSession(LINKAGES, PONS)
+    response = conn.get_discovered_onts(shard_threshold=10)
+    assert _ont_ids(response) == ["101", "102", "201", "301"]
+    assert conn.calls == ["get_ont_count", "dispatch"]
+
+
+def test_unsharded_read_skips_count():
+    conn = FakeSession(LINKAGES, PONS)
+    response = conn.get_discovered_onts(sharded=False)
+    assert _ont_ids(response) == ["101", "102", "201", "301"]
+    assert conn.calls == ["dispatch"]
+
+
+def test_large_system_sharded_over_pon_cards():
+    conn = FakeSession(LINKAGES, PONS)
+    response = conn.get_discovered_onts(shard_threshold=2)
+    assert _ont_ids(response) == ["101", "102", "201", "301"]
+    assert conn.calls == [
+        "get_ont_count",
+        "get_config",
+        ("shard", 1, 1),
+        ("shard", 1, 2),
+        ("shard", 3, 1),
+    ]
+
+
+def test_sharded_with_configured_cards():
+    conn = FakeSession(LINKAGES, PONS)
+    conn.discovery_cards = [(1, 1), (1, 2), (3, 1)]
+    response = conn.get_discovered_onts(sharded=True)
+    assert _ont_ids(response) == ["101", "102", "201", "301"]
+    assert "get_config" not in conn.calls
+
+
+def test_missing_card_is_an_error():
+    conn = FakeSession(LINKAGES, PONS)
+    response = conn.get_discovered_onts(shard_threshold=2, cards=[(1, 1), (1, 2)])
+    # the ONT on card 3/1 is not dropped silently
+    assert not response.ok
+    assert response.err == (
+        "Sharded discovery read 3 ONT linkages on 2 cards, the ONT count is 4"
+    )
+    # counted and read again once, never read in one request
+    assert conn.calls == [
+        "get_ont_count",
+        ("shard", 1, 1),
+        ("shard", 1, 2),
+        "get_ont_count",
+        ("shard", 1, 1),
+        ("shard", 1, 2),
+    ]
+
+
+def test_ont_departing_during_sharded_read():
+    conn = FakeSession(LINKAGES, PONS)
+    conn.discovery_cards = [(1, 1), (1, 2), (3, 1)]
+    conn.departed = ("102", 1, 1)
+    response = conn.get_discovered_onts(shard_threshold=2)
+    assert _ont_ids(response) == ["101", "201", "301"]
+    assert conn.calls.count("get_ont_count") == 2
+    assert "dispatch" not in conn.calls
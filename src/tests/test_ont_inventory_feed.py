@@ -0,0 +1,118 @@
+"""
+Tests of OntInventoryFeed snapshots and the change events between them.
+"""
+
+from lib.axos_netconf.responses import NetconfResponse
+from lib.combo_utils.ont_inventory_feed import OntInventoryFeed, diff_snapshots
+
+
+class FakeConn:
+    devicename = "e9-1"
+
+    def __init__(self):
+        self.linkages = {}  # ont-id -> port
+        self.states = {}  # ont-id -> oper-state
+
+    def get_discovered_onts(self):
+        linkages = []
+        for ontid, port in self.linkages.items():
+            shelf, slot, pon_port = port.split("/")
+            linkages.append(
+                {
+                    "ont-id": ontid,
+                    "shelf-id": shelf,
+                    "slot-id": slot,
+                    "pon-port": pon_port,
+                    "state": "confirmed",
+                }
+            )
+        return NetconfResponse(data={"discovered onts": linkages})
+
+    def get_ont_states(self):
+        return NetconfResponse(
+            data={
+                "states": [
+                    {"ont-id": ontid, "status": {"oper-state": state}}
+                    for ontid, state in self.states.items()
+                ]
+            }
+        )
+
+
+def _events(events) -> list:
+    return sorted(
+        (event["event"], event["ont-id"], event["previous-port"], event["port"])
+        for event in events
+    )
+
+
+def _feed():
+    conn = FakeConn()
+    conn.linkages = {"101": "1/1/xp1", "102": "1/1/xp1"}
+    conn.states = {"101": "present", "102": "present"}
+    feed = OntInventoryFeed(conn)
+    assert feed.poll() == []
+    return conn, feed
+
+
+def test_arrival():
+    conn, feed = _feed()
+    conn.linkages["103"] = "1/1/xp2"
+    conn.states["103"] = "present"
+    assert _events(feed.poll()) == [("ont-arrived", "103", None, "1/1/xp2")]
+
+
+def test_departure_when_linkage_lost():
+    conn, feed = _feed()
+    # still provisioned, so it keeps an oper-state
+    del conn.linkages["101"]
+    conn.states["101"] = "missing"
+    events = feed.poll()
+    assert _events(events) == [("ont-departed", "101", "1/1/xp1", None)]
+    assert events[0]["oper-state"] == "missing"
+
+
+def test_departure_when_missing_on_its_port():
+    conn, feed = _feed()
+    conn.states["101"] = "missing"
+    assert _events(feed.poll()) == [("ont-departed", "101", "1/1/xp1", "1/1/xp1")]
+
+
+def test_departure_when_removed():
+    conn, feed = _feed()
+    del conn.linkages["102"]
+    del conn.states["102"]
+    assert _events(feed.poll()) == [("ont-departed", "102", "1/1/xp1", None)]
+
+
+def test_move():
+    conn, feed = _feed()
+    conn.linkages["101"] = "1/2/xp4"
+    assert _events(feed.poll()) == [("ont-moved", "101", "1/1/xp1", "1/2/xp4")]
+
+
+def test_relink():
+    conn, feed = _feed()
+    del conn.linkages["101"]
+    conn.states["101"] = "missing"
+    feed.poll()
+    conn.linkages["101"] = "1/1/xp3"
+    conn.states["101"] = "present"
+    assert _events(feed.poll()) == [("ont-arrived", "101", None, "1/1/xp3")]
+    # and nothing when nothing changed
+    assert feed.poll() == []
+
+
+def test_state_change_without_linkage():
+    previous = {"101": (None, None, "missing")}
+    current = {"101": (None, None, "not-linked")}
+    assert _events(diff_snapshots(previous, current)) == [
+        ("ont-state-changed", "101", None, None)
+    ]
+
+
+def test_failed_poll_keeps_snapshot():
+    conn, feed = _feed()
+    conn.get_ont_states = lambda: NetconfResponse(ok=False, err="timeout")
+    assert feed.poll() is None
+    assert sorted(feed.get_ont_ids()) == ["101", "102"]
@@ -0,0 +1,109 @@
+"""
+Tests of the ONT optics sweep and its threshold and port aggregates.
+"""
+
+import math
+
+from lib.axos_netconf.responses import NetconfResponse
+from lib.combo_utils.ont_optics import (
+    aggregate_by_port,
+    collect_ont_optics,
+    out_of_range,
+)
+from lib.combo_utils.ont_utils import as_list
+
+
+class FakeConn:
+    devicename = "e9-1"
+
+    def __init__(self, linkages, optics, counters):
+        self.linkages = linkages
+        self.optics = optics
+        self.counters = counters
+
+    def get_discovered_onts(self):
+        return NetconfResponse(data={"discovered onts": self.linkages})
+
+    def _columns(self, ontids, values, leaves):
+        found = [ontid for ontid in ontids if ontid in values]
+        data = {"ont-ids": found}
+        for i, leaf in enumerate(leaves):
+            data[leaf] = [values[ontid][i] for ontid in found]
+        return NetconfResponse(data=data)
+
+    def get_ont_optics(self, ontids, shard_size=500):
+        return self._columns(
+            ontids,
+            self.optics,
+            ("opt-signal-level", "tx-opt-level", "olt-rx-opt-level"),
+        )
+
+    def get_ont_pon_statistics(self, ontids, shard_size=500):
+        return self._columns(
+            ontids, self.counters, ("bip-errors", "missed-bursts", "gem-hec-errors")
+        )
+
+
+def _linkage(ontid, shelf, slot, port):
+    return {"ont-id": ontid, "shelf-id": shelf, "slot-id": slot, "pon-port": port}
+
+
+LINKAGES = [
+    _linkage("101", "1", "1", "xp1"),
+    _linkage("102", "1", "1", "xp1"),
+    _linkage("103", "1", "1", "xp2"),
+    _linkage("201", "1", "2", "xp1"),
+]
+OPTICS = {
+    "101": (-20.0, 2.0, -22.0),
+    "102": (-29.5, 2.1, -21.0),
+    "103": (None, None, None),
+    "201": (-7.0, 2.0, -24.0),
+}
+COUNTERS = {"101": (0.0, 1.0, 0.0), "102": (5.0, 0.0, 0.0)}
+
+
+def _sweep(**kwargs):
+    return collect_ont_optics(FakeConn(LINKAGES, OPTICS, COUNTERS), **kwargs)
+
+
+def test_columns_aligned_by_ont():
+    sweep = _sweep()
+    assert sweep["ont-ids"] == ["101", "102", "103", "201"]
+    assert sweep["ports"] == ["1/1/xp1", "1/1/xp1", "1/1/xp2", "1/2/xp1"]
+    assert list(sweep["opt-signal-level"])[:2] == [-20.0, -29.5]
+    assert math.isnan(sweep["opt-signal-level"][2])
+    # ONTs without counters are missing, not zero
+    assert list(sweep["bip-errors"])[:2] == [0.0, 5.0]
+    assert math.isnan(sweep["bip-errors"][3])
+
+
+def test_cards_limit_the_sweep():
+    sweep = _sweep(cards=[(1, 2)], include_pon_statistics=False)
+    assert sweep["ont-ids"] == ["201"]
+    assert "bip-errors" not in sweep
+
+
+def test_out_of_range_skips_missing_values():
+    assert out_of_range(_sweep()) == {
+        "102": ["opt-signal-level"],
+        "201": ["opt-signal-level"],
+    }
+
+
+def test_aggregate_by_port():
+    aggregates = aggregate_by_port(_sweep(), "opt-signal-level")
+    assert list(aggregates) == ["1/1/xp1", "1/2/xp1"]
+    assert aggregates["1/1/xp1"] == {
+        "count": 2,
+        "min": -29.5,
+        "max": -20.0,
+        "mean": -24.75,
+        "sum": -49.5,
+    }
+
+
+def test_as_list():
+    assert as_list(None) == []
+    assert as_list({"ont-id": "101"}) == [{"ont-id": "101"}]
+    assert as_list([{"ont-id": "101"}]) == [{"ont-id": "101"}]
@@ -0,0 +1,62 @@
+"""
+Tests of bulk_ont_reboot outcomes and error paths.
+"""
+
+import functools
+
+import pytest
+
+from lib.axos_netconf.responses import NetconfResponse
+from lib.combo_utils.ont_reboot import bulk_ont_reboot
+
+_reboot = functools.partial(
+    bulk_ont_reboot, rate=1000, poll_interval=0.01, settle_time=0, recovery_timeout=5
+)
+
+
+def test_all_recovered(reboot_conn):
+    conn = reboot_conn()
+    outcomes = _reboot(conn, ["101", "102"])
+    assert {key: outcome["status"] for key, outcome in outcomes.items()} == {
+        "101": "recovered",
+        "102": "recovered",
+    }
+
+
+def test_session_error_is_a_failed_outcome(reboot_conn):
+    conn = reboot_conn(raise_for={"102"}, reject={"103"})
+    outcomes = _reboot(conn, ["101", "102", "103", "104"])
+
+    assert conn.rebooted == ["101", "104"]
+    assert outcomes["101"]["status"] == "recovered"
+    assert outcomes["104"]["status"] == "recovered"
+    assert outcomes["102"]["status"] == "failed"
+    assert "session closed" in outcomes["102"]["err"]
+    assert outcomes["103"] == {
+        "target": "103",
+        "status": "failed",
+        "err": "ONT not found",
+        "recovery_time": None,
+    }
+
+
+def test_failed_poll_is_not_a_down_state(reboot_conn):
+    # the first poll fails, the ONT must not be taken as down then present
+    conn = reboot_conn(failed_polls={1})
+    conn.states["101"] = "present"
+    conn.perform_ont_reboot_by_ontid = lambda ontid: NetconfResponse()
+    outcomes = _reboot(conn, ["101"], settle_time=3600, recovery_timeout=0.1)
+    assert outcomes["101"]["status"] == "timeout"
+
+
+def test_failing_polls_time_out(reboot_conn):
+    conn = reboot_conn(failed_polls=set(range(1, 1000)))
+    outcomes = _reboot(conn, ["101"], recovery_timeout=0.05)
+    assert outcomes["101"]["status"] == "timeout"
+    assert "no status" in outcomes["101"]["err"]
+
+
+@pytest.mark.parametrize("rate", [0, -1])
+def test_rate_must_be_positive(reboot_conn, rate):
+    with pytest.raises(ValueError):
+        bulk_ont_reboot(reboot_conn(), ["101"], rate=rate)
@@ -0,0 +1,123 @@
+"""
+Tests of OntStateTracker notification updates and resyncs.
+"""
+
+import threading
+
+from lib.axos_netconf.responses import NetconfResponse
+from lib.combo_utils.ont_state_tracker import OntStateTracker
+
+
+class FakeConn:
+    devicename = "e9-1"
+
+    def __init__(self, onts):
+        self.onts = onts  # ont-id -> (port, oper-state)
+        self.reading = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def get_ont_states(self):
+        self.reading.set()
+        self.release.wait(5)
+        return NetconfResponse(
+            data={
+                "states": [
+                    {"ont-id": ontid, "status": {"oper-state": state}}
+                    for ontid, (_, state) in self.onts.items()
+                ]
+            }
+        )
+
+    def get_discovered_onts(self):
+        linkages = []
+        for ontid, (port, _) in self.onts.items():
+            shelf, slot, pon_port = port.split("/")
+            linkages.append(
+                {
+                    "ont-id": ontid,
+                    "shelf-id": shelf,
+                    "slot-id": slot,
+                    "pon-port": pon_port,
+                    "state": "confirmed",
+                }
+            )
+        return NetconfResponse(data={"discovered onts": linkages})
+
+
+def _event(event, ont_id, **leaves):
+    return {
+        "eventTime": "2024-06-01T10:00:00Z",
+        event: dict(leaves, **{"ont-id": ont_id}),
+    }
+
+
+def _tracker():
+    conn = FakeConn({"101": ("1/1/xp1", "present"), "102": ("1/1/xp1", "present")})
+    tracker = OntStateTracker(conn, resync_interval=None)
+    tracker.start()
+    return conn, tracker
+
+
+def test_seeded_from_the_system():
+    _, tracker = _tracker()
+    assert tracker.get_ont_state("101") == {
+        "oper-state": "present",
+        "port": "1/1/xp1",
+        "linkage-state": "confirmed",
+    }
+    assert tracker.get_onts_on_port("1/1/xp1") == {"101", "102"}
+    assert tracker.count_onts_on_port("1/1/xp1", state="present") == 2
+
+
+def test_notifications_update_the_table():
+    _, tracker = _tracker()
+    tracker.apply_notification(_event("ont-departure", "101"))
+    assert tracker.get_ont_oper_state("101") == "missing"
+    assert tracker.get_onts_on_port("1/1/xp1", state="missing") == {"101"}
+    assert tracker.get_onts_on_port("1/1/xp1", state="present") == {"102"}
+
+    location = {"shelf-id": "1", "slot-id": "2", "pon-port": "xp4"}
+    tracker.apply_notification(_event("ont-arrival", "101", **location))
+    assert tracker.get_onts_on_port("1/1/xp1") == {"102"}
+    assert tracker.get_onts_on_port("1/2/xp4", state="present") == {"101"}
+
+    tracker.apply_notification(_event("ont-arrival", "103"))
+    assert tracker.get_ont_oper_state("103") == "present"
+    # events without an ONT are ignored
+    tracker.apply_notification({"eventTime": "t", "db-change": {"user": "admin"}})
+    assert sorted(tracker.get_ont_ids()) == ["101", "102", "103"]
+
+
+def test_resync_corrects_drift():
+    conn, tracker = _tracker()
+    tracker.apply_notification(_event("ont-departure", "101"))
+    # the arrival notification of 101 and 201 were missed
+    conn.onts["201"] = ("1/2/xp1", "present")
+    del conn.onts["102"]
+    assert tracker.resync()
+    assert tracker.get_ont_oper_state("101") == "present"
+    assert tracker.get_ont_state("102") is None
+    assert tracker.get_onts_on_port("1/2/xp1") == {"201"}
+    assert tracker.get_onts_on_port("1/1/xp1") == {"101"}
+
+
+def test_notification_during_resync_not_lost():
+    conn, tracker = _tracker()
+    conn.release.clear()
+    conn.reading.clear()
+    resync = threading.Thread(target=tracker.resync)
+    resync.start()
+    assert conn.reading.wait(5)
+    # 101 departs after the system was read
+    tracker.apply_notification(_event("ont-departure", "101"))
+    conn.release.set()
+    resync.join()
+
+    assert tracker.get_ont_oper_state("101") == "missing"
+    assert tracker.get_onts_on_port("1/1/xp1", state="missing") == {"101"}
+    # later notifications are applied once, not replayed by the next resync
+    tracker.apply_notification(_event("ont-arrival", "101"))
+    conn.onts["101"] = ("1/1/xp1", "present")
+    assert tracker.resync()
+    assert tracker.get_ont_oper_state("101") == "present"
@@ -0,0 +1,71 @@
+"""
+Tests of get_ont_operating_statuses bulk reads.
+"""
+
+from lxml import etree
+
+from lib.axos_netconf.base import NetconfSession
+from lib.axos_netconf.responses import NetconfResponse
+
+GPON_NS = "http://www.calix.com/ns/exa/gpon-interface-base"
+
+
+class FakeSession(NetconfSession):
+    """Session answering ONT status gets from {ont-id: oper-state}."""
+
+    def __init__(self, states: dict, reply=None):
+        super().__init__("192.0.2.1", 830, 30, "user", "pass", devicename="e9-1")
+        self.states = states
+        self.reply = reply
+        self.requested = []
+
+    def get(self, nc_filter=None):
+        if self.reply is not None:
+            return self.reply
+        ontids = [
+            element.text
+            for element in etree.fromstring(nc_filter).iter(f"{{{GPON_NS}}}ont-id")
+        ]
+        self.requested.append(ontids)
+        onts = "".join(
+            f'<ont xmlns="{GPON_NS}"><ont-id>{ontid}</ont-id>'
+            f"<status><oper-state>{self.states[ontid]}</oper-state></status></ont>"
+            for ontid in ontids
+            if ontid in self.states
+        )
+        return NetconfResponse(
+            xml='<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" '
+            'message-id="1"><data><status xmlns="http://www.calix.com/ns/exa/base">'
+            f"<system>{onts}</system></status></data></rpc-reply>"
+        )
+
+
+def test_statuses_read_in_shards():
+    conn = FakeSession({"101": "present", "102": "missing", "103": "present"})
+    response = conn.get_ont_operating_statuses([101, "102", "103", "104"], shard_size=3)
+    assert response.ok
+    assert conn.requested == [["101", "102", "103"], ["104"]]
+    assert response.data == {
+        "statuses": {"101": "present", "102": "missing", "103": "present"},
+        "not_found": ["104"],
+    }
+
+
+def test_no_onts_found():
+    conn = FakeSession({})
+    response = conn.get_ont_operating_statuses(["101"])
+    assert response.data == {"statuses": {}, "not_found": ["101"]}
+
+
+def test_failed_reply():
+    conn = FakeSession({}, reply=NetconfResponse(ok=False, err="access denied"))
+    response = conn.get_ont_operating_statuses(["101"])
+    assert not response.ok
+    assert response.err == "access denied"
+
+
+def test_failed_reply_without_error():
+    conn = FakeSession({}, reply=NetconfResponse(ok=False))
+    response = conn.get_ont_operating_statuses(["101"])
+    assert not response.ok
+    assert response.err is None
@@ -0,0 +1,145 @@
+"""
+Tests of the OntUpgradePipeline stage loop and its error paths.
+"""
+
+import functools
+
+from lib.axos_netconf.responses import NetconfResponse
+from lib.combo_utils.job_journal import JobJournal
+from lib.combo_utils.ont_upgrade import STAGES, OntUpgradePipeline
+
+
+def _cards(*statuses):
+    cards = [
+        {"card": f"1/{slot}", "status": status}
+        for slot, status in enumerate(statuses, start=1)
+    ]
+    return NetconfResponse(data={"statuses": cards[0] if len(cards) == 1 else cards})
+
+
+_pipeline = functools.partial(
+    OntUpgradePipeline,
+    release_name="23.4.0.0",
+    directory_path="/images",
+    upgrade_classes=["GP1100X"],
+    poll_min=0.001,
+    poll_max=0.002,
+    stage_timeout=5,
+)
+
+
+def test_all_stages_done(upgrade_conn):
+    conn = upgrade_conn()
+    results = _pipeline({"e9-1": conn}).run()
+    assert results == {
+        ("e9-1", "GP1100X"): {"stage": "commit", "status": "done", "err": None}
+    }
+    assert [command[0] for command in conn.commands] == list(STAGES)
+
+
+def test_failed_poll_is_not_done(upgrade_conn):
+    conn = upgrade_conn(
+        polls=[
+            NetconfResponse(ok=False, err="session busy"),
+            NetconfResponse(data=None),
+            _cards("downloading", "complete"),
+            _cards("complete", "complete"),
+        ]
+    )
+    progress = []
+
+    def on_progress(devicename, upgrade_class, stage, state):
+        progress.append((stage, state, conn.poll_count))
+
+    results = _pipeline({"e9-1": conn}, progress=on_progress).run()
+    assert results[("e9-1", "GP1100X")]["status"] == "done"
+    # download is only done once the cards reported complete on poll 4
+    assert progress[:3] == [
+        ("download", "started", 0),
+        ("download", "done", 4),
+        ("install", "started", 4),
+    ]
+
+
+def test_polls_failing_until_timeout_fail_the_stage(upgrade_conn):
+    conn = upgrade_conn(polls=[NetconfResponse(ok=False, err="session busy")])
+    pipeline = _pipeline({"e9-1": conn}, stage_timeout=0.02, max_failed_polls=10**6)
+    results = pipeline.run()
+    result = results[("e9-1", "GP1100X")]
+    assert result["status"] == "failed"
+    assert result["stage"] is None
+    assert "timed out" in result["err"]
+    assert "session busy" in result["err"]
+    assert [command[0] for command in conn.commands] == ["download"]
+
+
+def test_failed_card_status_fails_the_stage(upgrade_conn):
+    conn = upgrade_conn(polls=[_cards("complete", "download-failed")])
+    result = _pipeline({"e9-1": conn}).run()[("e9-1", "GP1100X")]
+    assert result == {
+        "stage": None,
+        "status": "failed",
+        "err": "card status download-failed",
+    }
+
+
+def test_rejected_command_stops_the_job(upgrade_conn):
+    conn = upgrade_conn(reject="activate")
+    result = _pipeline({"e9-1": conn}).run()[("e9-1", "GP1100X")]
+    assert result == {
+        "stage": "install",
+        "status": "failed",
+        "err": "activate rejected",
+    }
+
+
+def test_journal_resumes_after_last_done_stage(upgrade_conn, tmp_path):
+    path = str(tmp_path / "upgrade.db")
+    conn = upgrade_conn(reject="activate")
+    with JobJournal(path, "23.4.0.0") as journal:
+        result = _pipeline({"e9-1": conn}, journal=journal).run()[("e9-1", "GP1100X")]
+        assert result["stage"] == "install"
+        assert journal.get_failures() == {
+            ("e9-1", "GP1100X:activate"): "activate rejected"
+        }
+
+    conn = upgrade_conn()
+    with JobJournal(path, "23.4.0.0") as journal:
+        pipeline = _pipeline({"e9-1": conn}, journal=journal)
+        assert pipeline.get_progress() == {
+            "download": 1,
+            "install": 1,
+            "activate": 0,
+            "commit": 0,
+        }
+        result = pipeline.run()[("e9-1", "GP1100X")]
+        assert result == {"stage": "commit", "status": "done", "err": None}
+        assert [command[0] for command in conn.commands] == ["activate", "commit"]
+        assert journal.get_failures() == {}
+
+
+def test_failed_polls_in_a_row_fail_the_stage(upgrade_conn):
+    conn = upgrade_conn(polls=[NetconfResponse(data=None)])
+    pipeline = _pipeline({"e9-1": conn}, stage_timeout=3600, max_failed_polls=3)
+    result = pipeline.run()[("e9-1", "GP1100X")]
+    assert result["status"] == "failed"
+    assert result["err"] == "no card statuses after 3 polls: no card statuses"
+    assert conn.poll_count == 3
+
+
+def test_job_raising_is_recorded_as_failed(upgrade_conn, tmp_path):
+    def on_progress(devicename, upgrade_class, stage, state):
+        if (stage, state) == ("install", "started"):
+            raise RuntimeError("progress display closed")
+
+    conn = upgrade_conn()
+    with JobJournal(str(tmp_path / "upgrade.db"), "23.4.0.0") as journal:
+        results = _pipeline({"e9-1": conn}, progress=on_progress, journal=journal).run()
+        assert results[("e9-1", "GP1100X")] == {
+            "stage": "download",
+            "status": "failed",
+            "err": "progress display closed",
+        }
+        assert journal.get_failures() == {
+            ("e9-1", "GP1100X:install"): "progress display closed"
+        }
@@ -0,0 +1,118 @@
+"""
+Tests of setting and reading the ONT upgrade server.
+"""
+
+from lxml import etree
+
+from lib.axos_netconf.base import NetconfSession
+from lib.axos_netconf.responses import NetconfResponse
+from lib.combo_utils.ont_upgrade import set_ont_upgrade_server
+
+NC_NS = "urn:ietf:params:xml:ns:netconf:base:1.0"
+UPGRADE_NS = "http://www.calix.com/ns/exa/ont-upgrade"
+
+
+class FakeSession(NetconfSession):
+    """Session recording dispatched rpcs and answering with reply."""
+
+    def __init__(self, reply=None, devicename="e9-1"):
+        super().__init__("192.0.2.1", 830, 30, "user", "pass", devicename=devicename)
+        self.reply = reply or NetconfResponse(
+            xml=f'<rpc-reply xmlns="{NC_NS}" message-id="1"><ok/></rpc-reply>'
+        )
+        self.rpcs = []
+
+    def dispatch(self, rpc_command=None):
+        self.rpcs.append(rpc_command)
+        return self.reply
+
+
+def _servers_reply(*hostnames):
+    servers = "".join(
+        f"<server><hostname>{hostname}</hostname></server>" for hostname in hostnames
+    )
+    return NetconfResponse(
+        xml=f'<rpc-reply xmlns="{NC_NS}" message-id="1"><data>'
+        '<config xmlns="http://www.calix.com/ns/exa/base"><system>'
+        f'<ont-upgrade xmlns="{UPGRADE_NS}">{servers}</ont-upgrade>'
+        "</system></config></data></rpc-reply>"
+    )
+
+
+def _ont_upgrade(rpc):
+    return next(etree.fromstring(rpc).iter(f"{{{UPGRADE_NS}}}ont-upgrade"))
+
+
+def test_server_set_with_one_edit_config():
+    conn = FakeSession()
+    response = conn.edit_ont_upgrade_server("images.example.net", "ftp", "secret")
+    assert response.ok
+    assert response.data == {"hostname": "images.example.net"}
+    assert len(conn.rpcs) == 1
+    assert etree.fromstring(conn.rpcs[0]).tag == f"{{{NC_NS}}}edit-config"
+
+
+def test_server_list_replaced():
+    # replacing the container removes every other configured server
+    conn = FakeSession()
+    conn.edit_ont_upgrade_server("images.example.net", "ftp", "secret")
+    ont_upgrade = _ont_upgrade(conn.rpcs[0])
+    assert ont_upgrade.get(f"{{{NC_NS}}}operation") == "replace"
+    servers = ont_upgrade.findall(f"{{{UPGRADE_NS}}}server")
+    assert len(servers) == 1
+    assert [(child.tag.split("}")[1], child.text) for child in servers[0]] == [
+        ("hostname", "images.example.net"),
+        ("username", "ftp"),
+        ("password", "secret"),
+    ]
+
+
+def test_failed_edit():
+    conn = FakeSession(reply=NetconfResponse(ok=False, err="access denied"))
+    response = conn.edit_ont_upgrade_server("images.example.net", "ftp", "secret")
+    assert not response.ok
+    assert response.err == "access denied"
+
+
+def test_all_hostnames_listed():
+    conn = FakeSession(reply=_servers_reply("old.example.net", "older.example.net"))
+    response = conn.get_ont_upgrade_server_hostname()
+    assert response.data == {
+        "hostname": "old.example.net",
+        "hostnames": ["old.example.net", "older.example.net"],
+    }
+
+
+def test_no_hostname_configured():
+    conn = FakeSession(reply=_servers_reply())
+    response = conn.get_ont_upgrade_server_hostname()
+    assert response.data == {"hostname": None, "hostnames": []}
+
+
+def test_bulk_set():
+    sessions = {
+        "e9-1": FakeSession(devicename="e9-1"),
+        "e9-2": FakeSession(
+            reply=NetconfResponse(ok=False, err="access denied"), devicename="e9-2"
+        ),
+    }
+    results = set_ont_upgrade_server(
+        sessions, "images.example.net", "ftp", "secret", max_workers=2
+    )
+    assert results["e9-1"].ok
+    assert not results["e9-2"].ok
+    assert results["e9-2"].err == "access denied"
+    for conn in sessions.values():
+        assert len(conn.rpcs) == 1
+        assert _ont_upgrade(conn.rpcs[0]).get(f"{{{NC_NS}}}operation") == "replace"
+
+
+def test_bulk_set_exception():
+    class Broken(FakeSession):
+        def dispatch(self, rpc_command=None):
+            raise ConnectionError("session closed")
+
+    results = set_ont_upgrade_server(
+        {"e9-1": Broken()}, "images.example.net", "ftp", "secret"
+    )
+    assert results["e9-1"].err == "session closed"
@@ -0,0 +1,127 @@
+"""
+Tests of PON port matching and OntPortResolver.
+"""
+
+import pytest
+
+from lib.axos_netconf.responses import NetconfResponse
+from lib.combo_utils import ont_utils
+from lib.combo_utils.ont_utils import (
+    OntPortResolver,
+    get_ont_port_resolver,
+    is_pon_port,
+    ont_ports_to_ids,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class FakeConn:
+    devicename = "e9-1"
+
+    def __init__(self, linkages):
+        self.linkages = linkages  # (ont-id, shelf, slot, pon-port)
+        self.reads = 0
+
+    def get_discovered_onts(self):
+        self.reads += 1
+        return NetconfResponse(
+            data={
+                "discovered onts": [
+                    {
+                        "ont-id": ontid,
+                        "shelf-id": shelf,
+                        "slot-id": slot,
+                        "pon-port": pon,
+                    }
+                    for ontid, shelf, slot, pon in self.linkages
+                ]
+            }
+        )
+
+
+LINKAGES = [
+    ("101", 1, 1, "xp1"),
+    ("102", 1, 1, "xp1"),
+    ("103", 1, 2, "xp3"),
+    ("201", 2, 1, "gp12"),
+]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ont_utils, "time", clock)
+    return clock
+
+
+@pytest.mark.parametrize("port", ["1/1/xp1", "1/2/xp48", "9/1/gp12", "1/1/xp10"])
+def test_pon_ports(port):
+    assert is_pon_port(port)
+
+
+@pytest.mark.parametrize(
+    "port",
+    ["101", "1/1/xp49", "1/1/xp0", "0/1/xp1", "1/3/xp1", "1/1/x1", "1/1/xp1/1", ""],
+)
+def test_not_pon_ports(port):
+    assert not is_pon_port(port)
+
+
+def test_index_by_port(clock):
+    resolver = OntPortResolver(FakeConn(LINKAGES))
+    assert resolver.get_ont_ids("1/1/xp1") == ["101", "102"]
+    assert resolver.get_ont_ids("2/1/gp12") == ["201"]
+    assert resolver.get_ont_ids("1/1/xp2") == []
+
+
+def test_resolve_keeps_order(clock):
+    conn = FakeConn(LINKAGES)
+    resolver = OntPortResolver(conn)
+    assert resolver.resolve(["301", "1/1/xp1", "1/2/xp3", "302"]) == [
+        "301",
+        "101",
+        "102",
+        "103",
+        "302",
+    ]
+
+
+def test_discovery_only_read_for_ports(clock):
+    conn = FakeConn(LINKAGES)
+    assert OntPortResolver(conn).resolve(["101", "102"]) == ["101", "102"]
+    assert conn.reads == 0
+
+
+def test_cache_expiry(clock):
+    conn = FakeConn(LINKAGES)
+    resolver = OntPortResolver(conn, ttl=60)
+    resolver.get_ont_ids("1/1/xp1")
+    clock.now += 59
+    conn.linkages = LINKAGES + [("104", 1, 1, "xp1")]
+    assert resolver.get_ont_ids("1/1/xp1") == ["101", "102"]
+    assert conn.reads == 1
+    clock.now += 1
+    assert resolver.get_ont_ids("1/1/xp1") == ["101", "102", "104"]
+    assert conn.reads == 2
+    resolver.invalidate()
+    resolver.get_ont_ids("1/1/xp1")
+    assert conn.reads == 3
+
+
+def test_ont_ports_to_ids_reuses_session_resolver(clock):
+    conn = FakeConn(LINKAGES)
+    assert ont_ports_to_ids(conn, ["1/1/xp1"]) == ["101", "102"]
+    assert ont_ports_to_ids(conn, ["1/2/xp3"]) == ["103"]
+    assert conn.reads == 1
+    assert get_ont_port_resolver(conn) is get_ont_port_resolver(conn)
+
+    resolver = OntPortResolver(conn)
+    ont_ports_to_ids(conn, ["1/1/xp1"], resolver=resolver)
+    assert conn.reads == 2
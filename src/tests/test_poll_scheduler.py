@@ -0,0 +1,159 @@
+"""
+Tests of PollScheduler filter merging and reply slicing.
+"""
+
+import xmltodict
+from lxml import etree
+from ncclient.operations.util import build_filter
+
+from lib.axos_netconf.responses import NetconfResponse
+from lib.combo_utils.poll_scheduler import PollScheduler, apply_filter, merge_filters
+
+NETCONF_NS = "urn:ietf:params:xml:ns:netconf:base:1.0"
+
+ONT_STATES_FILTER = """
+    <status xmlns="http://www.calix.com/ns/exa/base">
+        <system>
+            <ont xmlns="http://www.calix.com/ns/exa/gpon-interface-base">
+                <ont-id/>
+                <status><oper-state/></status>
+            </ont>
+        </system>
+    </status>
+"""
+ONT_101_FILTER = """
+    <status xmlns="http://www.calix.com/ns/exa/base">
+        <system>
+            <ont xmlns="http://www.calix.com/ns/exa/gpon-interface-base">
+                <ont-id>101</ont-id>
+                <status><opt-signal-level/></status>
+            </ont>
+        </system>
+    </status>
+"""
+INTERFACES_FILTER = """
+    <interfaces-state xmlns="urn:ietf:params:xml:ns:yang:ietf-interfaces">
+        <interface><name/><oper-status/></interface>
+    </interfaces-state>
+"""
+
+REPLY = f"""
+<rpc-reply xmlns="{NETCONF_NS}" message-id="1">
+  <data>
+    <status xmlns="http://www.calix.com/ns/exa/base">
+      <system>
+        <ont xmlns="http://www.calix.com/ns/exa/gpon-interface-base">
+          <ont-id>101</ont-id>
+          <status><oper-state>present</oper-state><opt-signal-level>-18.5</opt-signal-level></status>
+        </ont>
+        <ont xmlns="http://www.calix.com/ns/exa/gpon-interface-base">
+          <ont-id>102</ont-id>
+          <status><oper-state>missing</oper-state></status>
+        </ont>
+      </system>
+    </status>
+    <interfaces-state xmlns="urn:ietf:params:xml:ns:yang:ietf-interfaces">
+      <interface><name>1/1/xp1</name><oper-status>up</oper-status></interface>
+    </interfaces-state>
+  </data>
+</rpc-reply>
+"""
+
+
+def _local_names(element) -> list:
+    return [etree.QName(child).localname for child in element]
+
+
+def test_merged_roots_pass_build_filter():
+    merged = merge_filters([ONT_STATES_FILTER, INTERFACES_FILTER])
+    rep = build_filter(merged)
+    assert etree.QName(rep).localname == "filter"
+    assert rep.get("type") == "subtree"
+    assert _local_names(rep) == ["status", "interfaces-state"]
+
+
+def test_single_filter_pass_build_filter():
+    rep = build_filter(merge_filters([INTERFACES_FILTER]))
+    assert _local_names(rep) == ["interfaces-state"]
+
+
+def test_same_root_merged_into_union():
+    rep = build_filter(merge_filters([ONT_STATES_FILTER, ONT_101_FILTER]))
+    assert _local_names(rep) == ["status"]
+    onts = rep.findall(".//{http://www.calix.com/ns/exa/gpon-interface-base}ont")
+    # the content match of ONT 101 selects less than ONT_STATES_FILTER, the
+    # two are kept apart
+    assert len(onts) == 2
+
+
+def test_apply_filter_slices_each_job():
+    onts = xmltodict.parse(apply_filter(REPLY, ONT_STATES_FILTER))["rpc-reply"][
+        "data"
+    ]
+    assert list(onts) == ["status"]
+    assert [ont["ont-id"] for ont in onts["status"]["system"]["ont"]] == [
+        "101",
+        "102",
+    ]
+
+    ont = xmltodict.parse(apply_filter(REPLY, ONT_101_FILTER))["rpc-reply"]["data"][
+        "status"
+    ]["system"]["ont"]
+    assert ont["ont-id"] == "101"
+    assert ont["status"] == {"opt-signal-level": "-18.5"}
+
+    interfaces = xmltodict.parse(apply_filter(REPLY, INTERFACES_FILTER))[
+        "rpc-reply"
+    ]["data"]
+    assert list(interfaces) == ["interfaces-state"]
+
+
+class FakeConn:
+    """Builds the get filter the way ncclient does and answers REPLY."""
+
+    def __init__(self, reply=None):
+        self.filters = []
+        self.reply = reply or NetconfResponse(xml=REPLY)
+
+    def get(self, nc_filter=None):
+        self.filters.append(build_filter(nc_filter))
+        return self.reply
+
+
+def test_merged_poll_with_mixed_roots():
+    conn = FakeConn()
+    scheduler = PollScheduler({"e9-1": conn})
+    received = {}
+
+    def callback(name):
+        return lambda devicename, response: received.setdefault(name, response)
+
+    scheduler.add_job("e9-1", "onts", ONT_STATES_FILTER, 60, callback("onts"))
+    scheduler.add_job("e9-1", "ifs", INTERFACES_FILTER, 60, callback("ifs"))
+    scheduler._poll("e9-1", list(scheduler._jobs.values()))
+
+    assert len(conn.filters) == 1
+    assert _local_names(conn.filters[0]) == ["status", "interfaces-state"]
+    assert received["onts"].ok and received["ifs"].ok
+    assert "interfaces-state" not in received["onts"].xml
+    assert "interfaces-state" in received["ifs"].xml
+    assert "<ont-id>" not in received["ifs"].xml
+    assert scheduler.stats["merged"] == 1
+
+
+def test_failed_poll_passes_reply_error():
+    conn = FakeConn(NetconfResponse(ok=False, err="access denied"))
+    scheduler = PollScheduler({"e9-1": conn})
+    received = []
+    scheduler.add_job(
+        "e9-1",
+        "onts",
+        ONT_STATES_FILTER,
+        60,
+        lambda devicename, response: received.append(response),
+    )
+    scheduler._poll("e9-1", list(scheduler._jobs.values()))
+
+    assert len(received) == 1
+    assert not received[0].ok
+    assert received[0].err == "access denied"
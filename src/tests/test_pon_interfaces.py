@@ -0,0 +1,110 @@
+"""
+Tests of the bulk PON interface enable state reads and edits.
+"""
+
+from lxml import etree
+
+from lib.axos_netconf.base import NetconfSession
+from lib.axos_netconf.responses import NetconfResponse
+
+IF_NS = "urn:ietf:params:xml:ns:yang:ietf-interfaces"
+
+
+class FakeSession(NetconfSession):
+    """Session answering get-config with reply and recording edits."""
+
+    def __init__(self, reply=None, edit_reply=None):
+        super().__init__("192.0.2.1", 830, 30, "user", "pass", devicename="e9-1")
+        self.reply = reply
+        self.edit_reply = edit_reply or NetconfResponse()
+        self.configs = []
+
+    def get_config(self, nc_filter=None, with_defaults=None):
+        return self.reply
+
+    def edit_config(self, config):
+        self.configs.append(config)
+        return self.edit_reply
+
+
+def _interfaces_reply(interfaces):
+    entries = "".join(
+        f"<interface><name>{name}</name><enabled>{enabled}</enabled></interface>"
+        for name, enabled in interfaces.items()
+    )
+    return NetconfResponse(
+        xml='<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" '
+        f'message-id="1"><data><interfaces xmlns="{IF_NS}">{entries}'
+        "</interfaces></data></rpc-reply>"
+    )
+
+
+EMPTY_REPLY = NetconfResponse(
+    xml='<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" '
+    'message-id="1"><data/></rpc-reply>'
+)
+
+
+def test_enabled_all():
+    conn = FakeSession(_interfaces_reply({"1/1/xp1": "true", "1/2/xp3": "false"}))
+    assert conn.getcfg_pon_enabled_all() == {"1/1/xp1": "true", "1/2/xp3": "false"}
+
+
+def test_enabled_all_single_interface():
+    conn = FakeSession(_interfaces_reply({"1/1/xp1": "true"}))
+    assert conn.getcfg_pon_enabled_all() == {"1/1/xp1": "true"}
+
+
+def test_enabled_all_empty_reply():
+    assert FakeSession(EMPTY_REPLY).getcfg_pon_enabled_all() == {}
+    assert FakeSession(_interfaces_reply({})).getcfg_pon_enabled_all() == {}
+
+
+def test_enabled_all_error_reply():
+    conn = FakeSession(NetconfResponse(ok=False, err="access denied"))
+    assert conn.getcfg_pon_enabled_all() is None
+
+
+def test_pon_cards():
+    conn = FakeSession(
+        _interfaces_reply(
+            {"1/2/xp1": "true", "1/1/xp2": "true", "1/1/xp1": "false", "mgmt": "true"}
+        )
+    )
+    assert conn.getcfg_pon_cards() == [(1, 1), (1, 2)]
+
+
+def test_pon_cards_empty_and_error_replies():
+    assert FakeSession(EMPTY_REPLY).getcfg_pon_cards() == []
+    conn = FakeSession(NetconfResponse(ok=False, err="access denied"))
+    assert conn.getcfg_pon_cards() is None
+
+
+def test_enabled_many_rendered():
+    conn = FakeSession()
+    response = conn.editcfg_pon_enabled_many({"1/1/xp1": True, "1/2/xp3": "false"})
+    assert response.ok
+    assert len(conn.configs) == 1
+    config = etree.fromstring(conn.configs[0])
+    interfaces = config.findall(f"{{{IF_NS}}}interfaces/{{{IF_NS}}}interface")
+    assert [
+        (
+            interface.findtext(f"{{{IF_NS}}}name"),
+            interface.findtext(f"{{{IF_NS}}}type").strip(),
+            interface.findtext(f"{{{IF_NS}}}enabled"),
+        )
+        for interface in interfaces
+    ] == [("1/1/xp1", "gpon-std:pon", "true"), ("1/2/xp3", "gpon-std:pon", "false")]
+
+
+def test_enabled_many_empty():
+    conn = FakeSession()
+    assert conn.editcfg_pon_enabled_many({}).ok
+    assert conn.configs == []
+
+
+def test_enabled_many_error_reply():
+    conn = FakeSession(edit_reply=NetconfResponse(False, "invalid value"))
+    response = conn.editcfg_pon_enabled_many({"1/1/xp1": True})
+    assert not response.ok
+    assert response.err == "invalid value"
@@ -0,0 +1,206 @@
+"""
+Tests of NetconfSession reply accounting, single-flight reads and reply
+parsing.
+"""
+
+import gc
+import mmap
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+from lib.axos_netconf.base import NetconfSession
+from lib.axos_netconf.framing import ChunkedFramingParser, _Message, _SpilledMessage
+from lib.axos_netconf.parsing import create_parse_pool, parse_ont_oper_states
+
+NETCONF_NS = "urn:ietf:params:xml:ns:netconf:base:1.0"
+REPLY = (
+    f'<rpc-reply xmlns="{NETCONF_NS}" message-id="1"><data>'
+    '<system xmlns="http://www.calix.com/ns/exa/base">'
+    "<hostname>Zürich-E9</hostname></system></data></rpc-reply>"
+)
+
+
+def _session() -> NetconfSession:
+    return NetconfSession("192.0.2.1", 830, 30, "user", "pass", devicename="e9-1")
+
+
+def _mapped(data: bytes) -> mmap.mmap:
+    buffer = mmap.mmap(-1, len(data))
+    buffer.write(data)
+    buffer.seek(0)
+    return buffer
+
+
+class FakeManager:
+    """ncclient manager answering get after release is set."""
+
+    connected = True
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.filters = []
+
+    def get(self, filter=None):
+        self.filters.append(filter)
+        self.release.wait(5)
+        return SimpleNamespace(xml=REPLY)
+
+
+def _concurrent_gets(conn, filters) -> list:
+    """Return the responses of a get per filter made concurrently, once every
+    get has started."""
+    responses = [None] * len(filters)
+
+    def reader(index):
+        responses[index] = conn.get(nc_filter=filters[index])
+
+    threads = [
+        threading.Thread(target=reader, args=(index,))
+        for index in range(len(filters))
+    ]
+    for thread in threads:
+        thread.start()
+    while conn.get_singleflight_stats()["reads"] < len(filters):
+        time.sleep(0.001)
+    conn.session.release.set()
+    for thread in threads:
+        thread.join()
+    return responses
+
+
+SYSTEM_FILTER = '<system xmlns="http://www.calix.com/ns/exa/base"><hostname/></system>'
+
+
+def test_identical_gets_share_one_rpc():
+    conn = _session()
+    conn.session = FakeManager()
+    responses = _concurrent_gets(
+        conn,
+        [
+            SYSTEM_FILTER,
+            # the same filter written differently
+            '<system xmlns="http://www.calix.com/ns/exa/base">\n'
+            "    <hostname></hostname>\n</system>",
+            SYSTEM_FILTER,
+        ],
+    )
+    assert len(conn.session.filters) == 1
+    assert all(response is responses[0] for response in responses)
+    assert responses[0].xml == REPLY
+    assert conn.get_singleflight_stats() == {
+        "reads": 3,
+        "coalesced": 2,
+        "in flight": 0,
+    }
+
+
+def test_different_gets_are_not_shared():
+    conn = _session()
+    conn.session = FakeManager()
+    _concurrent_gets(conn, [SYSTEM_FILTER, ("xpath", "/system/hostname")])
+    assert len(conn.session.filters) == 2
+    assert conn.get_singleflight_stats()["coalesced"] == 0
+
+
+def test_singleflight_off():
+    conn = _session()
+    conn.singleflight = False
+    conn.session = FakeManager()
+    conn.session.release.set()
+    conn.get(nc_filter=SYSTEM_FILTER)
+    conn.get(nc_filter=SYSTEM_FILTER)
+    assert len(conn.session.filters) == 2
+
+
+def test_reply_size_counts_bytes():
+    conn = _session()
+    size = len(REPLY.encode("utf-8"))
+    assert size > len(REPLY)
+    conn._reply_response("get", REPLY)
+    conn._reply_response("get", _Message(REPLY.encode("utf-8")))
+    conn._reply_response(
+        "get", _SpilledMessage("<rpc-reply/>", _mapped(REPLY.encode("utf-8")))
+    )
+    assert conn.get_reply_stats() == {"get": {"replies": 3, "size": 3 * size}}
+
+
+ONT_STATES_REPLY = (
+    f'<rpc-reply xmlns="{NETCONF_NS}" message-id="1"><data>'
+    '<status xmlns="http://www.calix.com/ns/exa/base"><system>'
+    + "".join(
+        '<ont xmlns="http://www.calix.com/ns/exa/gpon-interface-base">'
+        f"<ont-id>{ontid}</ont-id><status><oper-state>present</oper-state>"
+        "</status></ont>"
+        for ontid in range(100, 150)
+    )
+    + "</system></status></data></rpc-reply>"
+)
+
+
+def _spilled_reply(conn, transport, xml: str):
+    """Return the response of a reply received chunked and spilled."""
+    parser = ChunkedFramingParser(transport, spill_threshold=64)
+    data = xml.encode("utf-8")
+    parser.parse(f"\n#{len(data)}\n".encode() + data + b"\n##\n")
+    response = conn._reply_response("get", transport.messages.pop())
+    assert response.spilled
+    return response
+
+
+def test_spilled_reply_parsed_repeatedly(framed_transport):
+    conn = _session()
+    response = _spilled_reply(conn, framed_transport, ONT_STATES_REPLY)
+    first = conn.parse_reply(parse_ont_oper_states, response)
+    assert len(first) == 50
+    assert conn.parse_reply(parse_ont_oper_states, response) == first
+
+
+def test_spilled_reply_shared_by_singleflight(framed_transport):
+    conn = _session()
+    release = threading.Event()
+
+    def read():
+        release.wait(5)
+        return _spilled_reply(conn, framed_transport, ONT_STATES_REPLY)
+
+    results = []
+
+    def reader():
+        response = conn._read_once(("get", None, None, None), read)
+        results.append(conn.parse_reply(parse_ont_oper_states, response))
+
+    threads = [threading.Thread(target=reader) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while conn.get_singleflight_stats()["coalesced"] < 2:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert conn.get_singleflight_stats()["reads"] == 3
+    assert len(results) == 3
+    assert results[0]["100"] == "present"
+    assert results[1] == results[0] and results[2] == results[0]
+
+
+def test_spilled_reply_parsed_in_pool_from_its_file(framed_transport):
+    pool = create_parse_pool(max_workers=1)
+    try:
+        conn = _session()
+        conn.parse_pool = pool
+        response = _spilled_reply(conn, framed_transport, ONT_STATES_REPLY)
+        path = response.path
+        assert os.path.exists(path)
+        future = conn.submit_parse(parse_ont_oper_states, response)
+        del response
+        gc.collect()
+        # the file is kept until the worker has parsed it
+        assert len(future.result(timeout=60)) == 50
+    finally:
+        pool.shutdown()
+    del future
+    gc.collect()
+    assert not os.path.exists(path)
@@ -0,0 +1,111 @@
+"""
+Tests of SSH profile connect arguments and transport tuning.
+"""
+
+import socket
+import threading
+
+import paramiko
+import pytest
+
+from lib.axos_netconf.ssh_profile import ssh_connect_params, tuned_transport
+
+PROFILE = {"ciphers": ["aes256-ctr"], "macs": ["hmac-sha2-512"]}
+
+
+@pytest.fixture
+def sock():
+    left, right = socket.socketpair()
+    yield left
+    left.close()
+    right.close()
+
+
+def test_connect_params_without_profile():
+    assert ssh_connect_params(None) == {"allow_agent": False, "look_for_keys": False}
+
+
+def test_connect_params_password_only():
+    assert ssh_connect_params({"auth_order": ["password"], "look_for_keys": True}) == {
+        "allow_agent": False,
+        "look_for_keys": False,
+    }
+
+
+def test_connect_params_keys():
+    profile = {
+        "auth_order": ["publickey", "agent", "password"],
+        "look_for_keys": True,
+        "key_filename": "~/.ssh/id_ed25519",
+    }
+    assert ssh_connect_params(profile) == {
+        "allow_agent": True,
+        "look_for_keys": True,
+        "key_filename": "~/.ssh/id_ed25519",
+    }
+
+
+def test_connect_params_key_file_needs_publickey():
+    profile = {"auth_order": ["password"], "key_filename": "~/.ssh/id_ed25519"}
+    assert "key_filename" not in ssh_connect_params(profile)
+
+
+def test_connect_params_unknown_method():
+    with pytest.raises(ValueError, match="keyboard-interactive"):
+        ssh_connect_params({"auth_order": ["password", "keyboard-interactive"]})
+
+
+def test_transport_tuned_within_context(sock):
+    original = paramiko.Transport
+    with tuned_transport(PROFILE):
+        transport = paramiko.Transport(sock)
+        # replaced only until the connecting thread created its transport
+        assert paramiko.Transport is original
+    options = transport.get_security_options()
+    assert options.ciphers[0] == "aes256-ctr"
+    assert options.digests[0] == "hmac-sha2-512"
+    # the other algorithms are still offered
+    assert len(options.ciphers) > 1
+
+
+def test_transport_restored_when_none_created(sock):
+    original = paramiko.Transport
+    with pytest.raises(OSError):
+        with tuned_transport(PROFILE):
+            raise OSError("connection refused")
+    assert paramiko.Transport is original
+    # the lock was released, a later tuned connect is not blocked
+    with tuned_transport(PROFILE):
+        transport = paramiko.Transport(sock)
+    assert transport.get_security_options().ciphers[0] == "aes256-ctr"
+
+
+def test_untuned_profile_not_patched(sock):
+    original = paramiko.Transport
+    with tuned_transport({"auth_order": ["password"]}):
+        assert paramiko.Transport is original
+
+
+def test_other_thread_gets_defaults(sock):
+    original = paramiko.Transport
+    defaults = original(sock).get_security_options().ciphers
+    patched = threading.Event()
+    release = threading.Event()
+    transports = []
+
+    def _connect():
+        with tuned_transport(PROFILE):
+            patched.set()
+            release.wait()
+            transports.append(paramiko.Transport(sock))
+
+    thread = threading.Thread(target=_connect)
+    thread.start()
+    patched.wait()
+    assert paramiko.Transport is not original
+    other = paramiko.Transport(sock)
+    release.set()
+    thread.join()
+    assert other.get_security_options().ciphers == defaults
+    assert transports[0].get_security_options().ciphers[0] == "aes256-ctr"
+    assert paramiko.Transport is original
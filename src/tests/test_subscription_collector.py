@@ -0,0 +1,105 @@
+"""
+Tests of SubscriptionCollector subscribing, reconnecting and merging
+notifications of many devices.
+"""
+
+import time
+
+import pytest
+
+from lib.axos_netconf.responses import NetconfResponse
+from lib.combo_utils.subscription_collector import SubscriptionCollector
+
+
+class FakeConn:
+    """Session failing its first failures connects."""
+
+    def __init__(self, devicename, failures=0):
+        self.devicename = devicename
+        self.hostname = devicename
+        self.failures = failures
+        self.session = None
+        self.connects = []
+        self.callback = None
+        self.errback = None
+
+    def connect(self, retry=True):
+        self.connects.append(time.monotonic())
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("connection refused")
+        self.session = object()
+
+    def disconnect(self):
+        self.session = None
+
+    def add_notification_listener(self, callback, errback=None):
+        self.callback = callback
+        self.errback = errback
+
+    def create_subscription(self, categories):
+        return NetconfResponse()
+
+    def parse_notification(self, xml):
+        return {"xml": xml}
+
+
+@pytest.fixture
+def collector():
+    collector = SubscriptionCollector(
+        "test-collector", reconnect_interval=0.05, max_reconnect_interval=60
+    )
+    yield collector
+    collector.stop()
+
+
+def test_reconnect_with_backoff(collector, wait_for):
+    conn = FakeConn("e9-1", failures=3)
+    collector.add_device(conn)
+    collector.start()
+
+    assert wait_for(lambda: collector.get_subscribed_device_names() == ["e9-1"])
+    gaps = [later - earlier for earlier, later in zip(conn.connects, conn.connects[1:])]
+    assert len(gaps) == 3
+    # 0.05, 0.1 then 0.2 seconds
+    for gap, backoff in zip(gaps, (0.05, 0.1, 0.2)):
+        assert gap >= backoff * 0.9
+
+
+def test_lost_session_resubscribed(collector, wait_for):
+    conn = FakeConn("e9-1")
+    collector.add_device(conn)
+    collector.start()
+    assert wait_for(lambda: collector.get_subscribed_device_names() == ["e9-1"])
+
+    first_errback = conn.errback
+    started = time.monotonic()
+    first_errback(EOFError("session closed"))
+    assert wait_for(lambda: len(conn.connects) == 2)
+    assert wait_for(lambda: collector.get_subscribed_device_names() == ["e9-1"])
+    # not left waiting for max_reconnect_interval
+    assert time.monotonic() - started < 5
+
+    # the closed session failing again is ignored
+    first_errback(EOFError("late"))
+    time.sleep(0.2)
+    assert len(conn.connects) == 2
+    assert collector.get_subscribed_device_names() == ["e9-1"]
+
+
+def test_failing_device_does_not_stall_others(collector, wait_for):
+    failing = FakeConn("e9-1", failures=1000)
+    working = FakeConn("e9-2")
+    collector.add_device(failing)
+    collector.add_device(working)
+    collector.start()
+
+    assert wait_for(lambda: collector.get_subscribed_device_names() == ["e9-2"])
+    working.callback("<notification/>")
+    response = collector.take_notification(timeout=5)
+    assert response.data == {
+        "device": "e9-2",
+        "notification": {"xml": "<notification/>"},
+    }
+    assert wait_for(lambda: len(failing.connects) >= 3)
+    assert collector.get_subscribed_device_names() == ["e9-2"]
@@ -0,0 +1,156 @@
+"""
+Tests of SubscriptionManager filter changes and duplicate suppression.
+"""
+
+import queue
+import time
+
+import pytest
+
+from lib.axos_netconf.responses import NetconfResponse
+from lib.combo_utils.subscription_management import SubscriptionManager
+
+
+class FakeNotificationSession:
+    devicename = "e9-1"
+
+    def __init__(self):
+        self.notifications = queue.Queue()
+        self.categories = None
+        self.connected = True
+
+    def create_subscription(self, categories):
+        self.categories = categories
+        return NetconfResponse()
+
+    def take_notification(self, block=True, timeout=None):
+        try:
+            return NetconfResponse(data=self.notifications.get(timeout=timeout))
+        except queue.Empty:
+            return NetconfResponse(data=None)
+
+    def disconnect(self):
+        self.connected = False
+
+
+class FakeConn:
+    devicename = "e9-1"
+
+    def __init__(self):
+        self.sessions = []
+
+    def open_notification_session(self):
+        session = FakeNotificationSession()
+        self.sessions.append(session)
+        return session
+
+
+def _event(event_time, ont_id="101"):
+    return {
+        "eventTime": event_time,
+        "ont-departure": {"ont-id": ont_id, "category": "ONT"},
+    }
+
+
+def test_filter_change_switches_session_and_closes_old(subscriber, wait_for):
+    topic, _ = subscriber
+    conn = FakeConn()
+    manager = SubscriptionManager(conn, topic, "ONT", overlap=0.1)
+    try:
+        old = manager.notification_conn
+        manager.add_notification_categories("ALARM")
+        manager.update_subscription()
+
+        new = manager.notification_conn
+        assert new is not old
+        assert new.categories == ["ONT", "ALARM"]
+        assert wait_for(lambda: not old.connected)
+        assert new.connected
+    finally:
+        manager.stop_listener()
+
+
+def test_notification_on_both_sessions_published_once(subscriber, wait_for):
+    topic, received = subscriber
+    conn = FakeConn()
+    manager = SubscriptionManager(conn, topic, "ONT", overlap=0.5)
+    try:
+        old = manager.notification_conn
+        # taken from the old session before the overlap starts
+        old.notifications.put(_event("2024-06-01T10:00:00Z"))
+        assert wait_for(lambda: len(received) == 1)
+
+        manager.update_subscription()
+        new = manager.notification_conn
+        new.notifications.put(_event("2024-06-01T10:00:00Z"))
+        event = _event("2024-06-01T10:00:01Z")
+        old.notifications.put(event)
+        new.notifications.put(event)
+        # a different event at the same time is still published
+        new.notifications.put(_event("2024-06-01T10:00:01Z", ont_id="102"))
+
+        assert wait_for(lambda: len(received) == 3)
+        time.sleep(0.2)
+        assert [
+            (notif["eventTime"], notif["ont-departure"]["ont-id"])
+            for notif in received
+        ] == [
+            ("2024-06-01T10:00:00Z", "101"),
+            ("2024-06-01T10:00:01Z", "101"),
+            ("2024-06-01T10:00:01Z", "102"),
+        ]
+    finally:
+        manager.stop_listener()
+
+
+def test_restart_conn_is_deprecated(subscriber):
+    topic, _ = subscriber
+    conn = FakeConn()
+    manager = SubscriptionManager(conn, topic, "ONT", overlap=0.1)
+    try:
+        with pytest.warns(DeprecationWarning):
+            manager.update_subscription(restart_conn=False)
+        assert len(conn.sessions) == 2
+    finally:
+        manager.stop_listener()
+
+
+def test_repeated_notification_outside_filter_change_published(
+    subscriber, wait_for
+):
+    topic, received = subscriber
+    conn = FakeConn()
+    manager = SubscriptionManager(conn, topic, "ONT", overlap=0.1)
+    try:
+        session = manager.notification_conn
+        session.notifications.put(_event("2024-06-01T10:00:00Z"))
+        session.notifications.put(_event("2024-06-01T10:00:00Z"))
+        assert wait_for(lambda: len(received) == 2)
+    finally:
+        manager.stop_listener()
+
+
+def test_remove_notification_categories(subscriber):
+    topic, _ = subscriber
+    conn = FakeConn()
+    manager = SubscriptionManager(conn, topic, "ONT,ALARM", overlap=0.1)
+    try:
+        manager.remove_notification_categories("ALARM")
+        assert manager.get_current_notification_categories() == ["ONT"]
+        assert manager.notification_conn.categories == ["ONT"]
+        assert len(conn.sessions) == 2
+    finally:
+        manager.stop_listener()
+
+
+def test_remove_notification_categories_without_categories(subscriber):
+    topic, _ = subscriber
+    conn = FakeConn()
+    manager = SubscriptionManager(conn, topic, overlap=0.1)
+    try:
+        manager.remove_notification_categories("ALARM")
+        assert manager.get_current_notification_categories() is None
+        # the subscription is left as it is
+        assert len(conn.sessions) == 1
+    finally:
+        manager.stop_listener()